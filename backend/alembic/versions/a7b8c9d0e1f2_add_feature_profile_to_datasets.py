@@ -0,0 +1,31 @@
+"""add_feature_profile_to_datasets
+
+Revision ID: a7b8c9d0e1f2
+Revises: d1e2f3g4h5i6
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7b8c9d0e1f2'
+down_revision: Union[str, None] = 'd1e2f3g4h5i6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Add feature_profile to datasets: per-feature-group wall time and peak
+    memory recorded by profiled process-features runs.
+    """
+    op.add_column('datasets', sa.Column('feature_profile', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    """Drop feature_profile from datasets."""
+    op.drop_column('datasets', 'feature_profile')
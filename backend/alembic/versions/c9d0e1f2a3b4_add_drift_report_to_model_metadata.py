@@ -0,0 +1,31 @@
+"""add_drift_report_to_model_metadata
+
+Revision ID: c9d0e1f2a3b4
+Revises: b8c9d0e1f2a3
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9d0e1f2a3b4'
+down_revision: Union[str, None] = 'b8c9d0e1f2a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Add drift_report to model_metadata: metric drift between the previous and
+    the warm-started model of an incremental retraining.
+    """
+    op.add_column('model_metadata', sa.Column('drift_report', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    """Drop drift_report from model_metadata."""
+    op.drop_column('model_metadata', 'drift_report')
@@ -0,0 +1,31 @@
+"""add_processed_customers_to_prediction_batches
+
+Revision ID: d0e1f2a3b4c5
+Revises: c9d0e1f2a3b4
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd0e1f2a3b4c5'
+down_revision: Union[str, None] = 'c9d0e1f2a3b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Add processed_customers to prediction_batches: progress of streaming
+    bulk predictions.
+    """
+    op.add_column('prediction_batches', sa.Column('processed_customers', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Drop processed_customers from prediction_batches."""
+    op.drop_column('prediction_batches', 'processed_customers')
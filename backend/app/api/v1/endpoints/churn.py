@@ -10,6 +10,7 @@ import pandas as pd
 import io
 
 from app.api.deps import get_db
+from app.core.config import settings
 from app.db.models.organization import Organization
 from app.db.models.customer import Customer
 from app.db.models.data_processing_status import DataProcessingStatus
@@ -27,7 +28,10 @@ from app.services.data_ingestion import (
     update_processing_status,
     STANDARD_SCHEMA
 )
-from app.services.feature_engineering import batch_calculate_features
+from app.services.feature_engineering import (
+    batch_calculate_features_vectorized,
+    batch_calculate_features_sql
+)
 from app.services.churn_labeling import create_training_dataset
 from app.services.ml_pipeline import (
     train_churn_model,
@@ -103,7 +107,10 @@ async def upload_data(
         result = store_transactions(db, org_id, normalized, status_callback)
         
         # Calculate features
-        feature_result = batch_calculate_features(db, org_id)
+        if settings.FEATURE_COMPUTE_MODE == "sql":
+            feature_result = batch_calculate_features_sql(db, org_id)
+        else:
+            feature_result = batch_calculate_features_vectorized(db, org_id)
         
         # Update status to ready
         update_processing_status(db, org_id, "ready", result["records_stored"])
@@ -5,12 +5,16 @@ New simplified flow using Supabase storage without database transactions.
 import uuid
 import pandas as pd
 import io
+import shutil
+import tempfile
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, BackgroundTasks, status
+from fastapi.responses import Response
 from sqlalchemy.orm import Session
 from typing import Optional
 
 from app.api.deps import get_db
+from app.core.config import settings
 from app.db.models.organization import Organization
 from app.db.models.dataset import Dataset
 from app.db.models.model_metadata import ModelMetadata
@@ -18,16 +22,13 @@ from app.db.models.prediction_batch import PredictionBatch, CustomerPrediction
 from app.services.storage import (
     upload_to_supabase,
     upload_dataframe_to_supabase,
-    download_from_supabase
-)
-from app.services.feature_engineering_csv import (
-    engineer_features_from_csv,
-    create_training_dataset_from_csv
+    download_from_supabase,
+    download_dataframe_from_supabase,
+    artifact_extension,
+    dataframe_to_bytes
 )
+from app.services.feature_engineering_csv import engineer_features_from_csv
 from app.services.ml_training import (
-    train_churn_model_from_dataframe,
-    save_model_to_disk,
-    load_model_from_disk,
     predict_from_features,
     FEATURE_COLUMNS
 )
@@ -35,18 +36,34 @@ from app.services.ml_training import (
 # V2 Enhanced services for better accuracy (AUTO-ENABLED)
 from app.services.feature_engineering_v2 import (
     engineer_features_from_csv_v2,
+    engineer_features_from_csv_v2_vectorized,
     get_feature_columns_v2
 )
-from app.services.ml_training_v2 import (
-    train_churn_model_v2,
-    save_model_v2,
-    load_model_v2,
-    predict_v2
+from app.services.event_loader import load_events, has_event_dates
+from app.services.feature_cache import FeatureCache, feature_cache_key
+from app.services.feature_profiler import FeatureProfiler
+from app.services.feature_store import FeatureWindowError, IncrementalFeatureStore, OutOfOrderBatchError
+from app.services.feature_streaming import engineer_features_streaming
+from app.services.parallel_features import engineer_features_parallel
+from app.services.ml_training_v2 import predict_v2
+from app.services.model_registry import get_model_from_disk, get_model_registry, get_model_v2
+from app.services.prediction_batcher import get_prediction_batcher
+from app.services.prediction_store import store_batch_predictions
+from app.services.prediction_streaming import (
+    PredictionOutputWriter,
+    count_csv_customers,
+    iter_prediction_chunks,
+    partitions_for
 )
+from app.services.score_index import lookup_customer_score, refresh_score_index
+from app.services.training_jobs import get_training_runner
 
 # USE V2 BY DEFAULT
 USE_V2_ENHANCED = True  # Set to False to use original methods
 
+# Raw CSVs larger than this are featurized in streaming mode (bounded memory)
+STREAMING_THRESHOLD_BYTES = 50 * 1024 * 1024
+
 router = APIRouter()
 
 
@@ -61,6 +78,28 @@ def get_organization(org_id: uuid.UUID, db: Session) -> Organization:
     return org
 
 
+def resolve_customer_risk(
+    org_id: uuid.UUID,
+    customer_id: str,
+    churn_probability: Optional[float],
+    risk_level: Optional[str]
+):
+    """Helper to fill omitted churn_probability/risk_level from the score index or raise 404."""
+    if churn_probability is not None and risk_level is not None:
+        return churn_probability, risk_level
+
+    score = lookup_customer_score(str(org_id), customer_id)
+    if score is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No churn score for customer {customer_id}; pass churn_probability and risk_level"
+        )
+    return (
+        score.churn_probability if churn_probability is None else churn_probability,
+        score.risk_segment if risk_level is None else risk_level
+    )
+
+
 @router.post("/organizations/{org_id}/upload-dataset")
 async def upload_dataset(
     org_id: uuid.UUID,
@@ -110,7 +149,7 @@ async def upload_dataset(
         # Read CSV to get row count
         file.file.seek(0)
         content = await file.read()
-        df = pd.read_csv(io.BytesIO(content))
+        df = load_events(content)
         row_count = len(df)
 
         # Create dataset record
@@ -148,13 +187,84 @@ async def upload_dataset(
         )
 
 
+async def engineer_features_cached(
+    csv_bytes: bytes,
+    feature_version: str,
+    has_churn_label: bool = False
+):
+    """
+    Engineer features from raw CSV bytes, reusing cached results for identical uploads.
+
+    Large V2 inputs are featurized in streaming mode, the rest in the process pool.
+    """
+    cache = FeatureCache.from_settings()
+    cache_key = feature_cache_key(csv_bytes, feature_version, has_churn_label=has_churn_label)
+    features_df = cache.get(cache_key)
+    if features_df is not None:
+        return features_df
+
+    if feature_version == "v2" and len(csv_bytes) > STREAMING_THRESHOLD_BYTES:
+        features_df = engineer_features_streaming(io.BytesIO(csv_bytes), has_churn_label=has_churn_label)
+    else:
+        df = load_events(csv_bytes)
+        features_df = engineer_features_parallel(
+            df,
+            feature_version=feature_version,
+            has_churn_label=has_churn_label,
+            max_workers=settings.FEATURE_ENGINEERING_WORKERS
+        )
+
+    await cache.put(cache_key, features_df)
+    return features_df
+
+
+async def engineer_features_profiled(
+    csv_bytes: bytes,
+    feature_version: str,
+    has_churn_label: bool = False
+):
+    """
+    Engineer features in this process with the profiler on, bypassing the cache
+    lookup and the process pool so every feature group is measured.
+
+    Returns:
+        Tuple of (features DataFrame, profiler report)
+    """
+    with FeatureProfiler(engine=feature_version) as profiler:
+        with profiler.section("load"):
+            df = load_events(csv_bytes, report=False)
+        if feature_version == "v2":
+            features_df = engineer_features_from_csv_v2_vectorized(
+                df, has_churn_label=has_churn_label, profiler=profiler
+            )
+        else:
+            features_df = engineer_features_from_csv(
+                df, has_churn_label=has_churn_label, profiler=profiler
+            )
+
+    # The result is a normal feature table, so later unprofiled runs can reuse it
+    cache_key = feature_cache_key(csv_bytes, feature_version, has_churn_label=has_churn_label)
+    await FeatureCache.from_settings().put(cache_key, features_df)
+    return features_df, profiler.report()
+
+
 async def process_features_background(
     org_id: uuid.UUID,
     dataset_id: uuid.UUID,
-    db_session: Session
+    db_session: Session,
+    incremental: bool = False,
+    profile: bool = False
 ):
     """
     Background task: Download CSV, engineer features, upload features CSV to Supabase.
+
+    With incremental=True the raw events are folded into the organization's
+    feature store and features are read back for all customers seen so far
+    (spend sums may differ from a full recomputation by a cent, see
+    IncrementalFeatureStore). Out-of-order datasets, and reads the store's
+    window cannot cover, are recomputed from the dataset's own CSV.
+    With profile=True (full recomputation only) the per-feature-group timing
+    report is stored on the raw dataset.
     """
     try:
         # Get dataset
@@ -168,24 +278,49 @@ async def process_features_background(
 
         # Download CSV from Supabase
         csv_bytes = download_from_supabase(dataset.bucket_name, dataset.file_path)
-        df = pd.read_csv(io.BytesIO(csv_bytes))
 
         # Engineer features (V2 enhanced or original)
         has_churn = dataset.has_churn_label == "True"
-        if USE_V2_ENHANCED:
-            features_df = engineer_features_from_csv_v2(df, has_churn_label=has_churn)
-        else:
-            features_df = engineer_features_from_csv(df, has_churn_label=has_churn)
+        features_df = None
+        if USE_V2_ENHANCED and incremental and not has_churn:
+            # Only customers present in this dataset are updated in the store
+            store = IncrementalFeatureStore.load(str(org_id))
+            try:
+                store.apply_events(load_events(csv_bytes), batch_id=str(dataset_id))
+            except OutOfOrderBatchError as e:
+                # The store only folds in newer events; recompute this dataset instead
+                print(f"Incremental features unavailable: {str(e)}")
+            else:
+                store.save()
+                try:
+                    features_df = store.read_features()
+                except FeatureWindowError as e:
+                    # E.g. events dated after today; the full path handles those
+                    print(f"Incremental features unavailable: {str(e)}")
+
+        if features_df is None and profile:
+            features_df, dataset.feature_profile = await engineer_features_profiled(
+                csv_bytes,
+                feature_version="v2" if USE_V2_ENHANCED else "v1",
+                has_churn_label=has_churn
+            )
+        elif features_df is None:
+            features_df = await engineer_features_cached(
+                csv_bytes,
+                feature_version="v2" if USE_V2_ENHANCED else "v1",
+                has_churn_label=has_churn
+            )
 
-        # Convert to CSV bytes
-        features_csv = features_df.to_csv(index=False).encode('utf-8')
+        # Serialize as Parquet (typed, columnar) unless configured for CSV
+        features_filename = f"features_{dataset_id}{artifact_extension()}"
+        features_bytes = dataframe_to_bytes(features_df, features_filename)
 
-        # Upload features CSV to Supabase
+        # Upload features artifact to Supabase
         features_result = await upload_dataframe_to_supabase(
-            df_csv_bytes=features_csv,
+            df_csv_bytes=features_bytes,
             bucket_name="utils",
             folder=f"org_{org_id}/features",
-            filename=f"features_{dataset_id}.csv"
+            filename=features_filename
         )
 
         # Store features dataset record
@@ -219,6 +354,8 @@ async def process_features(
     org_id: uuid.UUID,
     dataset_id: uuid.UUID,
     background_tasks: BackgroundTasks,
+    incremental: bool = False,
+    profile: bool = False,
     db: Session = Depends(get_db)
 ):
     """
@@ -231,6 +368,11 @@ async def process_features(
         org_id: Organization UUID
         dataset_id: Dataset UUID from Step 1
         background_tasks: FastAPI background tasks
+        incremental: Update the organization's feature store with this dataset's events
+            instead of recomputing from this CSV alone (ignored for labeled datasets; a
+            dataset with events before the store's latest day is recomputed alone)
+        profile: Record wall time and peak memory per feature group; the report
+            is returned by GET .../process-features (ignored for incremental runs)
         db: Database session
 
     Returns:
@@ -252,7 +394,7 @@ async def process_features(
         )
 
     # Add background task
-    background_tasks.add_task(process_features_background, org_id, dataset_id, db)
+    background_tasks.add_task(process_features_background, org_id, dataset_id, db, incremental, profile)
 
     return {
         "success": True,
@@ -261,133 +403,103 @@ async def process_features(
     }
 
 
-async def train_model_background(
+@router.get("/organizations/{org_id}/datasets/{dataset_id}/process-features")
+async def get_process_features_status(
     org_id: uuid.UUID,
-    model_type: str,
-    churn_threshold_days: int,
-    db_session: Session
+    dataset_id: uuid.UUID,
+    db: Session = Depends(get_db)
 ):
     """
-    Background task: Train churn prediction model.
+    Get feature processing status for a raw dataset.
+
+    Includes the per-feature-group timing report (`feature_profile`) when
+    features were processed with profile=true.
     """
-    try:
-        # Create model metadata record
-        model_metadata = ModelMetadata(
-            id=uuid.uuid4(),
-            organization_id=org_id,
-            model_path="",  # Will update after training
-            model_type=model_type,
-            status="training"
-        )
-        db_session.add(model_metadata)
-        db_session.commit()
-        db_session.refresh(model_metadata)
-
-        # Get latest features dataset
-        features_dataset = db_session.query(Dataset).filter(
-            Dataset.organization_id == org_id,
-            Dataset.dataset_type == "features",
-            Dataset.status == "ready"
-        ).order_by(Dataset.uploaded_at.desc()).first()
-
-        if not features_dataset:
-            model_metadata.status = "failed"
-            model_metadata.error_message = "No features dataset found"
-            db_session.commit()
-            return
+    org = get_organization(org_id, db)
+
+    dataset = db.query(Dataset).filter(
+        Dataset.id == dataset_id,
+        Dataset.organization_id == org_id,
+        Dataset.dataset_type == "raw"
+    ).first()
 
-        # Download features CSV
-        features_bytes = download_from_supabase(
-            features_dataset.bucket_name,
-            features_dataset.file_path
+    if not dataset:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Dataset {dataset_id} not found"
         )
-        features_df = pd.read_csv(io.BytesIO(features_bytes))
-
-        # If no churn label, get raw dataset and generate labels
-        if features_dataset.has_churn_label != "True":
-            # Get raw dataset
-            raw_dataset = db_session.query(Dataset).filter(
-                Dataset.organization_id == org_id,
-                Dataset.dataset_type == "raw",
-                Dataset.status.in_(["uploaded", "features_ready"])
-            ).order_by(Dataset.uploaded_at.desc()).first()
-
-            if not raw_dataset:
-                model_metadata.status = "failed"
-                model_metadata.error_message = "No raw dataset found for labeling"
-                db_session.commit()
-                return
-
-            # Download raw CSV
-            raw_bytes = download_from_supabase(raw_dataset.bucket_name, raw_dataset.file_path)
-            raw_df = pd.read_csv(io.BytesIO(raw_bytes))
-
-            # Generate training dataset with labels
-            from app.services.feature_engineering_csv import create_training_dataset_from_csv
-            training_df = create_training_dataset_from_csv(raw_df, churn_threshold_days)
 
-        else:
-            training_df = features_df
+    return {
+        "dataset_id": str(dataset.id),
+        "status": dataset.status,
+        "row_count": dataset.row_count,
+        "feature_profile": dataset.feature_profile
+    }
 
-        # Train model (V2 enhanced or original)
-        if USE_V2_ENHANCED:
-            # V2: Use enhanced features and auto model selection
-            feature_cols = get_feature_columns_v2()
-            pipeline, metrics = train_churn_model_v2(
-                training_df=training_df,
-                feature_columns=feature_cols,
-                model_type="auto",  # Auto-select best model
-                enable_tuning=True,  # Enable hyperparameter tuning
-                enable_scaling=True  # Enable feature scaling
-            )
-            # Save V2 model
-            model_path = save_model_v2(pipeline, str(org_id), metrics)
-        else:
-            # Original method
-            model, metrics = train_churn_model_from_dataframe(
-                training_df=training_df,
-                model_type=model_type
-            )
-            model_path = save_model_to_disk(model, str(org_id), metrics)
-
-        # Update metadata
-        model_metadata.model_path = model_path
-        model_metadata.status = "completed"
-        model_metadata.accuracy = metrics.get("accuracy")
-        model_metadata.precision = metrics.get("precision")
-        model_metadata.recall = metrics.get("recall")
-        model_metadata.f1_score = metrics.get("f1_score")
-        model_metadata.roc_auc = metrics.get("roc_auc")
-        model_metadata.feature_importance = metrics.get("feature_importance")
-        model_metadata.training_samples = metrics.get("total_samples")
-        model_metadata.churn_rate = metrics.get("churn_rate")
-        db_session.commit()
 
+@router.get("/organizations/{org_id}/datasets/{dataset_id}/export-csv")
+async def export_dataset_csv(
+    org_id: uuid.UUID,
+    dataset_id: uuid.UUID,
+    db: Session = Depends(get_db)
+):
+    """
+    Download a dataset as CSV, whatever format it is stored in.
+
+    Features datasets are stored as Parquet; this converts them back to CSV
+    for spreadsheets and other tools.
+    """
+    org = get_organization(org_id, db)
+
+    dataset = db.query(Dataset).filter(
+        Dataset.id == dataset_id,
+        Dataset.organization_id == org_id
+    ).first()
+
+    if not dataset:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Dataset {dataset_id} not found"
+        )
+
+    try:
+        df = download_dataframe_from_supabase(dataset.bucket_name, dataset.file_path)
     except Exception as e:
-        model_metadata.status = "failed"
-        model_metadata.error_message = str(e)
-        db_session.commit()
-        print(f"Error training model: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error exporting dataset: {str(e)}"
+        )
+
+    csv_filename = dataset.filename.rsplit(".", 1)[0] + ".csv"
+    return Response(
+        content=df.to_csv(index=False),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{csv_filename}"'}
+    )
 
 
 @router.post("/organizations/{org_id}/train")
 async def train_model(
     org_id: uuid.UUID,
     model_type: str = "logistic_regression",
-    background_tasks: BackgroundTasks = None,
+    incremental: bool = False,
     db: Session = Depends(get_db)
 ):
     """
-    Step 3: Train churn prediction model (background task).
+    Step 3: Train churn prediction model (training worker process).
 
     Downloads the latest features dataset, trains a model, and saves it locally.
     If the dataset doesn't have churn labels, it will auto-generate them based on
     the organization's churn threshold.
 
+    Training runs in the training job pool, outside the API process; follow it
+    with GET .../training-status and stop it with POST .../train/{model_id}/cancel.
+
     Args:
         org_id: Organization UUID
         model_type: Model type ('logistic_regression', 'random_forest', 'gradient_boosting')
-        background_tasks: FastAPI background tasks
+        incremental: Warm-start from the current model with its tuned hyperparameters
+            instead of searching from scratch; training-status then reports drift_report
         db: Database session
 
     Returns:
@@ -403,22 +515,87 @@ async def train_model(
             detail=f"Invalid model_type. Must be one of: {', '.join(valid_models)}"
         )
 
-    # Add background task
-    background_tasks.add_task(
-        train_model_background,
+    # Create model metadata record; the worker picks it up from the queue
+    model_metadata = ModelMetadata(
+        id=uuid.uuid4(),
+        organization_id=org_id,
+        model_path="",  # Will update after training
+        model_type=model_type,
+        status="queued"
+    )
+    db.add(model_metadata)
+    db.commit()
+
+    get_training_runner().submit(
+        model_metadata.id,
         org_id,
         model_type,
         org.churn_threshold_days,
-        db
+        use_v2=USE_V2_ENHANCED,
+        incremental=incremental
     )
 
     return {
         "success": True,
-        "message": "Model training started in background",
+        "message": "Model training queued",
+        "model_id": str(model_metadata.id),
         "model_type": model_type
     }
 
 
+@router.post("/organizations/{org_id}/train/{model_id}/cancel")
+async def cancel_training(
+    org_id: uuid.UUID,
+    model_id: uuid.UUID,
+    db: Session = Depends(get_db)
+):
+    """
+    Cancel a queued or running training job.
+
+    Queued jobs are cancelled immediately; running jobs stop at their next
+    progress update (status 'cancelling' until then) without saving a model.
+    """
+    org = get_organization(org_id, db)
+
+    job = db.query(ModelMetadata).filter(
+        ModelMetadata.id == model_id,
+        ModelMetadata.organization_id == org_id
+    )
+
+    # Conditional update, so a job that completes or fails meanwhile keeps its status
+    marked = job.filter(
+        ModelMetadata.status.in_(["queued", "training"])
+    ).update({"status": "cancelling"}, synchronize_session=False)
+    db.commit()
+
+    if not marked:
+        metadata = job.first()
+        if not metadata:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Training job {model_id} not found"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Training job is not running (status: {metadata.status})"
+        )
+
+    job_status = "cancelling"
+    if get_training_runner().cancel(model_id):
+        # The job never started, so no worker will resolve 'cancelling'
+        job.filter(ModelMetadata.status == "cancelling").update(
+            {"status": "cancelled"}, synchronize_session=False
+        )
+        db.commit()
+        job_status = "cancelled"
+
+    return {
+        "success": True,
+        "model_id": str(model_id),
+        "status": job_status
+    }
+
+
 @router.get("/organizations/{org_id}/training-status")
 async def get_training_status(
     org_id: uuid.UUID,
@@ -442,7 +619,9 @@ async def get_training_status(
         }
 
     return {
+        "model_id": str(metadata.id),
         "status": metadata.status,
+        "progress": metadata.progress,
         "model_type": metadata.model_type,
         "accuracy": float(metadata.accuracy) if metadata.accuracy else None,
         "precision": float(metadata.precision) if metadata.precision else None,
@@ -451,11 +630,28 @@ async def get_training_status(
         "roc_auc": float(metadata.roc_auc) if metadata.roc_auc else None,
         "training_samples": metadata.training_samples,
         "churn_rate": float(metadata.churn_rate) if metadata.churn_rate else None,
+        "drift_report": metadata.drift_report,
         "trained_at": metadata.trained_at,
         "error_message": metadata.error_message
     }
 
 
+@router.get("/model-registry")
+async def get_model_registry_stats():
+    """
+    Model cache counters of this API process (hits, misses, evictions, reloads).
+    """
+    return get_model_registry().stats()
+
+
+@router.get("/prediction-batcher")
+async def get_prediction_batcher_stats():
+    """
+    Micro-batching stats of this API process: batch-size and queue-wait histograms.
+    """
+    return get_prediction_batcher().stats()
+
+
 @router.post("/organizations/{org_id}/predict")
 async def predict_churn(
     org_id: uuid.UUID,
@@ -501,12 +697,15 @@ async def predict_churn(
         trans_df["customer_id"] = customer_id
 
         # Load model and predict (V2 or original)
-        if USE_V2_ENHANCED:
-            pipeline = load_model_v2(str(org_id))
+        if USE_V2_ENHANCED and settings.PREDICT_MICRO_BATCHING:
+            # Scored together with concurrent requests for this organization
+            return await get_prediction_batcher().predict(str(org_id), customer_id, trans_df)
+        elif USE_V2_ENHANCED:
+            pipeline = get_model_v2(str(org_id))
             features_df = engineer_features_from_csv_v2(trans_df, has_churn_label=False)
             predictions = predict_v2(pipeline, features_df)
         else:
-            model = load_model_from_disk(str(org_id))
+            model = get_model_from_disk(str(org_id))
             features_df = engineer_features_from_csv(trans_df, has_churn_label=False)
             predictions = predict_from_features(model, features_df)
 
@@ -542,52 +741,35 @@ async def process_bulk_predictions_background(
         batch.status = "processing"
         db_session.commit()
 
-        # Read CSV
-        df = pd.read_csv(io.BytesIO(csv_content))
-
         # Load model and predict (V2 or original)
         if USE_V2_ENHANCED:
-            pipeline = load_model_v2(str(org_id))
-            features_df = engineer_features_from_csv_v2(df, has_churn_label=False)
+            pipeline = get_model_v2(str(org_id))
+            features_df = await engineer_features_cached(csv_content, feature_version="v2")
             predictions_df = predict_v2(pipeline, features_df)
             feature_cols = get_feature_columns_v2()
         else:
-            model = load_model_from_disk(str(org_id))
+            df = load_events(csv_content)
+            model = get_model_from_disk(str(org_id))
             features_df = engineer_features_from_csv(df, has_churn_label=False)
             predictions_df = predict_from_features(model, features_df)
             feature_cols = FEATURE_COLUMNS
 
-        # Store predictions in database
-        risk_distribution = {"Low": 0, "Medium": 0, "High": 0, "Critical": 0}
+        # Store predictions in database (one join, COPY in chunks)
+        risk_distribution = store_batch_predictions(
+            db_session, batch_id, org_id, predictions_df, features_df, feature_cols
+        )
 
-        for _, row in predictions_df.iterrows():
-            # Get features for this customer
-            customer_features_df = features_df[features_df["customer_id"] == row["customer_id"]]
-            if len(customer_features_df) > 0:
-                feature_dict = {
-                    col: float(customer_features_df[col].values[0])
-                    for col in feature_cols
-                    if col in customer_features_df.columns
-                }
-            else:
-                feature_dict = None
-
-            # Store individual prediction
-            customer_pred = CustomerPrediction(
-                id=uuid.uuid4(),
-                batch_id=batch_id,
-                organization_id=org_id,
-                external_customer_id=str(row["customer_id"]),
-                churn_probability=str(row["churn_probability"]),
-                risk_segment=row["risk_segment"],
-                features=feature_dict
+        # Store the typed predictions artifact next to the CSV export
+        predictions_filename = f"predictions_{batch_id}{artifact_extension()}"
+        if predictions_filename.endswith(".parquet"):
+            await upload_dataframe_to_supabase(
+                df_csv_bytes=dataframe_to_bytes(predictions_df, predictions_filename),
+                bucket_name="utils",
+                folder=f"org_{org_id}/predictions",
+                filename=predictions_filename
             )
-            db_session.add(customer_pred)
-
-            # Update risk distribution
-            risk_distribution[row["risk_segment"]] += 1
 
-        # Upload predictions CSV to Supabase
+        # Upload predictions CSV to Supabase (download link for users)
         predictions_csv = predictions_df.to_csv(index=False).encode('utf-8')
         output_result = await upload_dataframe_to_supabase(
             df_csv_bytes=predictions_csv,
@@ -604,11 +786,114 @@ async def process_bulk_predictions_background(
         batch.completed_at = datetime.utcnow()
         db_session.commit()
 
+        # Serve this batch's scores to the widget and churn-reason lookups
+        refresh_score_index(db_session, org_id)
+
+    except Exception as e:
+        db_session.rollback()
+        batch.status = "failed"
+        batch.error_message = str(e)
+        db_session.commit()
+        print(f"Error in bulk predictions: {str(e)}")
+
+
+async def process_bulk_predictions_streaming(
+    org_id: uuid.UUID,
+    batch_id: uuid.UUID,
+    csv_content: bytes,
+    db_session: Session
+):
+    """
+    Background task: Process bulk predictions (V2) one customer partition at a time.
+
+    Each partition's predictions are committed to the database, appended to the
+    output files and counted in batch.processed_customers before the next one
+    is scored, so results are readable while the batch is still processing.
+    """
+    batch = db_session.query(PredictionBatch).filter(PredictionBatch.id == batch_id).first()
+    if not batch:
+        return
+
+    work_dir = tempfile.mkdtemp(prefix="bulk_predictions_")
+    try:
+        batch.status = "processing"
+        batch.processed_customers = 0
+        db_session.commit()
+
+        pipeline = get_model_v2(str(org_id))
+        feature_cols = get_feature_columns_v2()
+        output = PredictionOutputWriter(
+            work_dir,
+            f"predictions_{batch_id}",
+            parquet=artifact_extension() == ".parquet"
+        )
+
+        risk_distribution = {"Low": 0, "Medium": 0, "High": 0, "Critical": 0}
+        probability_sum = 0.0
+        processed = 0
+
+        chunks = iter_prediction_chunks(
+            io.BytesIO(csv_content),
+            pipeline,
+            num_partitions=partitions_for(batch.total_customers)
+        )
+        for features_df, predictions_df in chunks:
+            chunk_distribution = store_batch_predictions(
+                db_session, batch_id, org_id, predictions_df, features_df, feature_cols
+            )
+            output.write(predictions_df)
+
+            for segment, count in chunk_distribution.items():
+                risk_distribution[segment] += count
+            probability_sum += float(predictions_df["churn_probability"].sum())
+            processed += len(predictions_df)
+
+            batch.processed_customers = processed
+            batch.risk_distribution = dict(risk_distribution)
+            db_session.commit()
+        output.close()
+
+        # Store the typed predictions artifact next to the CSV export
+        if output.parquet_path is not None and processed > 0:
+            with open(output.parquet_path, "rb") as f:
+                await upload_dataframe_to_supabase(
+                    df_csv_bytes=f.read(),
+                    bucket_name="utils",
+                    folder=f"org_{org_id}/predictions",
+                    filename=f"predictions_{batch_id}.parquet"
+                )
+
+        # Upload predictions CSV to Supabase (download link for users)
+        predictions_csv = b""
+        if processed > 0:
+            with open(output.csv_path, "rb") as f:
+                predictions_csv = f.read()
+        output_result = await upload_dataframe_to_supabase(
+            df_csv_bytes=predictions_csv,
+            bucket_name="utils",
+            folder=f"org_{org_id}/predictions",
+            filename=f"predictions_{batch_id}.csv"
+        )
+
+        # Update batch with results
+        batch.status = "completed"
+        batch.output_file_url = output_result["file_url"]
+        batch.avg_churn_probability = str(probability_sum / processed) if processed else None
+        batch.risk_distribution = risk_distribution
+        batch.completed_at = datetime.utcnow()
+        db_session.commit()
+
+        # Serve this batch's scores to the widget and churn-reason lookups
+        refresh_score_index(db_session, org_id)
+
     except Exception as e:
+        db_session.rollback()
         batch.status = "failed"
         batch.error_message = str(e)
         db_session.commit()
         print(f"Error in bulk predictions: {str(e)}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
 
 
 @router.post("/organizations/{org_id}/predict-bulk")
@@ -657,20 +942,31 @@ async def predict_bulk(
             detail="File must be a CSV"
         )
 
+    streaming = USE_V2_ENHANCED and settings.BULK_PREDICTION_STREAMING
+
     try:
         # Read CSV content
         csv_content = await file.read()
-        df = pd.read_csv(io.BytesIO(csv_content))
 
-        # Validate CSV has required columns
-        if "customer_id" not in df.columns or "event_date" not in df.columns:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="CSV must contain 'customer_id' and 'event_date' columns"
-            )
+        if streaming:
+            # Validate and count customers without loading the whole CSV
+            try:
+                total_customers = count_csv_customers(csv_content)
+            except ValueError as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        else:
+            df = load_events(csv_content)
+
+            # Validate CSV has required columns
+            if "customer_id" not in df.columns or not has_event_dates(df):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="CSV must contain 'customer_id' and 'event_date' columns"
+                )
 
-        # Count unique customers
-        total_customers = df["customer_id"].nunique()
+            # Count unique customers
+            total_customers = df["customer_id"].nunique()
+            del df
 
         # Upload input CSV to Supabase
         file.file.seek(0)
@@ -696,7 +992,7 @@ async def predict_bulk(
 
         # Process predictions in background
         background_tasks.add_task(
-            process_bulk_predictions_background,
+            process_bulk_predictions_streaming if streaming else process_bulk_predictions_background,
             org_id,
             batch.id,
             csv_content,
@@ -758,6 +1054,7 @@ async def get_prediction_batch(
         "batch_name": batch.batch_name,
         "status": batch.status,
         "total_customers": batch.total_customers,
+        "processed_customers": batch.processed_customers,
         "predictions_generated": predictions_count,
         "input_file_url": batch.input_file_url,
         "output_file_url": batch.output_file_url,
@@ -956,8 +1253,8 @@ async def get_prediction_customers(
 async def analyze_customer_churn_reason(
     org_id: uuid.UUID,
     customer_id: str,
-    churn_probability: float,
-    risk_level: str,
+    churn_probability: Optional[float] = None,
+    risk_level: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """
@@ -966,8 +1263,8 @@ async def analyze_customer_churn_reason(
     Args:
         org_id: Organization UUID
         customer_id: External customer ID
-        churn_probability: Churn probability (0-1)
-        risk_level: Risk level (Low/Medium/High/Critical)
+        churn_probability: Churn probability (0-1); latest indexed score if omitted
+        risk_level: Risk level (Low/Medium/High/Critical); latest indexed score if omitted
 
     Returns:
         {
@@ -980,6 +1277,7 @@ async def analyze_customer_churn_reason(
     from app.services.behavior_analysis.llm_suggestions import analyze_churn_reason
 
     get_organization(org_id, db)
+    churn_probability, risk_level = resolve_customer_risk(org_id, customer_id, churn_probability, risk_level)
 
     try:
         result = analyze_churn_reason(
@@ -1013,8 +1311,8 @@ async def analyze_customer_churn_reason(
 async def generate_customer_personalized_email(
     org_id: uuid.UUID,
     customer_id: str,
-    churn_probability: float,
-    risk_level: str,
+    churn_probability: Optional[float] = None,
+    risk_level: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """
@@ -1023,8 +1321,8 @@ async def generate_customer_personalized_email(
     Args:
         org_id: Organization UUID
         customer_id: External customer ID
-        churn_probability: Churn probability (0-1)
-        risk_level: Risk level (Low/Medium/High/Critical)
+        churn_probability: Churn probability (0-1); latest indexed score if omitted
+        risk_level: Risk level (Low/Medium/High/Critical); latest indexed score if omitted
 
     Returns:
         {
@@ -1036,6 +1334,7 @@ async def generate_customer_personalized_email(
     from app.services.behavior_analysis.llm_suggestions import generate_personalized_email
 
     get_organization(org_id, db)
+    churn_probability, risk_level = resolve_customer_risk(org_id, customer_id, churn_probability, risk_level)
 
     try:
         result = generate_personalized_email(
@@ -20,6 +20,7 @@ from app.services.segmentation import (
     batch_segment_customers_from_db,
     SEGMENT_DEFINITIONS
 )
+from app.services.score_index import refresh_score_index
 
 
 router = APIRouter()
@@ -60,6 +61,9 @@ def segment_customers(
         # Run batch segmentation from database (synchronous - will block until complete)
         result = batch_segment_customers_from_db(org_id, batch_id, db)
 
+        # Indexed scores carry the customer segment
+        refresh_score_index(db, org_id)
+
         return BatchSegmentResponse(
             success=result['success'],
             total_customers=result['total_customers'],
@@ -12,6 +12,7 @@ from app.db.models.organization import Organization
 from app.db.models.customer import Customer
 from app.db.models.customer_segment import CustomerSegment
 from app.db.models.churn_prediction import ChurnPrediction
+from app.services.score_index import lookup_customer_score
 from app.services.segmentation.rules import SEGMENT_DEFINITIONS
 from app.services.behavior_analysis.widget_message_generator import get_or_generate_widget_message
 
@@ -152,6 +153,53 @@ def generate_offer_content(segment: str, churn_risk: str, customer_name: str) ->
     }
 
 
+def _customer_offer(
+    org_id: uuid.UUID,
+    segment: str,
+    churn_risk: str,
+    customer_email: str,
+    personalized: bool,
+    db: Session
+) -> dict:
+    """
+    Offer for a known customer: LLM message when personalized (and available),
+    static segment-based template otherwise.
+    """
+    # Get customer name from email
+    customer_name = get_customer_name_from_email(customer_email)
+
+    print(f"[Widget API] Customer segment: {segment}, Risk: {churn_risk}")
+
+    # If personalized=true, try to get LLM-generated message
+    if personalized:
+        print(f"[Widget API] Generating LLM message for {segment}/{churn_risk}")
+        llm_message = get_or_generate_widget_message(
+            organization_id=str(org_id),
+            segment=segment,
+            risk_level=churn_risk,
+            db=db
+        )
+
+        if llm_message:
+            # Return LLM-generated personalized message
+            print(f"[Widget API] ✅ Returning LLM message for existing customer: {llm_message.get('title', 'N/A')}")
+            return {
+                'show_popup': True,
+                **llm_message
+            }
+        # If LLM fails, fall through to static template
+        print(f"[Widget API] ❌ LLM generation failed, falling back to static template")
+
+    # Generate static segment-based offer (fallback or default)
+    print(f"[Widget API] Using static template for {segment}/{churn_risk}")
+    offer_data = generate_offer_content(segment, churn_risk, customer_name)
+
+    return {
+        'show_popup': True,
+        **offer_data
+    }
+
+
 @router.get("/offers")
 async def get_widget_offers(
     business_id: str = Query(..., description="Organization UUID"),
@@ -193,6 +241,22 @@ async def get_widget_offers(
                 'error': 'Invalid business_id format'
             }
 
+        # Precomputed latest score: an indexed customer needs no database lookups
+        # for the static offer (the index only exists for organizations with
+        # completed batches); personalized offers still read cached LLM messages
+        score = lookup_customer_score(str(org_id), customer_email)
+        if score is not None:
+            print(f"[Widget API] Customer found in score index")
+            # Same segment and risk level as the CustomerSegment lookup below
+            return _customer_offer(
+                org_id,
+                segment=score.segment or 'Promising',
+                churn_risk=score.segment_risk_level or 'Low',
+                customer_email=customer_email,
+                personalized=personalized,
+                db=db
+            )
+
         # Check if organization exists
         org = db.query(Organization).filter(Organization.id == org_id).first()
         if not org:
@@ -267,39 +331,7 @@ async def get_widget_offers(
         segment = segment_data.segment if segment_data else 'Promising'
         churn_risk = segment_data.churn_risk_level if segment_data else 'Low'
 
-        # Get customer name from email
-        customer_name = get_customer_name_from_email(customer_email)
-
-        print(f"[Widget API] Customer segment: {segment}, Risk: {churn_risk}")
-
-        # If personalized=true, try to get LLM-generated message
-        if personalized:
-            print(f"[Widget API] Generating LLM message for {segment}/{churn_risk}")
-            llm_message = get_or_generate_widget_message(
-                organization_id=str(org_id),
-                segment=segment,
-                risk_level=churn_risk,
-                db=db
-            )
-
-            if llm_message:
-                # Return LLM-generated personalized message
-                print(f"[Widget API] ✅ Returning LLM message for existing customer: {llm_message.get('title', 'N/A')}")
-                return {
-                    'show_popup': True,
-                    **llm_message
-                }
-            # If LLM fails, fall through to static template
-            print(f"[Widget API] ❌ LLM generation failed, falling back to static template")
-
-        # Generate static segment-based offer (fallback or default)
-        print(f"[Widget API] Using static template for {segment}/{churn_risk}")
-        offer_data = generate_offer_content(segment, churn_risk, customer_name)
-
-        return {
-            'show_popup': True,
-            **offer_data
-        }
+        return _customer_offer(org_id, segment, churn_risk, customer_email, personalized, db)
         
     except Exception as e:
         # Log error but don't expose internal details to public endpoint
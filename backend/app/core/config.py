@@ -35,4 +35,50 @@ class Settings(BaseSettings):
     SSLCOMMERZ_CALLBACK_URL: str = os.getenv("SSLCOMMERZ_CALLBACK_URL", "http://localhost:5173")
     BACKEND_URL: str = os.getenv("BACKEND_URL", "http://localhost:8000")
 
+    # Feature engineering
+    FEATURE_ENGINEERING_WORKERS: int = int(os.getenv("FEATURE_ENGINEERING_WORKERS", "1"))  # >1 enables the process pool
+
+    FEATURE_COMPUTE_MODE: str = os.getenv("FEATURE_COMPUTE_MODE", "python")  # 'python' or 'sql' (push-down to Postgres)
+
+    # Per-customer feature kernels run as numba loops when numba is installed; false forces NumPy
+    FEATURE_KERNELS_NUMBA: bool = os.getenv("FEATURE_KERNELS_NUMBA", "true").lower() == "true"
+
+    # Feature cache (keyed by raw dataset hash + feature parameters)
+    FEATURE_CACHE_DIR: str = os.getenv("FEATURE_CACHE_DIR", "feature_cache")
+    FEATURE_CACHE_MAX_MB: int = int(os.getenv("FEATURE_CACHE_MAX_MB", "1024"))
+    FEATURE_CACHE_BUCKET: str = os.getenv("FEATURE_CACHE_BUCKET", "")  # Empty disables the remote tier
+
+    # Training job worker processes (models train outside the API process)
+    TRAINING_WORKERS: int = int(os.getenv("TRAINING_WORKERS", "1"))
+
+    # Model selection search: 'grid', 'shared' or 'halving' (see ml_training_v2.SEARCH_MODES)
+    MODEL_SEARCH_MODE: str = os.getenv("MODEL_SEARCH_MODE", "grid")
+
+    # Fit on growing stratified subsamples until validation ROC-AUC plateaus
+    TRAINING_SUBSAMPLE: bool = os.getenv("TRAINING_SUBSAMPLE", "false").lower() == "true"
+
+    # From this many training rows auto model selection only tries the histogram booster
+    HIST_GRADIENT_BOOSTING_MIN_ROWS: int = int(os.getenv("HIST_GRADIENT_BOOSTING_MIN_ROWS", "100000"))
+
+    # Churn probability thresholds between the Low/Medium/High/Critical risk segments
+    CHURN_RISK_THRESHOLDS: str = os.getenv("CHURN_RISK_THRESHOLDS", "0.3,0.5,0.7")
+
+    # Bulk predictions score the upload one customer partition at a time (V2)
+    BULK_PREDICTION_STREAMING: bool = os.getenv("BULK_PREDICTION_STREAMING", "true").lower() == "true"
+
+    # Single-customer V2 predictions are micro-batched per organization
+    PREDICT_MICRO_BATCHING: bool = os.getenv("PREDICT_MICRO_BATCHING", "true").lower() == "true"
+    PREDICT_BATCH_MAX_SIZE: int = int(os.getenv("PREDICT_BATCH_MAX_SIZE", "64"))
+    PREDICT_BATCH_MAX_WAIT_MS: float = float(os.getenv("PREDICT_BATCH_MAX_WAIT_MS", "5"))
+
+    # Serving artifacts walk tree ensembles with numba when installed; false forces NumPy
+    MODEL_ARTIFACT_NUMBA: bool = os.getenv("MODEL_ARTIFACT_NUMBA", "true").lower() == "true"
+
+    # Loaded models cached per API process (LRU by count and file size)
+    MODEL_REGISTRY_MAX_MODELS: int = int(os.getenv("MODEL_REGISTRY_MAX_MODELS", "32"))
+    MODEL_REGISTRY_MAX_MB: int = int(os.getenv("MODEL_REGISTRY_MAX_MB", "512"))
+
+    # Storage format for features/predictions artifacts: 'parquet' or 'csv'
+    ARTIFACT_FORMAT: str = os.getenv("ARTIFACT_FORMAT", "parquet")
+
 settings = Settings()
\ No newline at end of file
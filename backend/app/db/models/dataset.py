@@ -1,5 +1,5 @@
 from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Boolean
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 import uuid
 from datetime import datetime
@@ -35,6 +35,9 @@ class Dataset(Base):
     # Status
     status = Column(String, default="uploaded", nullable=False)  # uploaded, processing, ready, error
     
+    # Per-feature-group timing report from the last profiled feature run
+    feature_profile = Column(JSONB, nullable=True)
+
     # Active flag - only one active dataset per organization
     is_active = Column(Boolean, default=True, nullable=True, index=True)
 
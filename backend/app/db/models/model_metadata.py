@@ -17,8 +17,9 @@ class ModelMetadata(Base):
     model_type = Column(String, default="logistic_regression", nullable=True)  # Model type used
 
     # Training status
-    status = Column(String, default="training", nullable=False)  # training, completed, failed
+    status = Column(String, default="training", nullable=False)  # queued, training, cancelling, completed, failed, cancelled
     error_message = Column(String, nullable=True)  # Error message if training failed
+    progress = Column(JSONB, nullable=True)  # Latest progress update: stage, model family, candidate, fold
 
     # Model metrics
     accuracy = Column(Numeric(5, 4), nullable=True)
@@ -31,6 +32,7 @@ class ModelMetadata(Base):
     # Training dataset info
     training_samples = Column(Integer, nullable=True)  # Number of samples used for training
     churn_rate = Column(Numeric(5, 4), nullable=True)  # Churn rate in training data
+    drift_report = Column(JSONB, nullable=True)  # Metric drift against the previous model (incremental retraining)
 
     # Timestamps
     trained_at = Column(DateTime, default=datetime.utcnow, nullable=False)
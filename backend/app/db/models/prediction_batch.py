@@ -19,6 +19,7 @@ class PredictionBatch(Base):
     # Batch info
     batch_name = Column(String, nullable=True)  # Optional name for the batch
     total_customers = Column(Integer, nullable=False)  # Number of customers predicted
+    processed_customers = Column(Integer, nullable=True)  # Customers predicted so far (streaming batches)
 
     # File references
     input_file_url = Column(String, nullable=True)  # Supabase URL of uploaded CSV
@@ -1,5 +1,7 @@
 from fastapi import FastAPI
 from app.api.v1.api import api_router_v1
+from app.services.prediction_batcher import shutdown_prediction_batcher
+from app.services.training_jobs import shutdown_training_runner
 from fastapi.middleware.cors import CORSMiddleware
 
 app = FastAPI()
@@ -24,6 +26,16 @@ app.add_middleware(
 
 # Include routers AFTER middleware
 app.include_router(api_router_v1, prefix="/api/v1")
+@app.on_event("shutdown")
+def stop_training_workers():
+    shutdown_training_runner()
+
+
+@app.on_event("shutdown")
+async def drain_prediction_batches():
+    await shutdown_prediction_batcher()
+
+
 # Dummy Endpoint
 @app.get("/")
 async def get_welcome_message():
@@ -7,6 +7,8 @@ import numpy as np
 from typing import Dict, Any, List
 from datetime import datetime, timedelta
 
+from app.services.feature_kernels import timeline_slope
+
 
 def analyze_banking_behavior(timeline: pd.DataFrame) -> Dict[str, Any]:
     """
@@ -161,36 +163,21 @@ def calculate_trend(timeline: pd.DataFrame, metric_type: str, lookback_date: dat
         return 'unknown'
 
     if metric_type == 'activity':
-        # Daily activity count trend
-        daily_counts = recent_data.groupby(recent_data['event_date'].dt.date).size()
-        if len(daily_counts) < 2:
-            return 'stable'
-
-        # Simple linear regression slope
-        x = np.arange(len(daily_counts))
-        y = daily_counts.values
-        if len(x) > 1:
-            slope = np.polyfit(x, y, 1)[0]
-            if slope > 0.1:
-                return 'increasing'
-            elif slope < -0.1:
-                return 'declining'
+        # Linear regression slope of daily activity counts (active days only)
+        slope = timeline_slope(recent_data['event_date'])
+        if slope > 0.1:
+            return 'increasing'
+        elif slope < -0.1:
+            return 'declining'
         return 'stable'
 
     elif metric_type == 'value':
-        # Transaction value trend
-        daily_values = recent_data.groupby(recent_data['event_date'].dt.date)['amount'].sum()
-        if len(daily_values) < 2:
-            return 'stable'
-
-        x = np.arange(len(daily_values))
-        y = daily_values.values
-        if len(x) > 1:
-            slope = np.polyfit(x, y, 1)[0]
-            if slope > 10:
-                return 'increasing'
-            elif slope < -10:
-                return 'declining'
+        # Transaction value trend (daily totals, active days only)
+        slope = timeline_slope(recent_data['event_date'], weights=recent_data['amount'])
+        if slope > 10:
+            return 'increasing'
+        elif slope < -10:
+            return 'declining'
         return 'stable'
 
     return 'stable'
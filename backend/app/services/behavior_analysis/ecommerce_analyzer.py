@@ -7,6 +7,8 @@ import numpy as np
 from typing import Dict, Any, List
 from datetime import datetime, timedelta
 
+from app.services.feature_kernels import timeline_slope
+
 
 def analyze_ecommerce_behavior(timeline: pd.DataFrame) -> Dict[str, Any]:
     """
@@ -198,23 +200,12 @@ def calculate_purchase_velocity(timeline: pd.DataFrame, lookback_date: datetime)
     if len(recent_purchases) < 2:
         return 'unknown'
 
-    # Weekly purchase counts
-    weekly_counts = recent_purchases.groupby(
-        pd.Grouper(key='event_date', freq='W')
-    ).size()
-
-    if len(weekly_counts) < 2:
-        return 'stable'
-
-    x = np.arange(len(weekly_counts))
-    y = weekly_counts.values
-
-    if len(x) > 1:
-        slope = np.polyfit(x, y, 1)[0]
-        if slope > 0.5:
-            return 'increasing'
-        elif slope < -0.5:
-            return 'declining'
+    # Slope of weekly purchase counts (weeks without purchases count as 0)
+    slope = timeline_slope(recent_purchases['event_date'], freq='W', dense=True)
+    if slope > 0.5:
+        return 'increasing'
+    elif slope < -0.5:
+        return 'declining'
 
     return 'stable'
 
@@ -227,23 +218,14 @@ def calculate_value_trend(timeline: pd.DataFrame, lookback_date: datetime) -> st
     if len(recent_purchases) < 2:
         return 'unknown'
 
-    # Weekly purchase values
-    weekly_values = recent_purchases.groupby(
-        pd.Grouper(key='event_date', freq='W')
-    )['amount'].sum()
-
-    if len(weekly_values) < 2:
-        return 'stable'
-
-    x = np.arange(len(weekly_values))
-    y = weekly_values.values
-
-    if len(x) > 1:
-        slope = np.polyfit(x, y, 1)[0]
-        if slope > 10:
-            return 'increasing'
-        elif slope < -10:
-            return 'declining'
+    # Slope of weekly purchase values (weeks without purchases count as 0)
+    slope = timeline_slope(
+        recent_purchases['event_date'], weights=recent_purchases['amount'], freq='W', dense=True
+    )
+    if slope > 10:
+        return 'increasing'
+    elif slope < -10:
+        return 'declining'
 
     return 'stable'
 
@@ -13,7 +13,8 @@ from sqlalchemy.dialects.postgresql import UUID
 from app.db.models.customer import Customer
 from app.db.models.customer_feature import CustomerFeature
 from app.db.models.churn_prediction import ChurnPrediction
-from app.services.ml_pipeline import load_model, FEATURE_COLUMNS
+from app.services.ml_pipeline import FEATURE_COLUMNS
+from app.services.model_registry import get_model
 from app.services.feature_engineering import create_feature_vector
 
 
@@ -57,7 +58,7 @@ def predict_churn(
     """
     # Load model
     try:
-        model = load_model(organization_id, model_base_path)
+        model = get_model(organization_id, model_base_path)
     except FileNotFoundError:
         raise ValueError(f"No trained model found for organization {organization_id}")
     
@@ -97,7 +98,7 @@ def batch_predict(
     """
     # Load model
     try:
-        model = load_model(organization_id, model_base_path)
+        model = get_model(organization_id, model_base_path)
     except FileNotFoundError:
         raise ValueError(f"No trained model found for organization {organization_id}")
     
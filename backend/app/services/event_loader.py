@@ -0,0 +1,211 @@
+"""
+Compact Event Loader
+Parses raw event CSVs into a memory-lean DataFrame: customer_id and event_type
+as categoricals, event dates as int32 day numbers and amounts in the narrowest
+float that holds them exactly. Repeated values (ids, dates, event types) are
+parsed once per distinct value instead of once per row.
+"""
+import io
+import sys
+import pandas as pd
+import numpy as np
+from typing import Union, BinaryIO, Tuple
+
+
+# Day number (days since 1970-01-01) column written instead of event_date
+EVENT_DAY_COLUMN = "event_day"
+
+# Sentinel day for event dates that could not be parsed
+MISSING_DAY = np.iinfo(np.int32).min
+
+CATEGORICAL_COLUMNS = ["customer_id", "event_date", "event_type"]
+
+
+def load_events(
+    source: Union[bytes, str, BinaryIO],
+    report: bool = True
+) -> pd.DataFrame:
+    """
+    Read a raw events CSV with compact dtypes.
+
+    customer_id keeps the values a plain read_csv would infer (int, float or
+    str) as categories, sorted so category codes follow groupby order.
+    event_date is replaced by `event_day` (int32, MISSING_DAY when invalid).
+
+    Args:
+        source: CSV content as bytes, a path or a binary file object
+        report: Print the memory used against the default read_csv dtypes
+
+    Returns:
+        DataFrame with compact dtypes
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+
+    df = pd.read_csv(source, dtype={col: "category" for col in CATEGORICAL_COLUMNS})
+    default_bytes = _default_memory_usage(df)
+
+    if "customer_id" in df.columns:
+        df["customer_id"] = _infer_categories(df["customer_id"])
+
+    if "event_date" in df.columns:
+        position = df.columns.get_loc("event_date")
+        event_day = _parse_day_categories(df.pop("event_date"))
+        df.insert(position, EVENT_DAY_COLUMN, event_day)
+
+    if "amount" in df.columns:
+        df["amount"] = _narrow_numeric(df["amount"])
+
+    if report:
+        compact_bytes = int(df.memory_usage(deep=True).sum())
+        print(
+            f"Loaded {len(df)} events: {compact_bytes / 1e6:.1f} MB "
+            f"(default dtypes {default_bytes / 1e6:.1f} MB, "
+            f"{default_bytes / max(compact_bytes, 1):.1f}x smaller)"
+        )
+
+    return df
+
+
+def has_event_dates(df: pd.DataFrame) -> bool:
+    return "event_date" in df.columns or EVENT_DAY_COLUMN in df.columns
+
+
+def event_datetimes(df: pd.DataFrame, errors: str = "coerce") -> pd.Series:
+    """
+    Event dates as datetime64, from either event_date or a compact event_day column.
+
+    errors follows pd.to_datetime: "coerce" gives NaT for dates that could not
+    be parsed, "raise" raises ValueError.
+    """
+    if EVENT_DAY_COLUMN in df.columns:
+        days = df[EVENT_DAY_COLUMN]
+        missing = days == MISSING_DAY
+        if errors == "raise" and missing.any():
+            raise ValueError(f"Could not parse event_date for {int(missing.sum())} events")
+        return pd.to_datetime(days.where(~missing), unit="D")
+    return pd.to_datetime(df["event_date"], errors=errors)
+
+
+def plain_customer_ids(uniques: pd.Index) -> pd.Index:
+    """
+    Decode the uniques of pd.factorize over a categorical customer_id column.
+    """
+    if isinstance(uniques, pd.CategoricalIndex):
+        return uniques.astype(uniques.categories.dtype)
+    return uniques
+
+
+def to_default_dtypes(df: pd.DataFrame, errors: str = "coerce") -> pd.DataFrame:
+    """
+    Undo load_events for code that expects plain read_csv columns.
+
+    errors="raise" raises ValueError when event dates could not be parsed
+    (see event_datetimes); by default they become NaT.
+    """
+    if not _is_compact(df):
+        return df
+
+    df = df.copy()
+    if EVENT_DAY_COLUMN in df.columns:
+        position = df.columns.get_loc(EVENT_DAY_COLUMN)
+        event_date = event_datetimes(df, errors=errors)
+        df = df.drop(columns=[EVENT_DAY_COLUMN])
+        df.insert(position, "event_date", event_date)
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(df[col].cat.categories.dtype)
+    if "amount" in df.columns and df["amount"].dtype in (np.int32, np.float32):
+        df["amount"] = df["amount"].astype(np.int64 if df["amount"].dtype == np.int32 else np.float64)
+    return df
+
+
+def _is_compact(df: pd.DataFrame) -> bool:
+    if EVENT_DAY_COLUMN in df.columns:
+        return True
+    if "amount" in df.columns and df["amount"].dtype in (np.int32, np.float32):
+        return True
+    return any(isinstance(df[col].dtype, pd.CategoricalDtype) for col in df.columns)
+
+
+def _infer_categories(values: pd.Series) -> pd.Series:
+    """
+    Convert string categories to the type read_csv would infer, sorted.
+    """
+    categories = values.cat.categories
+    try:
+        typed = pd.Index(pd.to_numeric(categories))
+    except (ValueError, TypeError):
+        typed = categories
+    else:
+        # read_csv turns integer columns with missing values into floats
+        if pd.api.types.is_integer_dtype(typed) and values.isna().any():
+            typed = typed.astype(np.float64)
+
+    codes = values.cat.codes.to_numpy()
+    if not typed.is_unique:
+        # Distinct strings can share a value ("001" and "1"); merge their codes
+        merged, typed = pd.factorize(typed)
+        codes = np.where(codes >= 0, merged[codes], -1)
+
+    codes, order = _sorted_codes(codes, typed)
+    return pd.Series(
+        pd.Categorical.from_codes(codes, typed[order]),
+        index=values.index,
+        name=values.name
+    )
+
+
+def _sorted_codes(codes: np.ndarray, categories: pd.Index) -> Tuple[np.ndarray, np.ndarray]:
+    order = categories.argsort()
+    remap = np.empty(len(order), dtype=codes.dtype)
+    remap[order] = np.arange(len(order), dtype=codes.dtype)
+    return np.where(codes >= 0, remap[codes], -1), order
+
+
+def _parse_day_categories(values: pd.Series) -> np.ndarray:
+    """
+    Parse each distinct date string once and map the day numbers back to rows.
+    """
+    parsed = pd.to_datetime(pd.Series(values.cat.categories), errors="coerce")
+    if getattr(parsed.dt, "tz", None) is not None:
+        parsed = parsed.dt.tz_localize(None)
+
+    category_days = np.full(len(parsed) + 1, MISSING_DAY, dtype=np.int32)
+    valid = parsed.notna().to_numpy()
+    category_days[:-1][valid] = parsed[valid].to_numpy().astype("datetime64[D]").astype(np.int64)
+
+    # Code -1 (missing value) picks the trailing MISSING_DAY slot
+    return category_days[values.cat.codes.to_numpy()]
+
+
+def _narrow_numeric(values: pd.Series) -> pd.Series:
+    """
+    Downcast to int32/float32 only when every value survives the round trip.
+    """
+    if pd.api.types.is_integer_dtype(values):
+        narrow = values.astype(np.int32)
+    elif pd.api.types.is_float_dtype(values):
+        narrow = values.astype(np.float32)
+    else:
+        return values
+
+    restored = narrow.astype(values.dtype)
+    if restored.equals(values):
+        return narrow
+    return values
+
+
+def _default_memory_usage(df: pd.DataFrame) -> int:
+    """
+    Bytes the frame would take with default read_csv dtypes (strings as objects).
+    """
+    total = int(df.index.memory_usage(deep=True))
+    for col in df.columns:
+        values = df[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            sizes = np.array([sys.getsizeof(str(c)) for c in values.cat.categories] + [0])
+            total += 8 * len(values) + int(sizes[values.cat.codes.to_numpy()].sum())
+        else:
+            total += int(values.memory_usage(index=False, deep=True))
+    return total
@@ -0,0 +1,167 @@
+"""
+Feature Cache
+Content-addressed cache of engineered feature tables. Entries are keyed by the
+SHA-256 of the raw dataset bytes plus the feature parameters, so re-processing
+the same upload returns the stored features instead of recomputing them.
+
+Two tiers: a bounded local directory with least-recently-used eviction, and an
+optional folder in a Supabase storage bucket shared between workers.
+"""
+import os
+import json
+import hashlib
+import tempfile
+import pandas as pd
+from typing import Optional
+from datetime import datetime, date
+from pathlib import Path
+
+from app.core.config import settings
+from app.services.storage import (
+    artifact_extension,
+    dataframe_to_bytes,
+    read_dataframe,
+    download_from_supabase,
+    upload_dataframe_to_supabase
+)
+
+
+def feature_cache_key(
+    raw_bytes: bytes,
+    feature_version: str,
+    lookback_days: int = 90,
+    current_date: Optional[date] = None,
+    has_churn_label: bool = False
+) -> str:
+    """
+    Cache key for the features of a raw dataset.
+
+    current_date defaults to today, so entries computed without an explicit
+    date stop matching the next day, when recency-based features change.
+    """
+    if current_date is None:
+        current_date = datetime.now().date()
+    if isinstance(current_date, datetime):
+        current_date = current_date.date()
+
+    params = json.dumps({
+        "feature_version": feature_version,
+        "lookback_days": lookback_days,
+        "current_date": current_date.isoformat(),
+        "has_churn_label": bool(has_churn_label)
+    }, sort_keys=True)
+
+    digest = hashlib.sha256(raw_bytes)
+    digest.update(params.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class FeatureCache:
+    """
+    Local LRU directory of feature tables, optionally backed by a storage bucket.
+
+    Entry access time is tracked with the file mtime, so the eviction order
+    survives restarts and is shared by processes using the same directory.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = "feature_cache",
+        max_bytes: int = 1024 * 1024 * 1024,
+        remote_bucket: Optional[str] = None,
+        remote_folder: str = "feature_cache"
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.remote_bucket = remote_bucket or None
+        self.remote_folder = remote_folder
+        self.extension = artifact_extension()
+
+    @classmethod
+    def from_settings(cls) -> "FeatureCache":
+        return cls(
+            cache_dir=settings.FEATURE_CACHE_DIR,
+            max_bytes=settings.FEATURE_CACHE_MAX_MB * 1024 * 1024,
+            remote_bucket=settings.FEATURE_CACHE_BUCKET
+        )
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """
+        Return the cached features for key, or None on a miss in both tiers.
+        """
+        path = self._local_path(key)
+        if path.exists():
+            try:
+                content = path.read_bytes()
+                os.utime(path)  # Mark as recently used
+                return read_dataframe(content, path.name)
+            except (OSError, ValueError):
+                path.unlink(missing_ok=True)
+
+        if self.remote_bucket:
+            try:
+                content = download_from_supabase(self.remote_bucket, self._remote_path(key))
+            except Exception:
+                return None
+            self._store_local(key, content)
+            return read_dataframe(content, path.name)
+
+        return None
+
+    async def put(self, key: str, features_df: pd.DataFrame) -> None:
+        """
+        Store features in the local tier (evicting old entries) and the remote tier.
+
+        Remote failures are ignored: the cache only ever saves work.
+        """
+        content = dataframe_to_bytes(features_df, self._local_path(key).name)
+        self._store_local(key, content)
+
+        if self.remote_bucket:
+            try:
+                await upload_dataframe_to_supabase(
+                    df_csv_bytes=content,
+                    bucket_name=self.remote_bucket,
+                    folder=self.remote_folder,
+                    filename=f"{key}{self.extension}"
+                )
+            except Exception as e:
+                print(f"Feature cache remote upload skipped: {str(e)}")
+
+    def _store_local(self, key: str, content: bytes) -> None:
+        if len(content) > self.max_bytes:
+            return
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # Write then rename, so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, self._local_path(key))
+
+        self._evict()
+
+    def _evict(self) -> None:
+        """
+        Remove least recently used entries until the directory fits in max_bytes.
+        """
+        entries = []
+        for path in self.cache_dir.glob(f"*{self.extension}"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def _local_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{self.extension}"
+
+    def _remote_path(self, key: str) -> str:
+        return f"{self.remote_folder}/{key}{self.extension}"
@@ -7,12 +7,118 @@ import numpy as np
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import and_, func, select, text
+from sqlalchemy.dialects.postgresql import UUID, insert as pg_insert
 
 from app.db.models.customer import Customer
 from app.db.models.transaction import Transaction
 from app.db.models.customer_feature import CustomerFeature
+from app.services.feature_engineering_v2 import _round_like_builtin, _to_day_ordinals
+from app.services.feature_kernels import binned_slopes, csr_offsets, window_sums
+
+
+# Feature columns stored in customer_features
+FEATURE_COLUMNS = [
+    "recency_score",
+    "frequency_score",
+    "monetary_score",
+    "engagement_score",
+    "tenure_days",
+    "activity_trend",
+    "avg_transaction_value",
+    "days_between_transactions"
+]
+
+# Transactions fetched per round-trip from the server-side cursor
+TRANSACTION_CHUNK_ROWS = 100_000
+
+# Per-customer features computed inside Postgres. Amounts are summed as exact
+# numerics; scores are returned unrounded and rounded in Python, because
+# numeric round() breaks ties differently from the builtin round().
+FEATURES_SQL = text("""
+WITH tx AS (
+    SELECT customer_id, event_date, COALESCE(amount, 0) AS amount
+    FROM transactions
+    WHERE organization_id = :organization_id
+),
+daily AS (
+    SELECT
+        customer_id,
+        COUNT(*)::float8 AS day_count,
+        (ROW_NUMBER() OVER (PARTITION BY customer_id ORDER BY event_date) - 1)::float8 AS day_index
+    FROM tx
+    WHERE event_date >= :trend_start
+    GROUP BY customer_id, event_date
+),
+trend AS (
+    SELECT customer_id, COALESCE(REGR_SLOPE(day_count, day_index), 0) AS activity_trend
+    FROM daily
+    GROUP BY customer_id
+),
+agg AS (
+    SELECT
+        customer_id,
+        COUNT(*) AS n_events,
+        :today - MAX(event_date) AS recency_days,
+        MAX(event_date) - MIN(event_date) AS tenure_days,
+        COUNT(*) FILTER (WHERE event_date >= :lookback_start) AS frequency_count,
+        COALESCE(SUM(amount) FILTER (WHERE event_date >= :lookback_start), 0)::float8 AS monetary_value,
+        COUNT(*) FILTER (WHERE event_date >= :trend_start) AS recent_count,
+        AVG(amount)::float8 AS avg_transaction_value
+    FROM tx
+    GROUP BY customer_id
+),
+scale AS (
+    SELECT COALESCE(PERCENTILE_CONT(0.95) WITHIN GROUP (ORDER BY amount) * 10, 1.0) AS max_monetary
+    FROM transactions
+    WHERE organization_id = :organization_id AND amount IS NOT NULL AND amount <> 0
+),
+features AS (
+    SELECT
+        agg.*,
+        COALESCE(trend.activity_trend, 0) AS activity_trend
+    FROM agg
+    LEFT JOIN trend ON trend.customer_id = agg.customer_id
+),
+scored AS (
+    SELECT
+        f.customer_id,
+        GREATEST(0, 100 * (1 - LEAST(f.recency_days, 365)::float8 / 365)) AS recency_score,
+        LEAST(100, 100 * (f.frequency_count::float8 / 100)) AS frequency_score,
+        CASE WHEN s.max_monetary > 0
+            THEN LEAST(100, 100 * (f.monetary_value / s.max_monetary)) ELSE 0 END AS monetary_score,
+        GREATEST(0, LEAST(100, (
+            LEAST(100, f.recent_count * 10) +
+            LEAST(50, f.tenure_days::float8 / 10) +
+            GREATEST(0, f.activity_trend * 10)
+        ) / 2.5)) AS engagement_score,
+        f.tenure_days,
+        f.activity_trend,
+        f.avg_transaction_value,
+        CASE WHEN f.n_events > 1
+            THEN f.tenure_days::float8 / (f.n_events - 1) ELSE 0 END AS days_between_transactions
+    FROM features f
+    CROSS JOIN scale s
+)
+-- Customers without transactions get all-zero features
+SELECT
+    c.id AS customer_id,
+    COALESCE(sc.recency_score, 0) AS recency_score,
+    COALESCE(sc.frequency_score, 0) AS frequency_score,
+    COALESCE(sc.monetary_score, 0) AS monetary_score,
+    COALESCE(sc.engagement_score, 0) AS engagement_score,
+    COALESCE(sc.tenure_days, 0) AS tenure_days,
+    COALESCE(sc.activity_trend, 0) AS activity_trend,
+    COALESCE(sc.avg_transaction_value, 0) AS avg_transaction_value,
+    COALESCE(sc.days_between_transactions, 0) AS days_between_transactions
+FROM customers c
+LEFT JOIN scored sc ON sc.customer_id = c.id::text
+WHERE c.organization_id = :organization_id
+""")
+
+# customer_features rows per INSERT ... ON CONFLICT statement
+# (11 bind parameters per row, Postgres allows 65535 per statement)
+UPSERT_BATCH_SIZE = 5_000
 
 
 def calculate_rfm(
@@ -331,3 +437,296 @@ def batch_calculate_features(
         db.rollback()
         raise Exception(f"Error in batch feature calculation: {str(e)}")
 
+
+
+
+def calculate_features_vectorized(
+    events: pd.DataFrame,
+    max_monetary: float,
+    lookback_days: int = 90,
+    current_date: Optional[datetime] = None
+) -> pd.DataFrame:
+    """
+    Calculate RFM and engagement features for many customers at once.
+
+    Same formulas as calculate_rfm and calculate_engagement_metrics, with the
+    monetary score normalized by max_monetary as in batch_calculate_features.
+
+    Args:
+        events: DataFrame with customer_id, event_date (date) and amount columns
+        max_monetary: Monetary value that maps to a score of 100
+        lookback_days: Lookback period for frequency/monetary calculation
+        current_date: Current date (defaults to today)
+
+    Returns:
+        DataFrame with customer_id and the FEATURE_COLUMNS, one row per customer
+    """
+    if current_date is None:
+        current_date = datetime.now().date()
+
+    codes, customer_ids = pd.factorize(events["customer_id"])
+    n_customers = len(customer_ids)
+    if n_customers == 0:
+        return pd.DataFrame(columns=["customer_id"] + FEATURE_COLUMNS)
+
+    days = _to_day_ordinals(pd.to_datetime(events["event_date"]))
+    amounts = pd.to_numeric(events["amount"], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)
+
+    order = np.lexsort((days, codes))
+    codes, days, amounts = codes[order], days[order], amounts[order]
+
+    today = np.datetime64(current_date, "D").astype(np.int64)
+    in_lookback = days >= today - lookback_days
+    in_last_30 = days >= today - 30
+
+    counts = np.bincount(codes, minlength=n_customers)
+    first_day = np.full(n_customers, np.iinfo(np.int64).max)
+    np.minimum.at(first_day, codes, days)
+    last_day = np.full(n_customers, np.iinfo(np.int64).min)
+    np.maximum.at(last_day, codes, days)
+
+    # RFM
+    recency_days = today - last_day
+    recency_score = np.maximum(0, 100 * (1 - np.minimum(recency_days, 365) / 365))
+    frequency_count = np.bincount(codes[in_lookback], minlength=n_customers)
+    frequency_score = np.minimum(100, 100 * (frequency_count / 100))
+    offsets = csr_offsets(codes, n_customers)
+    monetary_value = window_sums(offsets, days, amounts, today - lookback_days)
+    if max_monetary > 0:
+        monetary_score = np.minimum(100, 100 * (monetary_value / max_monetary))
+    else:
+        monetary_score = np.zeros(n_customers)
+
+    # Engagement
+    tenure_days = last_day - first_day
+    recent_count = np.bincount(codes[in_last_30], minlength=n_customers)
+    activity_trend = binned_slopes(csr_offsets(codes[in_last_30], n_customers), days[in_last_30])
+    avg_transaction_value = window_sums(offsets, days, amounts) / counts
+    days_between_transactions = np.divide(
+        tenure_days, counts - 1, out=np.zeros(n_customers), where=counts > 1
+    )
+    engagement_score = (
+        np.minimum(100, recent_count * 10) +
+        np.minimum(50, tenure_days / 10) +
+        np.maximum(0, activity_trend * 10)
+    ) / 2.5
+    engagement_score = np.clip(engagement_score, 0, 100)
+
+    return pd.DataFrame({
+        "customer_id": customer_ids,
+        "recency_score": _round_like_builtin(recency_score, 2),
+        "frequency_score": _round_like_builtin(frequency_score, 2),
+        "monetary_score": _round_like_builtin(monetary_score, 2),
+        "engagement_score": _round_like_builtin(engagement_score, 2),
+        "tenure_days": tenure_days.astype(np.int64),
+        "activity_trend": _round_like_builtin(activity_trend, 2),
+        "avg_transaction_value": _round_like_builtin(avg_transaction_value, 2),
+        "days_between_transactions": _round_like_builtin(days_between_transactions, 2)
+    })
+
+
+def batch_calculate_features_vectorized(
+    db: Session,
+    organization_id: UUID,
+    lookback_days: int = 90,
+    chunk_rows: int = TRANSACTION_CHUNK_ROWS
+) -> Dict[str, Any]:
+    """
+    Set-based version of batch_calculate_features.
+
+    Streams the organization's transactions once through a server-side cursor
+    ordered by customer, computes features chunk by chunk with
+    calculate_features_vectorized, and upserts customer_features with one
+    INSERT ... ON CONFLICT per batch of rows. Everything is committed once at
+    the end, since a commit would close the open cursor.
+
+    Args:
+        db: Database session
+        organization_id: Organization UUID
+        lookback_days: Lookback period for frequency calculation
+        chunk_rows: Transactions fetched per round-trip
+
+    Returns:
+        Status dictionary
+    """
+    try:
+        current_date = datetime.now().date()
+
+        # Transactions reference customers by the string form of Customer.id
+        customer_ids = {
+            str(customer_id): customer_id
+            for (customer_id,) in db.query(Customer.id).filter(
+                Customer.organization_id == organization_id
+            )
+        }
+        total_customers = len(customer_ids)
+
+        # 95th percentile of non-zero amounts, computed in the database
+        percentile = db.query(
+            func.percentile_cont(0.95).within_group(Transaction.amount)
+        ).filter(
+            Transaction.organization_id == organization_id,
+            Transaction.amount.isnot(None),
+            Transaction.amount != 0
+        ).scalar()
+        max_monetary = float(percentile) * 10 if percentile is not None else 1.0
+
+        seen = set()
+        for events in _iter_customer_transaction_chunks(db, organization_id, chunk_rows):
+            events = events[events["customer_id"].isin(list(customer_ids))]
+            features_df = calculate_features_vectorized(events, max_monetary, lookback_days, current_date)
+            features_df["customer_id"] = features_df["customer_id"].map(customer_ids)
+            seen.update(features_df["customer_id"])
+            _upsert_customer_features(db, organization_id, features_df)
+
+        # Customers without transactions get an all-zero feature row
+        missing = [customer_id for customer_id in customer_ids.values() if customer_id not in seen]
+        if missing:
+            empty_df = pd.DataFrame({"customer_id": missing})
+            for col in FEATURE_COLUMNS:
+                empty_df[col] = 0 if col == "tenure_days" else 0.0
+            _upsert_customer_features(db, organization_id, empty_df)
+
+        db.commit()
+
+        return {
+            "success": True,
+            "total_customers": total_customers,
+            "processed": total_customers,
+            "errors": []
+        }
+
+    except Exception as e:
+        db.rollback()
+        raise Exception(f"Error in batch feature calculation: {str(e)}")
+
+
+def _iter_customer_transaction_chunks(
+    db: Session,
+    organization_id: UUID,
+    chunk_rows: int
+):
+    """
+    Yield the organization's transactions as DataFrames of whole customers.
+
+    Rows are ordered by customer, so the last customer of a fetched chunk is
+    held back until the next chunk shows where it ends.
+    """
+    result = db.execute(
+        select(Transaction.customer_id, Transaction.event_date, Transaction.amount)
+        .where(Transaction.organization_id == organization_id)
+        .order_by(Transaction.customer_id)
+        .execution_options(yield_per=chunk_rows)
+    )
+
+    carry = None
+    for rows in result.partitions():
+        chunk = pd.DataFrame(rows, columns=["customer_id", "event_date", "amount"])
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        is_last_customer = (chunk["customer_id"] == chunk["customer_id"].iat[-1]).to_numpy()
+        carry = chunk[is_last_customer]
+        if not is_last_customer.all():
+            yield chunk[~is_last_customer]
+
+    if carry is not None and len(carry) > 0:
+        yield carry
+
+
+def _upsert_customer_features(
+    db: Session,
+    organization_id: UUID,
+    features_df: pd.DataFrame
+) -> None:
+    """
+    Insert or update customer_features rows, UPSERT_BATCH_SIZE rows per statement.
+    """
+    calculated_at = datetime.utcnow()
+    records = features_df[["customer_id"] + FEATURE_COLUMNS].to_dict("records")
+    for start in range(0, len(records), UPSERT_BATCH_SIZE):
+        rows = [
+            {**record, "organization_id": organization_id, "calculated_at": calculated_at}
+            for record in records[start:start + UPSERT_BATCH_SIZE]
+        ]
+        stmt = pg_insert(CustomerFeature).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CustomerFeature.customer_id],
+            set_={col: stmt.excluded[col] for col in FEATURE_COLUMNS + ["calculated_at"]}
+        )
+        db.execute(stmt)
+
+
+
+def calculate_features_sql(
+    db: Session,
+    organization_id: UUID,
+    lookback_days: int = 90,
+    current_date: Optional[datetime] = None
+) -> pd.DataFrame:
+    """
+    Calculate RFM and engagement features inside Postgres.
+
+    Aggregates run in the database (GROUP BY, FILTER, window functions), so
+    only one row per customer is returned. Same semantics as
+    batch_calculate_features: customers without transactions get zeros.
+
+    Args:
+        db: Database session
+        organization_id: Organization UUID
+        lookback_days: Lookback period for frequency/monetary calculation
+        current_date: Current date (defaults to today)
+
+    Returns:
+        DataFrame with customer_id (Customer.id) and the FEATURE_COLUMNS
+    """
+    if current_date is None:
+        current_date = datetime.now().date()
+
+    rows = db.execute(FEATURES_SQL, {
+        "organization_id": organization_id,
+        "today": current_date,
+        "lookback_start": current_date - timedelta(days=lookback_days),
+        "trend_start": current_date - timedelta(days=30)
+    }).fetchall()
+
+    features_df = pd.DataFrame(rows, columns=["customer_id"] + FEATURE_COLUMNS)
+    for col in FEATURE_COLUMNS:
+        if col == "tenure_days":
+            features_df[col] = features_df[col].astype(np.int64)
+        else:
+            values = features_df[col].to_numpy(dtype=np.float64)
+            features_df[col] = _round_like_builtin(values, 2)
+    return features_df
+
+
+def batch_calculate_features_sql(
+    db: Session,
+    organization_id: UUID,
+    lookback_days: int = 90
+) -> Dict[str, Any]:
+    """
+    Calculate features for all customers with the aggregation pushed down to Postgres.
+
+    Args:
+        db: Database session
+        organization_id: Organization UUID
+        lookback_days: Lookback period for frequency calculation
+
+    Returns:
+        Status dictionary
+    """
+    try:
+        features_df = calculate_features_sql(db, organization_id, lookback_days)
+        _upsert_customer_features(db, organization_id, features_df)
+        db.commit()
+
+        return {
+            "success": True,
+            "total_customers": len(features_df),
+            "processed": len(features_df),
+            "errors": []
+        }
+
+    except Exception as e:
+        db.rollback()
+        raise Exception(f"Error in batch feature calculation: {str(e)}")
@@ -5,15 +5,21 @@ without requiring database storage.
 """
 import pandas as pd
 import numpy as np
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
 from datetime import datetime, timedelta
 
+from app.services.event_loader import has_event_dates, to_default_dtypes
+from app.services.feature_kernels import binned_slopes, csr_offsets, gap_stats
+from app.services.feature_profiler import FeatureProfiler, profile_section
+
 
 def engineer_features_from_csv(
     df: pd.DataFrame,
     lookback_days: int = 90,
     current_date: Optional[datetime] = None,
-    has_churn_label: bool = False
+    has_churn_label: bool = False,
+    normalize_monetary: bool = True,
+    profiler: Optional[FeatureProfiler] = None
 ) -> pd.DataFrame:
     """
     Calculate RFM and engagement features from a customer transactions CSV.
@@ -30,6 +36,11 @@ def engineer_features_from_csv(
         lookback_days: Number of days to look back for frequency/monetary calculation
         current_date: Reference date for calculations (defaults to today)
         has_churn_label: Whether the CSV includes a churn_label column
+        normalize_monetary: Whether to normalize monetary_score over this DataFrame.
+            When False the raw lookback spend is left in `_monetary_value` so callers
+            featurizing partitions can normalize over all customers afterwards.
+        profiler: Records time and peak memory per feature group (prepare,
+            trend, gaps, core_rfm, normalization) when given
 
     Returns:
         DataFrame with customer-level features and optional churn labels
@@ -52,113 +63,149 @@ def engineer_features_from_csv(
     # Validate required columns
     if "customer_id" not in df.columns:
         raise ValueError("CSV must contain 'customer_id' column")
-    if "event_date" not in df.columns:
+    if not has_event_dates(df):
         raise ValueError("CSV must contain 'event_date' column")
 
-    # Convert event_date to datetime
-    df = df.copy()
-    df["event_date"] = pd.to_datetime(df["event_date"]).dt.date
+    with profile_section(profiler, "prepare"):
+        # Invalid dates fail here, as pd.to_datetime does for plain CSV columns
+        df = to_default_dtypes(df, errors="raise")
+
+        # Convert event_date to datetime
+        df = df.copy()
+        df["event_date"] = pd.to_datetime(df["event_date"]).dt.date
 
-    # Fill missing amounts with 0
-    if "amount" not in df.columns:
-        df["amount"] = 0.0
-    else:
-        df["amount"] = pd.to_numeric(df["amount"], errors="coerce").fillna(0.0)
+        # Fill missing amounts with 0
+        if "amount" not in df.columns:
+            df["amount"] = 0.0
+        else:
+            df["amount"] = pd.to_numeric(df["amount"], errors="coerce").fillna(0.0)
 
     # Calculate lookback and trend dates
     lookback_date = current_date - timedelta(days=lookback_days)
     trend_date = current_date - timedelta(days=30)
 
-    # Group by customer
-    features_list = []
-
-    for customer_id, customer_df in df.groupby("customer_id"):
-        customer_df = customer_df.sort_values("event_date")
-
-        # Basic metrics
-        first_date = customer_df["event_date"].min()
-        last_date = customer_df["event_date"].max()
-        total_transactions = len(customer_df)
-
-        # 1. Recency Score (0-100, higher = more recent)
-        recency_days = (current_date - last_date).days
-        max_recency = 365
-        recency_score = max(0, 100 * (1 - min(recency_days, max_recency) / max_recency))
-
-        # 2. Frequency Score (0-100, based on transactions in lookback period)
-        recent_df = customer_df[customer_df["event_date"] >= lookback_date]
-        frequency_count = len(recent_df)
-        max_frequency = 100  # Assume 100 transactions = 100 score
-        frequency_score = min(100, 100 * (frequency_count / max_frequency))
-
-        # 3. Monetary Score (0-100, based on total value in lookback period)
-        monetary_value = recent_df["amount"].sum()
-
-        # 4. Engagement Score (composite metric)
-        recent_30_df = customer_df[customer_df["event_date"] >= trend_date]
-        recent_activity_count = len(recent_30_df)
-
-        # 5. Tenure Days
-        tenure_days = (last_date - first_date).days
-
-        # 6. Activity Trend (slope of activity over last 30 days)
-        if len(recent_30_df) > 1:
-            daily_activity = recent_30_df.groupby("event_date").size().reset_index(name="count")
-            if len(daily_activity) > 1:
-                x = np.arange(len(daily_activity))
-                y = daily_activity["count"].values
-                activity_trend = float(np.polyfit(x, y, 1)[0])
-            else:
-                activity_trend = 0.0
-        else:
-            activity_trend = 0.0
+    # Activity slopes and gaps for all customers at once, in groupby order
+    activity_trends, mean_gaps = _time_series_features(df, trend_date, profiler)
+
+    # Per-customer loop: RFM, engagement and averages
+    with profile_section(profiler, "core_rfm"):
+        # Group by customer
+        features_list = []
+
+        for position, (customer_id, customer_df) in enumerate(df.groupby("customer_id")):
+            customer_df = customer_df.sort_values("event_date")
+
+            # Basic metrics
+            first_date = customer_df["event_date"].min()
+            last_date = customer_df["event_date"].max()
+            total_transactions = len(customer_df)
+
+            # 1. Recency Score (0-100, higher = more recent)
+            recency_days = (current_date - last_date).days
+            max_recency = 365
+            recency_score = max(0, 100 * (1 - min(recency_days, max_recency) / max_recency))
+
+            # 2. Frequency Score (0-100, based on transactions in lookback period)
+            recent_df = customer_df[customer_df["event_date"] >= lookback_date]
+            frequency_count = len(recent_df)
+            max_frequency = 100  # Assume 100 transactions = 100 score
+            frequency_score = min(100, 100 * (frequency_count / max_frequency))
+
+            # 3. Monetary Score (0-100, based on total value in lookback period)
+            monetary_value = recent_df["amount"].sum()
+
+            # 4. Engagement Score (composite metric)
+            recent_30_df = customer_df[customer_df["event_date"] >= trend_date]
+            recent_activity_count = len(recent_30_df)
+
+            # 5. Tenure Days
+            tenure_days = (last_date - first_date).days
+
+            # 6. Activity Trend (slope of daily activity over last 30 days)
+            activity_trend = float(activity_trends[position])
 
-        # 7. Average Transaction Value
-        avg_transaction_value = customer_df["amount"].mean()
+            # 7. Average Transaction Value
+            avg_transaction_value = customer_df["amount"].mean()
 
-        # 8. Days Between Transactions
-        if len(customer_df) > 1:
-            date_diffs = customer_df["event_date"].diff().apply(lambda x: x.days if pd.notna(x) else 0)
-            days_between_transactions = date_diffs[date_diffs > 0].mean()
+            # 8. Days Between Transactions (mean positive gap, 0 when there is none)
+            days_between_transactions = mean_gaps[position]
             if pd.isna(days_between_transactions):
                 days_between_transactions = 0.0
-        else:
-            days_between_transactions = 0.0
-
-        # Engagement score (composite)
-        engagement_score = (
-            min(100, recent_activity_count * 10) +  # Recent activity
-            min(50, tenure_days / 10) +  # Tenure bonus
-            max(0, activity_trend * 10)  # Trend bonus
-        ) / 2.5
-        engagement_score = max(0, min(100, engagement_score))
-
-        # Build feature dict
-        feature_dict = {
-            "customer_id": customer_id,
-            "recency_score": round(recency_score, 2),
-            "frequency_score": round(frequency_score, 2),
-            "monetary_score": 0.0,  # Will normalize after collecting all monetary values
-            "engagement_score": round(engagement_score, 2),
-            "tenure_days": int(tenure_days),
-            "activity_trend": round(activity_trend, 2),
-            "avg_transaction_value": round(avg_transaction_value, 2),
-            "days_between_transactions": round(days_between_transactions, 2),
-            "_monetary_value": monetary_value  # Temporary for normalization
-        }
-
-        # Add churn label if present
-        if has_churn_label and "churn_label" in df.columns:
-            # Get the churn label for this customer (should be same across all rows)
-            churn_label = customer_df["churn_label"].iloc[0]
-            feature_dict["churn_label"] = int(churn_label)
-
-        features_list.append(feature_dict)
+
+            # Engagement score (composite)
+            engagement_score = (
+                min(100, recent_activity_count * 10) +  # Recent activity
+                min(50, tenure_days / 10) +  # Tenure bonus
+                max(0, activity_trend * 10)  # Trend bonus
+            ) / 2.5
+            engagement_score = max(0, min(100, engagement_score))
+
+            # Build feature dict
+            feature_dict = {
+                "customer_id": customer_id,
+                "recency_score": round(recency_score, 2),
+                "frequency_score": round(frequency_score, 2),
+                "monetary_score": 0.0,  # Will normalize after collecting all monetary values
+                "engagement_score": round(engagement_score, 2),
+                "tenure_days": int(tenure_days),
+                "activity_trend": round(activity_trend, 2),
+                "avg_transaction_value": round(avg_transaction_value, 2),
+                "days_between_transactions": round(days_between_transactions, 2),
+                "_monetary_value": monetary_value  # Temporary for normalization
+            }
+
+            # Add churn label if present
+            if has_churn_label and "churn_label" in df.columns:
+                # Get the churn label for this customer (should be same across all rows)
+                churn_label = customer_df["churn_label"].iloc[0]
+                feature_dict["churn_label"] = int(churn_label)
+
+            features_list.append(feature_dict)
 
     # Create features DataFrame
     features_df = pd.DataFrame(features_list)
+    if profiler is not None:
+        profiler.set_counts(customers=len(features_df), events=len(df))
+
+    if not normalize_monetary:
+        return features_df
+
+    with profile_section(profiler, "normalization"):
+        return _normalize_monetary_scores(features_df)
+
+
+def _time_series_features(
+    df: pd.DataFrame,
+    trend_date,
+    profiler: Optional[FeatureProfiler] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Per-customer 30-day activity slope and mean gap between active days.
 
-    # Normalize monetary scores (0-100 scale)
+    Arrays follow df.groupby("customer_id") order. Expects event_date as dates.
+    """
+    codes, customer_ids = pd.factorize(df["customer_id"], sort=True)
+    n_customers = len(customer_ids)
+    keep = codes >= 0
+    codes = codes[keep]
+    days = pd.to_datetime(df["event_date"][keep]).to_numpy().astype("datetime64[D]").astype(np.int64)
+
+    order = np.lexsort((days, codes))
+    codes, days = codes[order], days[order]
+
+    with profile_section(profiler, "trend"):
+        trend_day = np.datetime64(trend_date, "D").astype(np.int64)
+        in_30 = days >= trend_day
+        activity_trends = binned_slopes(csr_offsets(codes[in_30], n_customers), days[in_30])
+    with profile_section(profiler, "gaps"):
+        _, mean_gaps, _ = gap_stats(csr_offsets(codes, n_customers), days)
+    return activity_trends, mean_gaps
+
+
+def _normalize_monetary_scores(features_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normalize monetary scores (0-100 scale) from the temporary `_monetary_value` column.
+    """
     if len(features_df) > 0:
         max_monetary = features_df["_monetary_value"].quantile(0.95)
         if max_monetary == 0:
@@ -193,7 +240,7 @@ def generate_churn_labels(
         current_date = current_date.date()
 
     # Convert event_date to datetime
-    df = df.copy()
+    df = to_default_dtypes(df, errors="raise").copy()
     df["event_date"] = pd.to_datetime(df["event_date"]).dt.date
 
     # Get last transaction date for each customer
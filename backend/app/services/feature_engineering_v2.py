@@ -7,6 +7,23 @@ import numpy as np
 from typing import Dict, Optional, List
 from datetime import datetime, timedelta
 import warnings
+
+from app.services.event_loader import (
+    EVENT_DAY_COLUMN,
+    MISSING_DAY,
+    has_event_dates,
+    plain_customer_ids,
+    to_default_dtypes
+)
+from app.services.feature_profiler import FeatureProfiler, profile_section
+from app.services.feature_kernels import (
+    binned_slopes,
+    csr_offsets,
+    gap_stats,
+    safe_ratio,
+    window_counts,
+    window_sums
+)
 warnings.filterwarnings('ignore')
 
 
@@ -43,8 +60,9 @@ def engineer_features_from_csv_v2(
     # Validate required columns
     if "customer_id" not in df.columns:
         raise ValueError("CSV must contain 'customer_id' column")
-    if "event_date" not in df.columns:
+    if not has_event_dates(df):
         raise ValueError("CSV must contain 'event_date' column")
+    df = to_default_dtypes(df)
 
     # Convert event_date to datetime
     df = df.copy()
@@ -231,15 +249,32 @@ def engineer_features_from_csv_v2(
     # Create features DataFrame
     features_df = pd.DataFrame(features_list)
 
-    # Normalize monetary scores (0-100 scale, using quantile to handle outliers)
-    # Keep monetary_value for ROI calculations
+    return _normalize_monetary_scores(features_df)
+
+
+def _normalize_monetary_scores(
+    features_df: pd.DataFrame,
+    max_monetary: Optional[float] = None
+) -> pd.DataFrame:
+    """
+    Normalize monetary scores (0-100 scale, using quantile to handle outliers).
+
+    Expects the raw lookback spend in a temporary `_monetary_value` column and
+    renames it to `monetary_value` (kept for ROI calculations). max_monetary is
+    the 95th percentile spend; pass it when features_df is one chunk of a
+    larger customer set.
+    """
     if len(features_df) > 0:
-        max_monetary = features_df["_monetary_value"].quantile(0.95)
+        if max_monetary is None:
+            max_monetary = features_df["_monetary_value"].quantile(0.95)
         if max_monetary == 0:
             max_monetary = 1
-        features_df["monetary_score"] = features_df["_monetary_value"].apply(
-            lambda x: round(min(100, 100 * (x / max_monetary)), 2)
-        )
+        scaled = 100 * (features_df["_monetary_value"].to_numpy(dtype=np.float64) / max_monetary)
+        monetary_score = _round_like_builtin(np.minimum(100, scaled), 2)
+        # min() keeps the int 100 when every customer is capped
+        if (scaled >= 100).all():
+            monetary_score = monetary_score.astype(np.int64)
+        features_df["monetary_score"] = monetary_score
         # Rename _monetary_value to monetary_value for ROI calculations
         features_df["monetary_value"] = features_df["_monetary_value"]
         features_df = features_df.drop(columns=["_monetary_value"])
@@ -247,6 +282,351 @@ def engineer_features_from_csv_v2(
     return features_df
 
 
+def engineer_features_from_csv_v2_vectorized(
+    df: pd.DataFrame,
+    lookback_days: int = 90,
+    current_date: Optional[datetime] = None,
+    has_churn_label: bool = False,
+    churn_threshold_days: Optional[int] = None,
+    profiler: Optional[FeatureProfiler] = None
+) -> pd.DataFrame:
+    """
+    Vectorized engine for the V2 features.
+
+    Produces the same output as engineer_features_from_csv_v2, but sorts the
+    events once by (customer, day) and computes every feature with group-level
+    reductions over the sorted arrays instead of looping over customers.
+    The 30-day activity trend uses the closed-form OLS slope over daily counts
+    in place of np.polyfit.
+
+    Args:
+        df: DataFrame with customer transaction data
+        lookback_days: Number of days to look back for frequency/monetary calculation
+        current_date: Reference date for calculations (defaults to today)
+        has_churn_label: Whether the CSV includes a churn_label column
+        churn_threshold_days: If set (and has_churn_label is False), also label
+            customers inactive for at least this many days as churned, like
+            generate_churn_labels, in the same pass over the events
+        profiler: Records time and peak memory per feature group (prepare,
+            core_rfm, trend, gaps, ratios, normalization) when given
+
+    Returns:
+        DataFrame with enhanced customer-level features (15 features total)
+    """
+    if current_date is None:
+        current_date = datetime.now().date()
+    elif isinstance(current_date, datetime):
+        current_date = current_date.date()
+
+    # Validate required columns
+    if "customer_id" not in df.columns:
+        raise ValueError("CSV must contain 'customer_id' column")
+    if not has_event_dates(df):
+        raise ValueError("CSV must contain 'event_date' column")
+
+    with profile_section(profiler, "prepare"):
+        # Day numbers per row; invalid dates are dropped
+        if EVENT_DAY_COLUMN in df.columns:
+            all_days = df[EVENT_DAY_COLUMN].to_numpy(dtype=np.int64)
+            valid_rows = all_days != MISSING_DAY
+        else:
+            event_dates = pd.to_datetime(df["event_date"], errors='coerce')
+            if getattr(event_dates.dt, "tz", None) is not None:
+                event_dates = event_dates.dt.tz_localize(None)
+            valid_rows = event_dates.notna().to_numpy()
+            all_days = np.zeros(len(df), dtype=np.int64)
+            all_days[valid_rows] = _to_day_ordinals(event_dates[valid_rows])
+
+        # Customer codes in groupby order (sorted keys, missing ids dropped)
+        codes, customer_ids = pd.factorize(df["customer_id"][valid_rows], sort=True)
+        customer_ids = plain_customer_ids(customer_ids)
+        keep = codes >= 0
+        codes = codes[keep]
+        days = all_days[valid_rows][keep]
+
+        if "amount" not in df.columns:
+            amounts = np.zeros(len(codes))
+            integer_amounts = False
+        else:
+            amount_series = pd.to_numeric(df["amount"], errors="coerce").fillna(0.0).clip(lower=0)
+            integer_amounts = pd.api.types.is_integer_dtype(amount_series)
+            amounts = amount_series.to_numpy(dtype=np.float64)[valid_rows][keep]
+
+        if len(codes) == 0:
+            return pd.DataFrame()
+
+        # Single sort by (customer, day); stable so ties keep file order
+        order = np.lexsort((days, codes))
+        codes = codes[order]
+        days = days[order]
+        n_customers = len(customer_ids)
+
+        group_starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        group_ends = np.r_[group_starts[1:], len(codes)]
+
+        # Same-day events must sit in the order the per-customer sort_values leaves
+        # them, so that float sums (and the churn_label pick) match exactly
+        order = _match_sort_values_order(order, days, group_starts, group_ends)
+        amounts = amounts[order]
+
+    if profiler is not None:
+        profiler.set_counts(customers=n_customers, events=len(codes))
+
+    offsets = np.r_[group_starts, len(codes)]
+
+    # Reference dates as day ordinals
+    current_day = _to_day_ordinals(pd.Series([pd.Timestamp(current_date)]))[0]
+    lookback_day = current_day - lookback_days
+    trend_day_30 = current_day - 30
+    trend_day_60 = current_day - 60
+
+    with profile_section(profiler, "core_rfm"):
+        # Basic metrics
+        first_day = days[group_starts]
+        last_day = days[group_ends - 1]
+        total_transactions = group_ends - group_starts
+
+        # Lookback window counts and spend
+        frequency_count = window_counts(offsets, days, lookback_day)
+        monetary_value = window_sums(offsets, days, amounts, lookback_day)
+        total_amount = window_sums(offsets, days, amounts)
+
+    with profile_section(profiler, "trend"):
+        # Last 30 days vs the 30 days before, plus the daily-count slope
+        recent_30_count = window_counts(offsets, days, trend_day_30)
+        previous_30_count = window_counts(offsets, days, trend_day_60, trend_day_30)
+        in_30 = days >= trend_day_30
+        activity_slope = binned_slopes(csr_offsets(codes[in_30], n_customers), days[in_30])
+
+    with profile_section(profiler, "gaps"):
+        # Gap statistics over positive day differences within each customer
+        gap_count, gap_mean, gap_std = gap_stats(offsets, days)
+
+    with profile_section(profiler, "ratios"):
+        features = _assemble_v2_features(
+            customer_ids=customer_ids,
+            recency_days=current_day - last_day,
+            tenure_days=np.maximum(1, last_day - first_day),
+            total_transactions=total_transactions,
+            frequency_count=frequency_count,
+            monetary_value=monetary_value.astype(np.int64) if integer_amounts else monetary_value,
+            recent_30_count=recent_30_count,
+            previous_30_count=previous_30_count,
+            activity_slope=activity_slope,
+            total_amount=total_amount,
+            gap_count=gap_count,
+            gap_mean=gap_mean,
+            gap_std=gap_std
+        )
+
+        if has_churn_label and "churn_label" in df.columns:
+            churn_labels = df["churn_label"].to_numpy()[valid_rows][keep][order]
+            features["churn_label"] = churn_labels[group_starts].astype(int)
+
+    with profile_section(profiler, "normalization"):
+        features_df = _normalize_monetary_scores(pd.DataFrame(features))
+
+        # Inactivity labels go last, where merging generate_churn_labels puts them
+        if churn_threshold_days is not None and "churn_label" not in features_df.columns:
+            features_df["churn_label"] = ((current_day - last_day) >= churn_threshold_days).astype(int)
+
+    return features_df
+
+
+def _assemble_v2_features(
+    customer_ids: np.ndarray,
+    recency_days: np.ndarray,
+    tenure_days: np.ndarray,
+    total_transactions: np.ndarray,
+    frequency_count: np.ndarray,
+    monetary_value: np.ndarray,
+    recent_30_count: np.ndarray,
+    previous_30_count: np.ndarray,
+    activity_slope: np.ndarray,
+    total_amount: np.ndarray,
+    gap_count: np.ndarray,
+    gap_mean: np.ndarray,
+    gap_std: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """
+    Build the V2 feature columns from per-customer aggregates.
+
+    All inputs are arrays aligned with customer_ids. Returns the columns of
+    engineer_features_from_csv_v2 (monetary_score still un-normalized, raw
+    spend in `_monetary_value`) ready for _normalize_monetary_scores.
+    """
+    # 1. Recency Score
+    recency_score = np.maximum(0, 100 * (1 - np.minimum(recency_days, 365) / 365))
+
+    # 2. Frequency Score
+    frequency_score = np.minimum(100, 100 * (frequency_count / 50))
+
+    # 5. Activity Trend
+    activity_trend = np.where(
+        recent_30_count > 1,
+        activity_slope,
+        np.where(recent_30_count == 0, 0.0, 0.01)
+    )
+
+    # 6. Transaction Velocity
+    transaction_velocity = total_transactions / tenure_days
+
+    # 7. Average Transaction Value
+    avg_transaction_value = total_amount / total_transactions
+
+    # 8. Days Between Transactions
+    has_gap_mean = (total_transactions > 1) & (gap_count > 0)
+    days_between_transactions = np.where(has_gap_mean, gap_mean, tenure_days)
+
+    # 9. Transaction Consistency
+    has_gap_std = (total_transactions > 2) & (gap_count > 1)
+    consistency_std = np.where(has_gap_std, gap_std, 0.0)
+    consistency_score = np.where(
+        total_transactions > 2,
+        np.maximum(0, 100 * (1 - np.minimum(consistency_std, 90) / 90)),
+        50.0
+    )
+
+    # 10. Recent Activity Ratio (last 30 days vs previous 30 days)
+    activity_ratio = safe_ratio(
+        recent_30_count, previous_30_count, fill=np.where(recent_30_count > 0, 2.0, 0.0)
+    )
+
+    # 11. Monetary Trend
+    with np.errstate(divide="ignore", invalid="ignore"):
+        recent_avg_amount = monetary_value / frequency_count
+        historical_avg_amount = avg_transaction_value
+        monetary_trend = np.where(
+            frequency_count > 0,
+            np.where(
+                historical_avg_amount > 0,
+                (recent_avg_amount - historical_avg_amount) / historical_avg_amount,
+                0.0
+            ),
+            -1.0
+        )
+
+    # 12. Lifecycle Stage
+    lifecycle_stage = np.select(
+        [tenure_days < 30, tenure_days < 90, recency_days < 30, recency_days < 90],
+        [0, 1, 2, 3],
+        default=4
+    )
+
+    # 13. Engagement Score
+    engagement_score = (
+        recency_score * 0.4 +
+        frequency_score * 0.3 +
+        consistency_score * 0.2 +
+        np.minimum(100, transaction_velocity * 1000) * 0.1
+    )
+    engagement_score = np.maximum(0, np.minimum(100, engagement_score))
+
+    # 14. Recency-Frequency Ratio
+    rf_ratio = (recency_score / 100) * (frequency_score / 100) * 100
+
+    # 15. Average Days Since Last Transaction
+    avg_days_since_last = recency_days / np.maximum(total_transactions, 1)
+
+    # Round the same way the per-customer loop does: values that were numpy
+    # scalars there go through np.round, plain floats through round()
+    features = {
+        "customer_id": np.asarray(customer_ids),
+        "recency_score": _round_like_builtin(recency_score, 2),
+        "frequency_score": _round_like_builtin(frequency_score, 2),
+        "monetary_score": 0.0,
+        "tenure_days": np.asarray(tenure_days).astype(np.int64),
+        "avg_transaction_value": np.round(avg_transaction_value, 2),
+        "activity_trend": _round_like_builtin(activity_trend, 4),
+        "transaction_velocity": _round_like_builtin(transaction_velocity, 4),
+        "days_between_transactions": np.round(days_between_transactions, 2),
+        "consistency_score": np.where(
+            has_gap_std, np.round(consistency_score, 2), _round_like_builtin(consistency_score, 2)
+        ),
+        "activity_ratio": _round_like_builtin(activity_ratio, 2),
+        "monetary_trend": np.round(monetary_trend, 4),
+        "lifecycle_stage": lifecycle_stage.astype(np.int64),
+        "engagement_score": np.where(
+            has_gap_std & (consistency_std <= 90),
+            np.round(engagement_score, 2),
+            _round_like_builtin(engagement_score, 2)
+        ),
+        "rf_ratio": _round_like_builtin(rf_ratio, 2),
+        "avg_days_since_last": _round_like_builtin(avg_days_since_last, 2),
+        "total_transactions": np.asarray(total_transactions).astype(np.int64),
+        "_monetary_value": monetary_value
+    }
+
+    # The loop yields plain ints for clamped/fallback values; a column made up
+    # entirely of those ends up int64 rather than float64
+    int_only_columns = {
+        "recency_score": recency_days >= 365,
+        "frequency_score": frequency_count >= 50,
+        "days_between_transactions": ~has_gap_mean,
+        "consistency_score": has_gap_std & (consistency_std >= 90),
+        "engagement_score": (engagement_score <= 0) | (engagement_score >= 100),
+    }
+    for col, int_mask in int_only_columns.items():
+        if int_mask.all():
+            features[col] = features[col].astype(np.int64)
+
+    return features
+
+
+def _to_day_ordinals(dates: pd.Series) -> np.ndarray:
+    """
+    Convert a datetime Series to integer day numbers (days since epoch).
+    """
+    return dates.to_numpy().astype("datetime64[D]").astype(np.int64)
+
+
+def _match_sort_values_order(
+    order: np.ndarray,
+    days: np.ndarray,
+    group_starts: np.ndarray,
+    group_ends: np.ndarray
+) -> np.ndarray:
+    """
+    Reorder same-day events of large customers the way sort_values does.
+
+    The loop sorts each customer's `date` objects with the default quicksort,
+    which is stable up to 16 rows and reorders ties beyond that. Sorting the
+    same day numbers as Python objects reproduces that permutation exactly.
+    """
+    sizes = group_ends - group_starts
+    has_ties = np.zeros(len(sizes), dtype=bool)
+    same_day = np.flatnonzero(days[1:] == days[:-1])
+    has_ties[np.searchsorted(group_starts, same_day, side="right") - 1] = True
+
+    order = order.copy()
+    for start, end in zip(group_starts[(sizes > 16) & has_ties], group_ends[(sizes > 16) & has_ties]):
+        # Back to file order, then quicksort on the object array
+        file_order = np.sort(order[start:end])
+        position = np.argsort(order[start:end])
+        day_objects = np.empty(end - start, dtype=object)
+        day_objects[:] = days[start:end][position].tolist()
+        order[start:end] = file_order[day_objects.argsort(kind="quicksort")]
+    return order
+
+
+def _round_like_builtin(values: np.ndarray, decimals: int) -> np.ndarray:
+    """
+    Vectorized round() for float arrays.
+
+    np.round scales by 10**decimals before rounding, which can land on the
+    wrong side of a .5 tie (e.g. 0.025 -> 0.02 where round() gives 0.03).
+    Only the few values near a tie are re-rounded with the builtin.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    rounded = np.round(values, decimals)
+    scaled = values * 10.0 ** decimals
+    with np.errstate(invalid="ignore"):
+        near_tie = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_tie):
+        rounded[i] = round(float(values[i]), decimals)
+    return rounded
+
+
 def get_feature_columns_v2() -> List[str]:
     """
     Get the list of feature columns for V2 (15 features).
@@ -278,6 +658,9 @@ def create_training_dataset_from_csv_v2(
     """
     Create a complete training dataset with V2 features and labels from raw CSV.
 
+    Features and churn labels come from a single grouped pass over the events
+    (see engineer_features_from_csv_v2_vectorized).
+
     Args:
         raw_csv_df: Raw customer transactions CSV
         churn_threshold_days: Threshold for labeling churned customers
@@ -286,19 +669,9 @@ def create_training_dataset_from_csv_v2(
     Returns:
         DataFrame with V2 features and churn labels ready for training
     """
-    # Import generate_churn_labels from the original module
-    from app.services.feature_engineering_csv import generate_churn_labels
-    
-    # Generate churn labels
-    churn_labels_df = generate_churn_labels(raw_csv_df, churn_threshold_days, current_date)
-
-    # Engineer features using V2
-    features_df = engineer_features_from_csv_v2(raw_csv_df, has_churn_label=False, current_date=current_date)
-
-    # Merge features with labels
-    training_df = features_df.merge(churn_labels_df, on="customer_id", how="left")
-
-    # Fill any missing labels with 0 (active)
-    training_df["churn_label"] = training_df["churn_label"].fillna(0).astype(int)
-
-    return training_df
\ No newline at end of file
+    return engineer_features_from_csv_v2_vectorized(
+        raw_csv_df,
+        current_date=current_date,
+        has_churn_label=False,
+        churn_threshold_days=churn_threshold_days
+    )
@@ -0,0 +1,429 @@
+"""
+Feature Kernels
+Per-customer time-series reductions over CSR-style arrays: events sorted by
+customer then day, with `offsets[i]:offsets[i + 1]` selecting customer i.
+
+Kernels cover gap statistics, OLS slopes over binned counts or values,
+windowed counts/sums and safe ratios. Each runs as a numba JIT loop when numba
+is installed (unless FEATURE_KERNELS_NUMBA=false), otherwise as NumPy group
+reductions. The NumPy path replays numpy's pairwise summation so its sums are
+bit-identical to calling .sum() on each customer's slice, and the numba loops
+use the same pairwise order.
+"""
+import numpy as np
+import pandas as pd
+from typing import Optional, Tuple, Union
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+from app.core.config import settings
+
+NUMBA_AVAILABLE = numba is not None
+
+# Set FEATURE_KERNELS_NUMBA=false to force the NumPy kernels
+USE_NUMBA = NUMBA_AVAILABLE and settings.FEATURE_KERNELS_NUMBA
+
+Bound = Union[int, np.ndarray, None]
+
+
+def csr_offsets(codes: np.ndarray, n_segments: int) -> np.ndarray:
+    """
+    Offsets (length n_segments + 1) for sorted segment codes.
+    """
+    counts = np.bincount(codes, minlength=n_segments)
+    return np.r_[0, np.cumsum(counts)].astype(np.int64)
+
+
+def segment_codes(offsets: np.ndarray) -> np.ndarray:
+    """
+    Segment code of every value, the inverse of csr_offsets.
+    """
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+
+def gap_stats(offsets: np.ndarray, days: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Count, mean and sample std of the positive day gaps within each segment.
+
+    Same-day events produce zero gaps and are skipped, like filtering
+    `diff() > 0`. Mean is NaN without gaps, std is NaN with fewer than two.
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    days = np.asarray(days, dtype=np.int64)
+    if USE_NUMBA:
+        return _gap_stats_numba(offsets, days)
+
+    n_segments = len(offsets) - 1
+    codes = segment_codes(offsets)
+    gaps = np.diff(days, prepend=days[:1])
+    gaps[offsets[:-1][offsets[:-1] < len(days)]] = 0
+    positive_gap = gaps > 0
+    gap_codes = codes[positive_gap]
+    gap_values = gaps[positive_gap].astype(np.float64)
+
+    gap_count = np.bincount(gap_codes, minlength=n_segments).astype(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gap_mean = segment_sum(gap_values, gap_codes, n_segments) / gap_count
+        gap_sq_dev = (gap_mean[gap_codes] - gap_values) ** 2
+        gap_std = np.sqrt(segment_sum(gap_sq_dev, gap_codes, n_segments) / (gap_count - 1))
+    return gap_count, gap_mean, gap_std
+
+
+def binned_slopes(
+    offsets: np.ndarray,
+    bins: np.ndarray,
+    weights: Optional[np.ndarray] = None,
+    dense: bool = False
+) -> np.ndarray:
+    """
+    Per-segment OLS slope of binned totals against bin position.
+
+    Values are summed per (segment, bin), bins being day numbers, week
+    numbers, etc. sorted within each segment. With dense=False the x axis
+    is the index among occupied bins (like groupby(date).size()); with
+    dense=True it is the calendar position from the first bin, so empty bins
+    count as zeros (like pd.Grouper). Segments spanning fewer than two bins
+    get a slope of 0.0.
+
+    Args:
+        offsets: CSR offsets of the segments
+        bins: Sorted bin number of each event
+        weights: Value added per event (defaults to 1, i.e. event counts)
+        dense: Use calendar bin positions instead of occupied-bin ranks
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    bins = np.asarray(bins, dtype=np.int64)
+    if USE_NUMBA:
+        if weights is None:
+            weights = np.ones(len(bins))
+        return _binned_slopes_numba(offsets, bins, np.asarray(weights, dtype=np.float64), dense)
+
+    n_segments = len(offsets) - 1
+    slopes = np.zeros(n_segments)
+    if len(bins) == 0:
+        return slopes
+
+    # Collapse events into (segment, bin) totals
+    codes = segment_codes(offsets)
+    bin_starts = np.flatnonzero(np.r_[True, (codes[1:] != codes[:-1]) | (bins[1:] != bins[:-1])])
+    if weights is None:
+        y = np.diff(np.r_[bin_starts, len(bins)]).astype(np.float64)
+    else:
+        y = np.add.reduceat(np.asarray(weights, dtype=np.float64), bin_starts)
+    bin_codes = codes[bin_starts]
+
+    n_bins = np.bincount(bin_codes, minlength=n_segments)
+    first_bin = np.r_[0, np.cumsum(n_bins)[:-1]]
+    if dense:
+        x = bins[bin_starts] - bins[bin_starts][first_bin[bin_codes]]
+        n = np.zeros(n_segments)
+        occupied = n_bins > 0
+        last_bin = first_bin + n_bins - 1
+        n[occupied] = (x[last_bin[occupied]] + 1).astype(np.float64)
+    else:
+        x = np.arange(len(bin_codes)) - first_bin[bin_codes]
+        n = n_bins.astype(np.float64)
+
+    sum_y = np.bincount(bin_codes, weights=y, minlength=n_segments)
+    sum_xy = np.bincount(bin_codes, weights=x * y, minlength=n_segments)
+
+    # slope = sum((x - x_mean) * y) / sum((x - x_mean)^2), with x_mean = (n - 1) / 2
+    has_slope = n > 1
+    numerator = sum_xy - (n - 1) / 2 * sum_y
+    denominator = n * (n * n - 1) / 12
+    slopes[has_slope] = numerator[has_slope] / denominator[has_slope]
+    return slopes
+
+
+def timeline_slope(
+    event_dates: pd.Series,
+    weights: Optional[pd.Series] = None,
+    freq: str = "D",
+    dense: bool = False
+) -> float:
+    """
+    OLS slope of one timeline's daily or weekly totals.
+
+    Args:
+        event_dates: Event datetimes
+        weights: Value per event (defaults to counting events); NaN counts as 0
+        freq: "D" for calendar days, "W" for Monday-Sunday weeks (pd.Grouper freq="W")
+        dense: Count empty bins between the first and last one as zeros
+    """
+    dates = pd.to_datetime(event_dates)
+    if getattr(dates.dt, "tz", None) is not None:
+        dates = dates.dt.tz_localize(None)
+    bins = dates.to_numpy().astype("datetime64[D]").astype(np.int64)
+    if freq == "W":
+        # Day 0 (1970-01-01) is a Thursday; shift so weeks start on Monday
+        bins = (bins + 3) // 7
+
+    order = np.argsort(bins, kind="stable")
+    if weights is not None:
+        # Missing values count as 0, as in groupby(...).sum()
+        weights = np.asarray(weights, dtype=np.float64)
+        weights = np.where(np.isnan(weights), 0.0, weights)[order]
+    offsets = np.array([0, len(bins)], dtype=np.int64)
+    return float(binned_slopes(offsets, bins[order], weights, dense)[0])
+
+
+def window_counts(
+    offsets: np.ndarray,
+    days: np.ndarray,
+    lower: Bound = None,
+    upper: Bound = None
+) -> np.ndarray:
+    """
+    Number of events per segment with lower <= day < upper.
+
+    Bounds are scalars, per-segment arrays or None (unbounded).
+    """
+    return window_sums(offsets, days, None, lower, upper)
+
+
+def window_sums(
+    offsets: np.ndarray,
+    days: np.ndarray,
+    weights: Optional[np.ndarray],
+    lower: Bound = None,
+    upper: Bound = None
+) -> np.ndarray:
+    """
+    Sum of weights per segment over events with lower <= day < upper.
+
+    weights=None counts events. Bounds are scalars, per-segment arrays or
+    None (unbounded).
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    days = np.asarray(days, dtype=np.int64)
+    n_segments = len(offsets) - 1
+    if USE_NUMBA:
+        lower_bounds = _segment_bounds(lower, n_segments, np.iinfo(np.int64).min)
+        upper_bounds = _segment_bounds(upper, n_segments, np.iinfo(np.int64).max)
+        if weights is None:
+            weights = np.ones(len(days))
+        return _window_sums_numba(
+            offsets, days, np.asarray(weights, dtype=np.float64), lower_bounds, upper_bounds
+        )
+
+    codes = segment_codes(offsets)
+    mask = np.ones(len(days), dtype=bool)
+    if lower is not None:
+        mask &= days >= (lower[codes] if np.ndim(lower) else lower)
+    if upper is not None:
+        mask &= days < (upper[codes] if np.ndim(upper) else upper)
+
+    if weights is None:
+        return np.bincount(codes[mask], minlength=n_segments).astype(np.float64)
+    return segment_sum(np.asarray(weights, dtype=np.float64)[mask], codes[mask], n_segments)
+
+
+def safe_ratio(
+    numerator: np.ndarray,
+    denominator: np.ndarray,
+    fill: Union[float, np.ndarray] = 0.0
+) -> np.ndarray:
+    """
+    numerator / denominator, with fill where the denominator is zero.
+    """
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    result = np.broadcast_to(np.asarray(fill, dtype=np.float64), numerator.shape).copy()
+    nonzero = denominator != 0
+    result[nonzero] = numerator[nonzero] / denominator[nonzero]
+    return result
+
+
+def segment_sum(values: np.ndarray, codes: np.ndarray, n_groups: int) -> np.ndarray:
+    """
+    Per-group sums identical to calling .sum() on each group's slice.
+
+    numpy sums floats pairwise (sequential below 8 values, 8 interleaved
+    accumulators up to 128), so a plain bincount drifts in the last bit.
+    This replays the same addition order across all groups at once; the rare
+    groups above 128 values are summed directly. `values` must be sorted by
+    `codes`.
+    """
+    counts = np.bincount(codes, minlength=n_groups)
+    if len(codes) == 0:
+        return np.zeros(n_groups)
+
+    starts = np.r_[0, np.cumsum(counts)[:-1]]
+    position = np.arange(len(codes)) - starts[codes]
+    small = (counts <= 128)[codes]
+    block_end = (counts - counts % 8)[codes]
+
+    # Interleaved accumulators over the multiple-of-8 prefix
+    accumulators = np.zeros((n_groups, 8))
+    block_idx = np.flatnonzero(small & (position < block_end))
+    block_idx = block_idx[np.argsort(position[block_idx], kind="stable")]
+    block_pos = position[block_idx]
+    for lo, hi in _runs(block_pos):
+        idx = block_idx[lo:hi]
+        accumulators[codes[idx], block_pos[lo] % 8] += values[idx]
+    a = accumulators
+    sums = ((a[:, 0] + a[:, 1]) + (a[:, 2] + a[:, 3])) + ((a[:, 4] + a[:, 5]) + (a[:, 6] + a[:, 7]))
+
+    # Sequential tail (the whole group when it has fewer than 8 values)
+    tail_idx = np.flatnonzero(small & (position >= block_end))
+    tail_idx = tail_idx[np.argsort(position[tail_idx], kind="stable")]
+    tail_pos = position[tail_idx]
+    for lo, hi in _runs(tail_pos):
+        idx = tail_idx[lo:hi]
+        sums[codes[idx]] += values[idx]
+
+    for group in np.flatnonzero(counts > 128):
+        sums[group] = values[starts[group]:starts[group] + counts[group]].sum()
+    return sums
+
+
+def _runs(sorted_values: np.ndarray):
+    """
+    Yield (start, end) bounds of equal-value runs in a sorted array.
+    """
+    if len(sorted_values) == 0:
+        return
+    bounds = np.r_[0, np.flatnonzero(sorted_values[1:] != sorted_values[:-1]) + 1, len(sorted_values)]
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        yield lo, hi
+
+
+def _segment_bounds(bound: Bound, n_segments: int, default: int) -> np.ndarray:
+    if bound is None:
+        return np.full(n_segments, default, dtype=np.int64)
+    return np.broadcast_to(np.asarray(bound, dtype=np.int64), (n_segments,)).copy()
+
+
+if NUMBA_AVAILABLE:
+    @numba.njit(cache=True)
+    def _block_sum(values, start, end):
+        """Sum of at most 128 values: 8 interleaved accumulators, then the tail."""
+        n = end - start
+        if n < 8:
+            total = 0.0
+            for i in range(start, end):
+                total += values[i]
+            return total
+        r = values[start:start + 8].copy()
+        block_end = start + n - n % 8
+        for i in range(start + 8, block_end, 8):
+            for k in range(8):
+                r[k] += values[i + k]
+        total = ((r[0] + r[1]) + (r[2] + r[3])) + ((r[4] + r[5]) + (r[6] + r[7]))
+        for i in range(block_end, end):
+            total += values[i]
+        return total
+
+    @numba.njit(cache=True)
+    def _pairwise_sum(values, start, end):
+        """
+        numpy's pairwise summation of values[start:end], so sums match .sum().
+
+        Walks the halving tree with an explicit stack (numba's cache cannot
+        reload recursive functions).
+        """
+        if end - start <= 128:
+            return _block_sum(values, start, end)
+
+        lo = np.empty(64, dtype=np.int64)
+        hi = np.empty(64, dtype=np.int64)
+        state = np.zeros(64, dtype=np.int64)  # 0: new, 1: in left half, 2: in right half
+        left_sum = np.empty(64)
+        lo[0], hi[0], depth = start, end, 1
+        while True:
+            node = depth - 1
+            n = hi[node] - lo[node]
+            if n > 128:
+                half = n // 2
+                half -= half % 8
+                state[node] = 1
+                lo[depth], hi[depth], state[depth] = lo[node], lo[node] + half, 0
+                depth += 1
+                continue
+
+            value = _block_sum(values, lo[node], hi[node])
+            depth -= 1
+            # Hand the finished sum up until a parent still needs its right half
+            while depth > 0:
+                parent = depth - 1
+                if state[parent] == 1:
+                    half = (hi[parent] - lo[parent]) // 2
+                    half -= half % 8
+                    left_sum[parent] = value
+                    state[parent] = 2
+                    lo[depth], hi[depth], state[depth] = lo[parent] + half, hi[parent], 0
+                    depth += 1
+                    break
+                value = left_sum[parent] + value
+                depth -= 1
+            if depth == 0:
+                return value
+
+    @numba.njit(cache=True, error_model="numpy")
+    def _gap_stats_numba(offsets, days):
+        n_segments = len(offsets) - 1
+        gap_count = np.zeros(n_segments)
+        gap_mean = np.empty(n_segments)
+        gap_std = np.empty(n_segments)
+        buffer = np.empty(len(days))
+        for i in range(n_segments):
+            count = 0
+            for j in range(offsets[i] + 1, offsets[i + 1]):
+                gap = days[j] - days[j - 1]
+                if gap > 0:
+                    buffer[count] = gap
+                    count += 1
+            mean = _pairwise_sum(buffer, 0, count) / count
+            for k in range(count):
+                buffer[k] = (mean - buffer[k]) ** 2
+            gap_count[i] = count
+            gap_mean[i] = mean
+            gap_std[i] = np.sqrt(_pairwise_sum(buffer, 0, count) / (count - 1))
+        return gap_count, gap_mean, gap_std
+
+    @numba.njit(cache=True)
+    def _binned_slopes_numba(offsets, bins, weights, dense):
+        n_segments = len(offsets) - 1
+        slopes = np.zeros(n_segments)
+        for i in range(n_segments):
+            start, end = offsets[i], offsets[i + 1]
+            if end - start < 2:
+                continue
+            # Totals per bin first (like np.add.reduceat: first value plus the
+            # pairwise sum of the rest), then the bin sums
+            sum_y = 0.0
+            sum_xy = 0.0
+            rank = 0
+            x = 0
+            bin_start = start
+            for j in range(start + 1, end + 1):
+                if j == end or bins[j] != bins[j - 1]:
+                    y = weights[bin_start] + _pairwise_sum(weights, bin_start + 1, j)
+                    sum_y += y
+                    sum_xy += x * y
+                    if j == end:
+                        break
+                    rank += 1
+                    x = bins[j] - bins[start] if dense else rank
+                    bin_start = j
+            n = float(x + 1)
+            if n > 1:
+                slopes[i] = (sum_xy - (n - 1) / 2 * sum_y) / (n * (n * n - 1) / 12)
+        return slopes
+
+    @numba.njit(cache=True)
+    def _window_sums_numba(offsets, days, weights, lower, upper):
+        n_segments = len(offsets) - 1
+        sums = np.zeros(n_segments)
+        buffer = np.empty(len(days))
+        for i in range(n_segments):
+            count = 0
+            for j in range(offsets[i], offsets[i + 1]):
+                if lower[i] <= days[j] < upper[i]:
+                    buffer[count] = weights[j]
+                    count += 1
+            sums[i] = _pairwise_sum(buffer, 0, count)
+        return sums
@@ -0,0 +1,128 @@
+"""
+Feature Profiler
+Instrumentation mode for the feature engineering entry points: records wall
+time and peak memory per feature group (core RFM, trend, gaps, ratios,
+normalization, ...) plus the number of customers and events processed.
+
+Memory is measured with tracemalloc, which sees numpy and pandas buffers but
+slows allocation-heavy code down, so profile runs are somewhat slower than
+normal ones.
+"""
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, List, Optional
+
+
+class FeatureProfiler:
+    """
+    Collects per-group timings for one feature engineering run.
+
+    Use as a context manager around the run (it starts tracemalloc if
+    needed), and time groups with `with profiler.section("trend"): ...`.
+    A group entered several times accumulates its time and keeps its
+    largest peak.
+    """
+
+    def __init__(self, engine: str = ""):
+        self.engine = engine
+        self.customers: Optional[int] = None
+        self.events: Optional[int] = None
+        self.groups: Dict[str, Dict[str, float]] = {}
+        self._stack: List[List[float]] = []
+        self._started_tracing = False
+        self._start_time: Optional[float] = None
+        self._total_seconds = 0.0
+        self._base_bytes = 0
+        self._peak_bytes = 0
+
+    def __enter__(self) -> "FeatureProfiler":
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._start_time = time.perf_counter()
+        self._base_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        self._stack = [[self._base_bytes, 0]]
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._total_seconds = time.perf_counter() - self._start_time
+        self._peak_bytes = self._pop_peak() - self._base_bytes
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextmanager
+    def section(self, name: str):
+        """
+        Time a feature group. Peak memory is measured above the memory in use
+        when the group starts.
+        """
+        tracing = tracemalloc.is_tracing()
+        current = tracemalloc.get_traced_memory()[0] if tracing else 0
+        if tracing:
+            # Sections reset the tracemalloc peak, so fold it into the
+            # enclosing frame first
+            if self._stack:
+                self._stack[-1][1] = max(self._stack[-1][1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        self._stack.append([current, 0])
+        group = self.groups.setdefault(name, {"seconds": 0.0, "peak_bytes": 0})
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            start_bytes = self._stack[-1][0]
+            peak = self._pop_peak() if tracing else 0
+
+            group["seconds"] += seconds
+            group["peak_bytes"] = max(group["peak_bytes"], peak - start_bytes)
+
+    def _pop_peak(self) -> int:
+        """
+        Close the innermost frame and return its peak, passing it to the parent.
+        """
+        _, frame_peak = self._stack.pop()
+        peak = max(tracemalloc.get_traced_memory()[1], frame_peak)
+        if self._stack:
+            self._stack[-1][1] = max(self._stack[-1][1], peak)
+        return peak
+
+    def set_counts(self, customers: Optional[int] = None, events: Optional[int] = None) -> None:
+        if customers is not None:
+            self.customers = int(customers)
+        if events is not None:
+            self.events = int(events)
+
+    def report(self) -> Dict[str, Any]:
+        """
+        JSON-serializable report, groups in the order they first ran.
+        """
+        total = self._total_seconds or sum(g["seconds"] for g in self.groups.values())
+        return {
+            "engine": self.engine,
+            "customers": self.customers,
+            "events": self.events,
+            "total_seconds": round(total, 4),
+            "peak_memory_mb": round(self._peak_bytes / 1024 / 1024, 2),
+            "groups": [
+                {
+                    "name": name,
+                    "seconds": round(group["seconds"], 4),
+                    "share": round(group["seconds"] / total, 4) if total > 0 else 0.0,
+                    "peak_memory_mb": round(group["peak_bytes"] / 1024 / 1024, 2)
+                }
+                for name, group in self.groups.items()
+            ]
+        }
+
+
+def profile_section(profiler: Optional[FeatureProfiler], name: str):
+    """
+    profiler.section(name), or a no-op context when profiling is off.
+    """
+    if profiler is None:
+        return nullcontext()
+    return profiler.section(name)
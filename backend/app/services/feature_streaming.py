@@ -0,0 +1,194 @@
+"""
+Streaming Feature Engineering
+Reads large raw event CSVs in bounded chunks, spills rows to on-disk partitions
+by customer_id hash, and engineers V2 features one partition at a time so peak
+memory no longer grows with the size of the input file.
+"""
+import os
+import shutil
+import tempfile
+import pandas as pd
+import numpy as np
+from typing import Dict, List, Optional, Union, BinaryIO, Iterator, Tuple
+from datetime import datetime
+
+from app.services.feature_engineering_v2 import (
+    engineer_features_from_csv_v2_vectorized,
+    _normalize_monetary_scores
+)
+
+
+# Columns whose dtype affects the engineered features; they are read as text and
+# cast once the whole file has been seen, the way a single read_csv would infer them
+TYPED_COLUMNS = ["customer_id", "event_date", "amount"]
+
+DEFAULT_CHUNKSIZE = 200_000
+DEFAULT_NUM_PARTITIONS = 16
+
+
+def partition_csv_by_customer(
+    source: Union[str, BinaryIO],
+    spill_dir: str,
+    num_partitions: int = DEFAULT_NUM_PARTITIONS,
+    chunksize: int = DEFAULT_CHUNKSIZE
+) -> Tuple[List[str], Dict[str, str]]:
+    """
+    Split a raw events CSV into per-partition spill files keyed by customer_id hash.
+
+    All rows of a customer land in the same partition, in their original file order.
+
+    Args:
+        source: Path or binary file object of the raw CSV
+        spill_dir: Directory for the partition files
+        num_partitions: Number of hash partitions
+        chunksize: Rows read per chunk
+
+    Returns:
+        Tuple of (partition file paths, inferred kind per typed column)
+    """
+    paths = [os.path.join(spill_dir, f"part_{i:04d}.csv") for i in range(num_partitions)]
+    has_header = [False] * num_partitions
+    column_kinds: Dict[str, str] = {}
+
+    reader = pd.read_csv(source, chunksize=chunksize, dtype={col: str for col in TYPED_COLUMNS})
+    for chunk in reader:
+        if "customer_id" not in chunk.columns:
+            raise ValueError("CSV must contain 'customer_id' column")
+        if "event_date" not in chunk.columns:
+            raise ValueError("CSV must contain 'event_date' column")
+
+        for col in TYPED_COLUMNS:
+            if col in chunk.columns:
+                column_kinds[col] = _merge_kinds(column_kinds.get(col), _infer_kind(chunk[col]))
+
+        partition = _customer_partition(chunk["customer_id"], num_partitions)
+        for part_id, part_df in chunk.groupby(partition, sort=False):
+            part_df.to_csv(paths[part_id], mode="a", header=not has_header[part_id], index=False)
+            has_header[part_id] = True
+
+    return [path for path, written in zip(paths, has_header) if written], column_kinds
+
+
+def read_partition(path: str, column_kinds: Dict[str, str]) -> pd.DataFrame:
+    """
+    Read one spill file back with the column dtypes of the full file.
+    """
+    df = pd.read_csv(path, dtype={col: str for col in TYPED_COLUMNS})
+    for col, kind in column_kinds.items():
+        if col not in df.columns or kind == "str":
+            continue
+        values = pd.to_numeric(df[col])
+        df[col] = values.astype(np.int64 if kind == "int" else np.float64)
+    return df
+
+
+def iter_customer_partitions(
+    source: Union[str, BinaryIO],
+    num_partitions: int = DEFAULT_NUM_PARTITIONS,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    spill_dir: Optional[str] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield the raw events one customer partition at a time.
+
+    Spill files live in a temporary directory that is removed once iteration ends.
+    """
+    work_dir = tempfile.mkdtemp(prefix="feature_spill_", dir=spill_dir)
+    try:
+        paths, column_kinds = partition_csv_by_customer(source, work_dir, num_partitions, chunksize)
+        for path in paths:
+            yield read_partition(path, column_kinds)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def engineer_features_streaming(
+    source: Union[str, BinaryIO],
+    lookback_days: int = 90,
+    current_date: Optional[datetime] = None,
+    has_churn_label: bool = False,
+    num_partitions: int = DEFAULT_NUM_PARTITIONS,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    spill_dir: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Engineer V2 features from a raw CSV with bounded memory.
+
+    Produces the same DataFrame as reading the whole CSV and calling
+    engineer_features_from_csv_v2: partitions are featurized independently,
+    then monetary scores are normalized over all customers.
+
+    Args:
+        source: Path or binary file object of the raw CSV
+        lookback_days: Number of days to look back for frequency/monetary calculation
+        current_date: Reference date for calculations (defaults to today)
+        has_churn_label: Whether the CSV includes a churn_label column
+        num_partitions: Number of customer hash partitions spilled to disk
+        chunksize: Rows read per chunk
+        spill_dir: Parent directory for spill files (system temp dir by default)
+
+    Returns:
+        DataFrame with enhanced customer-level features (15 features total)
+    """
+    if current_date is None:
+        current_date = datetime.now().date()
+
+    partition_features = []
+    for part_df in iter_customer_partitions(source, num_partitions, chunksize, spill_dir):
+        features_df = engineer_features_from_csv_v2_vectorized(
+            part_df,
+            lookback_days=lookback_days,
+            current_date=current_date,
+            has_churn_label=has_churn_label
+        )
+        if len(features_df) > 0:
+            partition_features.append(features_df)
+        del part_df
+
+    return merge_partition_features(partition_features)
+
+
+def merge_partition_features(partition_features: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Combine per-partition V2 features and normalize monetary scores globally.
+    """
+    if not partition_features:
+        return pd.DataFrame()
+
+    features_df = pd.concat(partition_features, ignore_index=True)
+    features_df = features_df.sort_values("customer_id", kind="stable").reset_index(drop=True)
+
+    # Partition-level scores used partition-level quantiles; redo over everyone
+    features_df["_monetary_value"] = features_df.pop("monetary_value")
+    return _normalize_monetary_scores(features_df)
+
+
+def _customer_partition(customer_ids: pd.Series, num_partitions: int) -> np.ndarray:
+    """
+    Stable partition number per row. Ids are hashed by numeric value when they
+    parse as numbers, so "007" and "7" (the same customer once read as int)
+    share a partition.
+    """
+    numeric = pd.to_numeric(customer_ids, errors="coerce")
+    numeric_hash = pd.util.hash_pandas_object(numeric.astype(np.float64), index=False).to_numpy()
+    text_hash = pd.util.hash_pandas_object(customer_ids.astype(str), index=False).to_numpy()
+    hashes = np.where(numeric.notna().to_numpy(), numeric_hash, text_hash)
+    return (hashes % np.uint64(num_partitions)).astype(np.int64)
+
+
+def _infer_kind(values: pd.Series) -> str:
+    """
+    Kind read_csv would infer for this text column: 'int', 'float' or 'str'.
+    """
+    try:
+        numeric = pd.to_numeric(values)
+    except (ValueError, TypeError):
+        return "str"
+    return "int" if pd.api.types.is_integer_dtype(numeric) else "float"
+
+
+def _merge_kinds(current: Optional[str], new: str) -> str:
+    order = ["int", "float", "str"]
+    if current is None:
+        return new
+    return order[max(order.index(current), order.index(new))]
@@ -3,18 +3,33 @@ Enhanced ML Training Service V2
 Advanced training with hyperparameter tuning, cross-validation, and automated model selection.
 """
 import os
+import copy
+import time
 import joblib
 import numpy as np
 import pandas as pd
-from typing import Dict, Tuple, Any, List, Optional
+from typing import Callable, Dict, Tuple, Any, List, Optional
 from pathlib import Path
 import warnings
 warnings.filterwarnings('ignore')
 
+from joblib import Parallel, delayed
+from sklearn.base import clone
 from sklearn.linear_model import LogisticRegression
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier, VotingClassifier
+from sklearn.ensemble import (
+    RandomForestClassifier,
+    GradientBoostingClassifier,
+    HistGradientBoostingClassifier,
+    VotingClassifier
+)
 from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV, StratifiedKFold
+from sklearn.model_selection import (
+    train_test_split,
+    cross_val_score,
+    GridSearchCV,
+    ParameterGrid,
+    StratifiedKFold
+)
 from sklearn.metrics import (
     accuracy_score,
     precision_score,
@@ -22,9 +37,82 @@ from sklearn.metrics import (
     roc_auc_score,
     f1_score,
     classification_report,
-    confusion_matrix
+    confusion_matrix,
+    get_scorer
+)
+
+from app.core.config import settings
+from app.services.feature_engineering_v2 import _round_like_builtin
+from app.services.model_artifact import save_model_artifact, load_model_artifact
+
+
+# Hyperparameter grids searched when tuning is enabled
+PARAM_GRIDS = {
+    "logistic_regression": {
+        'C': [0.01, 0.1, 1.0, 10.0],
+        'penalty': ['l2'],
+        'solver': ['lbfgs', 'liblinear']
+    },
+    "random_forest": {
+        'n_estimators': [50, 100, 200],
+        'max_depth': [5, 10, 15, None],
+        'min_samples_split': [2, 5, 10],
+        'min_samples_leaf': [1, 2, 4]
+    },
+    "gradient_boosting": {
+        'n_estimators': [50, 100, 200],
+        'max_depth': [3, 5, 7],
+        'learning_rate': [0.01, 0.1, 0.2],
+        'min_samples_split': [2, 5, 10]
+    },
+    "hist_gradient_boosting": {
+        'learning_rate': [0.05, 0.1, 0.2],
+        'max_leaf_nodes': [15, 31, 63]
+    }
+}
+
+# From this many training rows auto selection only tries the histogram
+# booster: random forests and exact gradient boosting scale poorly with rows
+HIST_GRADIENT_BOOSTING_MIN_ROWS = settings.HIST_GRADIENT_BOOSTING_MIN_ROWS
+
+# Model families that handle missing values natively (no median fill)
+NATIVE_MISSING_MODELS = ("hist_gradient_boosting",)
+
+# Risk segments and the probability thresholds between them
+# (settings.CHURN_RISK_THRESHOLDS, e.g. "0.3,0.5,0.7")
+RISK_SEGMENTS = np.array(["Low", "Medium", "High", "Critical"], dtype=object)
+RISK_THRESHOLDS = tuple(
+    float(threshold) for threshold in settings.CHURN_RISK_THRESHOLDS.split(",")
 )
 
+# 'grid': one GridSearchCV per model family, then cross_val_score on each winner
+# 'shared': all candidates on the same precomputed folds in one process pool
+# 'halving': 'shared' plus successive halving over folds
+SEARCH_MODES = ("grid", "shared", "halving")
+
+# Receives progress updates ({"stage": ..., "model_family": ..., ...}) during training
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+# Halving scores every candidate on MIN_HALVING_FOLDS folds before pruning and
+# keeps at least 1 / HALVING_FACTOR of them per rung
+MIN_HALVING_FOLDS = 2
+HALVING_FACTOR = 3
+
+# Subsample training: start at this many rows, grow by SUBSAMPLE_GROWTH each
+# step and stop once validation ROC-AUC gains less than the minimum gain
+SUBSAMPLE_START_ROWS = 20000
+SUBSAMPLE_GROWTH = 2
+SUBSAMPLE_MIN_AUC_GAIN = 0.002
+SUBSAMPLE_VALIDATION_FRACTION = 0.1
+
+# Warm-started forests and boosters grow by this share of their trees/stages
+# (at least WARM_START_MIN_ESTIMATORS) per incremental retraining
+WARM_START_GROWTH = 0.25
+WARM_START_MIN_ESTIMATORS = 10
+
+# Metrics compared between the previous and the retrained model
+DRIFT_METRICS = ("accuracy", "precision", "recall", "specificity", "f1_score", "roc_auc", "churn_rate")
+
 
 def train_churn_model_v2(
     training_df: pd.DataFrame,
@@ -33,7 +121,11 @@ def train_churn_model_v2(
     test_size: float = 0.2,
     random_state: int = 42,
     enable_tuning: bool = True,
-    enable_scaling: bool = True
+    enable_scaling: bool = True,
+    search_mode: str = "grid",
+    progress: Optional[ProgressCallback] = None,
+    subsample: bool = False,
+    min_auc_gain: float = SUBSAMPLE_MIN_AUC_GAIN
 ) -> Tuple[Any, Dict[str, Any]]:
     """
     Enhanced training with hyperparameter tuning and model selection.
@@ -41,41 +133,36 @@ def train_churn_model_v2(
     Args:
         training_df: DataFrame with features and churn_label column
         feature_columns: List of feature column names to use
-        model_type: 'auto' (try all and pick best), 'logistic', 'random_forest', 'gradient_boosting', 'ensemble'
+        model_type: 'auto' (try all and pick best), 'logistic', 'random_forest', 'gradient_boosting',
+            'hist_gradient_boosting', 'ensemble'. From HIST_GRADIENT_BOOSTING_MIN_ROWS
+            rows 'auto' uses 'hist_gradient_boosting'
         test_size: Proportion of data for testing
         random_state: Random seed for reproducibility
         enable_tuning: Whether to perform hyperparameter tuning
         enable_scaling: Whether to scale features (recommended for logistic regression)
+        search_mode: 'grid' (sequential grid searches), 'shared' (same selection,
+            one pool over shared folds, tuning scores reused) or 'halving'
+            ('shared' with weak candidates pruned early)
+        progress: Called with the current stage, model family and (outside
+            'grid' mode) candidate and fold as training advances; exceptions it
+            raises abort training, which is how jobs are cancelled
+        subsample: Fit on growing stratified subsamples of the training set and
+            stop once validation ROC-AUC improves by less than min_auc_gain; the
+            learning curve is returned in metrics["learning_curve"]
+        min_auc_gain: Smallest ROC-AUC gain per subsample step worth growing for
 
     Returns:
         Tuple of (trained_model_pipeline, metrics_dict)
     """
-    # Validate DataFrame
-    if "churn_label" not in training_df.columns:
-        raise ValueError("training_df must contain 'churn_label' column")
-
-    for col in feature_columns:
-        if col not in training_df.columns:
-            raise ValueError(f"training_df missing required feature column: {col}")
-
-    if len(training_df) < 50:
-        raise ValueError(f"Insufficient data for training. Need at least 50 samples, got {len(training_df)}")
+    if search_mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search_mode: {search_mode}")
 
-    # Prepare features and labels
-    X = training_df[feature_columns].copy()
-    y = training_df["churn_label"].values
-
-    # Handle missing values (fill with median)
-    X = X.fillna(X.median())
-
-    # Check class balance
-    class_counts = np.bincount(y)
-    if len(class_counts) < 2:
-        raise ValueError("Training data must contain both churned and non-churned customers")
+    if model_type == "auto" and len(training_df) >= HIST_GRADIENT_BOOSTING_MIN_ROWS:
+        model_type = "hist_gradient_boosting"
 
-    minority_class_count = min(class_counts)
-    if minority_class_count < 5:
-        raise ValueError(f"Insufficient samples in minority class: {minority_class_count}. Need at least 5.")
+    # Handle missing values (fill with median) unless the model handles them natively
+    fill_missing = model_type not in NATIVE_MISSING_MODELS
+    X, y, class_counts, feature_medians = _prepare_training_data(training_df, feature_columns, fill_missing)
 
     # Split into train and test with stratification
     X_train, X_test, y_train, y_test = train_test_split(
@@ -93,24 +180,26 @@ def train_churn_model_v2(
         X_test_scaled = X_test.values
 
     # Train model(s)
-    if model_type == "auto":
-        # Try multiple models and pick the best
-        model, best_model_type, cv_scores = _auto_select_model(
-            X_train_scaled, y_train, enable_tuning, random_state
+    learning_curve = None
+    if subsample and len(y_train) > SUBSAMPLE_START_ROWS:
+        model, best_model_type, cv_scores, learning_curve = _fit_on_growing_subsamples(
+            model_type, X_train_scaled, y_train, enable_tuning, random_state,
+            search_mode, min_auc_gain, progress
         )
+        train_samples = learning_curve[-1]["rows"]
     else:
-        # Train specific model
-        model, cv_scores = _train_single_model(
-            model_type, X_train_scaled, y_train, enable_tuning, random_state
+        model, best_model_type, cv_scores = _fit_model(
+            model_type, X_train_scaled, y_train, enable_tuning, random_state, search_mode, progress
         )
-        best_model_type = model_type
+        train_samples = len(X_train)
 
     # Evaluate on test set
+    _report(progress, stage="evaluate", model_family=best_model_type)
     metrics = _evaluate_model_v2(model, X_test_scaled, y_test, feature_columns)
 
     # Add training info
     metrics["model_type"] = best_model_type
-    metrics["train_samples"] = len(X_train)
+    metrics["train_samples"] = train_samples
     metrics["test_samples"] = len(X_test)
     metrics["total_samples"] = len(training_df)
     metrics["churn_rate"] = round(float(y.mean()), 4)
@@ -120,27 +209,304 @@ def train_churn_model_v2(
     }
     metrics["feature_scaling"] = enable_scaling
     metrics["hyperparameter_tuning"] = enable_tuning
+    metrics["search_mode"] = search_mode
     metrics["cv_scores"] = {
         "mean": round(float(np.mean(cv_scores)), 4),
         "std": round(float(np.std(cv_scores)), 4),
         "scores": [round(float(s), 4) for s in cv_scores]
     }
+    if learning_curve is not None:
+        metrics["learning_curve"] = learning_curve
 
     # Create pipeline object
     pipeline = {
         'model': model,
         'scaler': scaler,
-        'feature_columns': feature_columns
+        'feature_columns': feature_columns,
+        'fill_missing': fill_missing,
+        'feature_medians': feature_medians
+    }
+
+    return pipeline, metrics
+
+
+def retrain_churn_model_v2(
+    previous_pipeline: Dict[str, Any],
+    training_df: pd.DataFrame,
+    previous_metrics: Optional[Dict[str, Any]] = None,
+    test_size: float = 0.2,
+    random_state: int = 42,
+    progress: Optional[ProgressCallback] = None
+) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Incremental retraining: update the previous pipeline with new data instead
+    of searching and fitting from scratch.
+
+    The previous model's tuned hyperparameters, feature columns, scaler and
+    missing-value handling are kept, and no hyperparameter search runs.
+    Forests and gradient boosting add WARM_START_GROWTH more trees/stages fitted
+    on the new data, logistic regression restarts its solver from the previous
+    coefficients, and models without warm start (the soft-voting ensemble) are
+    refitted with the same hyperparameters.
+
+    Args:
+        previous_pipeline: Pipeline from train_churn_model_v2 / load_model_v2
+        training_df: Updated features with churn_label column
+        previous_metrics: Metrics saved with the previous model (drift baseline)
+        test_size: Proportion of data for testing
+        random_state: Random seed for reproducibility
+        progress: Progress callback, as in train_churn_model_v2
+
+    Returns:
+        Tuple of (updated pipeline, metrics_dict with a "drift" report)
+    """
+    previous_metrics = previous_metrics or {}
+    previous_model = previous_pipeline['model']
+    feature_columns = previous_pipeline['feature_columns']
+    scaler = previous_pipeline.get('scaler')
+
+    X, y, class_counts, feature_medians = _prepare_training_data(
+        training_df, feature_columns, previous_pipeline.get('fill_missing', True)
+    )
+
+    # Split into train and test with stratification
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=test_size, random_state=random_state, stratify=y
+    )
+
+    # Keep the previous scaling so warm-started coefficients and splits stay meaningful
+    if scaler is not None:
+        X_train_scaled = scaler.transform(X_train)
+        X_test_scaled = scaler.transform(X_test)
+    else:
+        X_train_scaled = X_train.values
+        X_test_scaled = X_test.values
+
+    model_type = previous_metrics.get("model_type") or type(previous_model).__name__
+    _report(progress, stage="warm_start", model_family=model_type)
+    model = _warm_start_model(previous_model)
+    model.fit(X_train_scaled, y_train)
+
+    # Evaluate the retrained model, and the previous one on the same new test set
+    _report(progress, stage="evaluate", model_family=model_type)
+    metrics = _evaluate_model_v2(model, X_test_scaled, y_test, feature_columns)
+    previous_on_new_data = _evaluate_model_v2(previous_model, X_test_scaled, y_test, feature_columns)
+
+    # Add training info
+    metrics["model_type"] = model_type
+    metrics["train_samples"] = len(X_train)
+    metrics["test_samples"] = len(X_test)
+    metrics["total_samples"] = len(training_df)
+    metrics["churn_rate"] = round(float(y.mean()), 4)
+    metrics["class_balance"] = {
+        "non_churned": int(class_counts[0]),
+        "churned": int(class_counts[1]) if len(class_counts) > 1 else 0
     }
+    metrics["feature_scaling"] = scaler is not None
+    metrics["hyperparameter_tuning"] = False
+    metrics["warm_start"] = True
+    metrics["drift"] = _drift_report(previous_metrics, previous_on_new_data, metrics)
+
+    pipeline = {**previous_pipeline, 'model': model, 'feature_medians': feature_medians}
 
     return pipeline, metrics
 
 
+def _warm_start_model(previous_model: Any) -> Any:
+    """
+    Copy of a fitted model that continues from its current state on the next fit().
+    """
+    model = copy.deepcopy(previous_model)
+
+    if isinstance(model, (RandomForestClassifier, GradientBoostingClassifier)):
+        extra = max(WARM_START_MIN_ESTIMATORS, int(model.n_estimators * WARM_START_GROWTH))
+        model.set_params(warm_start=True, n_estimators=model.n_estimators + extra)
+    elif isinstance(model, HistGradientBoostingClassifier):
+        extra = max(WARM_START_MIN_ESTIMATORS, int(model.n_iter_ * WARM_START_GROWTH))
+        model.set_params(warm_start=True, max_iter=model.n_iter_ + extra)
+    elif isinstance(model, LogisticRegression):
+        # lbfgs starts from the previous coefficients (liblinear ignores warm_start)
+        model.set_params(warm_start=True)
+    else:
+        return clone(model)
+
+    return model
+
+
+def _drift_report(
+    previous_metrics: Dict[str, Any],
+    previous_on_new_data: Dict[str, Any],
+    current_metrics: Dict[str, Any]
+) -> Dict[str, Dict[str, Optional[float]]]:
+    """
+    Per metric: the previous model on its own test set, the previous model on the
+    new test set (how much the data drifted) and the retrained model.
+    """
+    report = {}
+    for name in DRIFT_METRICS:
+        previous = previous_metrics.get(name)
+        current = current_metrics.get(name)
+        report[name] = {
+            "previous": previous,
+            "previous_model_on_new_data": previous_on_new_data.get(name),
+            "current": current,
+            "change": round(current - previous, 4) if previous is not None and current is not None else None
+        }
+    return report
+
+
+def _prepare_training_data(
+    training_df: pd.DataFrame,
+    feature_columns: List[str],
+    fill_missing: bool
+) -> Tuple[pd.DataFrame, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Validate the training DataFrame and return features, labels, class counts
+    and the feature medians used to fill missing values (also at predict time).
+    """
+    # Validate DataFrame
+    if "churn_label" not in training_df.columns:
+        raise ValueError("training_df must contain 'churn_label' column")
+
+    for col in feature_columns:
+        if col not in training_df.columns:
+            raise ValueError(f"training_df missing required feature column: {col}")
+
+    if len(training_df) < 50:
+        raise ValueError(f"Insufficient data for training. Need at least 50 samples, got {len(training_df)}")
+
+    # Prepare features and labels
+    X = training_df[feature_columns].copy()
+    y = training_df["churn_label"].values
+
+    medians = X.median()
+    if fill_missing:
+        X = X.fillna(medians)
+
+    # Check class balance
+    class_counts = np.bincount(y)
+    if len(class_counts) < 2:
+        raise ValueError("Training data must contain both churned and non-churned customers")
+
+    minority_class_count = min(class_counts)
+    if minority_class_count < 5:
+        raise ValueError(f"Insufficient samples in minority class: {minority_class_count}. Need at least 5.")
+
+    return X, y, class_counts, medians.to_numpy(dtype=np.float64)
+
+
+def _fit_model(
+    model_type: str,
+    X_train: np.ndarray,
+    y_train: np.ndarray,
+    enable_tuning: bool,
+    random_state: int,
+    search_mode: str = "grid",
+    progress: Optional[ProgressCallback] = None
+) -> Tuple[Any, str, np.ndarray]:
+    """
+    Train the requested model type, or select the best one for 'auto'.
+    """
+    if model_type == "auto":
+        # Try multiple models and pick the best
+        return _auto_select_model(
+            X_train, y_train, enable_tuning, random_state, search_mode, progress
+        )
+
+    # Train specific model
+    model, cv_scores = _train_single_model(
+        model_type, X_train, y_train, enable_tuning, random_state, search_mode, progress
+    )
+    return model, model_type, cv_scores
+
+
+def _fit_on_growing_subsamples(
+    model_type: str,
+    X_train: np.ndarray,
+    y_train: np.ndarray,
+    enable_tuning: bool,
+    random_state: int,
+    search_mode: str,
+    min_auc_gain: float,
+    progress: Optional[ProgressCallback] = None
+) -> Tuple[Any, str, np.ndarray, List[Dict[str, Any]]]:
+    """
+    Fit on nested stratified subsamples, SUBSAMPLE_START_ROWS rows first and
+    SUBSAMPLE_GROWTH times more each step, until validation ROC-AUC gains less
+    than min_auc_gain over the previous step or every row is used.
+
+    Model selection and tuning run once, on the first subsample; later steps
+    refit the selected configuration, and the CV scores are the ones from that
+    search. Steps are scored on a stratified SUBSAMPLE_VALIDATION_FRACTION of
+    the training rows held out from fitting, so the test set is only used for
+    the final evaluation.
+
+    Returns:
+        Tuple of (model from the last step, model type, CV scores, learning curve)
+    """
+    X_fit, X_val, y_fit, y_val = train_test_split(
+        X_train, y_train, test_size=SUBSAMPLE_VALIDATION_FRACTION,
+        random_state=random_state, stratify=y_train
+    )
+    order = _stratified_order(y_fit, random_state)
+
+    learning_curve = []
+    model = None
+    rows = SUBSAMPLE_START_ROWS
+    while True:
+        rows = min(rows, len(y_fit))
+        sample = order[:rows]
+
+        started = time.perf_counter()
+        if model is None:
+            model, best_model_type, cv_scores = _fit_model(
+                model_type, X_fit[sample], y_fit[sample], enable_tuning, random_state, search_mode, progress
+            )
+        else:
+            _report(progress, stage="subsample", model_family=best_model_type, rows=rows)
+            model = clone(model).fit(X_fit[sample], y_fit[sample])
+
+        validation_auc = roc_auc_score(y_val, model.predict_proba(X_val)[:, 1])
+        gain = validation_auc - learning_curve[-1]["validation_roc_auc"] if learning_curve else None
+
+        learning_curve.append({
+            "rows": rows,
+            "validation_roc_auc": float(validation_auc),
+            "gain": None if gain is None else round(float(gain), 4),
+            "seconds": round(time.perf_counter() - started, 1)
+        })
+        print(f"Subsample: {rows} rows, validation ROC-AUC {validation_auc:.4f}")
+
+        if rows == len(y_fit) or (gain is not None and gain < min_auc_gain):
+            break
+        rows *= SUBSAMPLE_GROWTH
+
+    for step in learning_curve:
+        step["validation_roc_auc"] = round(step["validation_roc_auc"], 4)
+
+    return model, best_model_type, cv_scores, learning_curve
+
+
+def _stratified_order(y: np.ndarray, random_state: int) -> np.ndarray:
+    """
+    Random row order in which every prefix keeps the class balance of y.
+    """
+    rng = np.random.default_rng(random_state)
+    position = np.empty(len(y))
+    for label in np.unique(y):
+        members = np.flatnonzero(y == label)
+        rng.shuffle(members)
+        position[members] = (np.arange(len(members)) + 0.5) / len(members)
+    return np.argsort(position, kind="stable")
+
+
 def _auto_select_model(
     X_train: np.ndarray,
     y_train: np.ndarray,
     enable_tuning: bool,
-    random_state: int
+    random_state: int,
+    search_mode: str = "grid",
+    progress: Optional[ProgressCallback] = None
 ) -> Tuple[Any, str, np.ndarray]:
     """
     Try multiple models and select the best based on cross-validation.
@@ -174,7 +540,19 @@ def _auto_select_model(
 
     cv = StratifiedKFold(n_splits=min(5, len(y_train) // 10), shuffle=True, random_state=random_state)
 
+    if search_mode != "grid":
+        best_model_name, best_model, best_cv_scores = _search_models(
+            models_to_try, X_train, y_train, enable_tuning, cv,
+            halving=search_mode == "halving", progress=progress
+        )
+        _report(progress, stage="refit", model_family=best_model_name)
+        best_model.fit(X_train, y_train)
+        print(f"Selected model: {best_model_name} with CV ROC-AUC: {np.mean(best_cv_scores):.4f}")
+        return best_model, best_model_name, best_cv_scores
+
     for model_name, model in models_to_try.items():
+        _report(progress, stage="search", model_family=model_name)
+
         # Train model
         if enable_tuning:
             model = _tune_hyperparameters(model_name, model, X_train, y_train, cv)
@@ -192,6 +570,7 @@ def _auto_select_model(
             best_cv_scores = cv_scores
 
     # Train best model on full training data
+    _report(progress, stage="refit", model_family=best_model_name)
     best_model.fit(X_train, y_train)
 
     print(f"Selected model: {best_model_name} with CV ROC-AUC: {best_score:.4f}")
@@ -204,7 +583,9 @@ def _train_single_model(
     X_train: np.ndarray,
     y_train: np.ndarray,
     enable_tuning: bool,
-    random_state: int
+    random_state: int,
+    search_mode: str = "grid",
+    progress: Optional[ProgressCallback] = None
 ) -> Tuple[Any, np.ndarray]:
     """
     Train a specific model type.
@@ -232,6 +613,14 @@ def _train_single_model(
             learning_rate=0.1,
             min_samples_split=5
         )
+    elif model_type == "hist_gradient_boosting":
+        model = HistGradientBoostingClassifier(
+            max_iter=200,
+            random_state=random_state,
+            class_weight='balanced',
+            learning_rate=0.1,
+            max_leaf_nodes=31
+        )
     elif model_type == "ensemble":
         # Ensemble of multiple models
         lr = LogisticRegression(random_state=random_state, max_iter=2000, class_weight='balanced')
@@ -245,6 +634,19 @@ def _train_single_model(
     else:
         raise ValueError(f"Unknown model_type: {model_type}")
 
+    if search_mode != "grid":
+        cv = StratifiedKFold(n_splits=min(5, len(y_train) // 10), shuffle=True, random_state=random_state)
+        _, model, cv_scores = _search_models(
+            {model_type: model}, X_train, y_train,
+            enable_tuning and model_type != "ensemble", cv,
+            halving=search_mode == "halving", progress=progress
+        )
+        _report(progress, stage="refit", model_family=model_type)
+        model.fit(X_train, y_train)
+        return model, cv_scores
+
+    _report(progress, stage="search", model_family=model_type)
+
     # Hyperparameter tuning
     if enable_tuning and model_type != "ensemble":
         cv = StratifiedKFold(n_splits=min(5, len(y_train) // 10), shuffle=True, random_state=random_state)
@@ -255,6 +657,7 @@ def _train_single_model(
     cv_scores = cross_val_score(model, X_train, y_train, cv=cv, scoring='roc_auc', n_jobs=-1)
 
     # Train on full training data
+    _report(progress, stage="refit", model_family=model_type)
     model.fit(X_train, y_train)
 
     return model, cv_scores
@@ -270,30 +673,10 @@ def _tune_hyperparameters(
     """
     Perform grid search for hyperparameter tuning.
     """
-    param_grids = {
-        "logistic_regression": {
-            'C': [0.01, 0.1, 1.0, 10.0],
-            'penalty': ['l2'],
-            'solver': ['lbfgs', 'liblinear']
-        },
-        "random_forest": {
-            'n_estimators': [50, 100, 200],
-            'max_depth': [5, 10, 15, None],
-            'min_samples_split': [2, 5, 10],
-            'min_samples_leaf': [1, 2, 4]
-        },
-        "gradient_boosting": {
-            'n_estimators': [50, 100, 200],
-            'max_depth': [3, 5, 7],
-            'learning_rate': [0.01, 0.1, 0.2],
-            'min_samples_split': [2, 5, 10]
-        }
-    }
-
-    if model_type not in param_grids:
+    if model_type not in PARAM_GRIDS:
         return model
 
-    param_grid = param_grids[model_type]
+    param_grid = PARAM_GRIDS[model_type]
 
     grid_search = GridSearchCV(
         model,
@@ -312,6 +695,144 @@ def _tune_hyperparameters(
     return grid_search.best_estimator_
 
 
+def _search_models(
+    models: Dict[str, Any],
+    X_train: np.ndarray,
+    y_train: np.ndarray,
+    enable_tuning: bool,
+    cv: Any,
+    halving: bool = False,
+    n_jobs: int = -1,
+    progress: Optional[ProgressCallback] = None
+) -> Tuple[str, Any, np.ndarray]:
+    """
+    Score every (model family, parameters) candidate on one set of folds,
+    split once and shared by all families, in a single joblib process pool.
+
+    Candidates are ordered like the sequential grid searches and ties go to the
+    earliest one, so without halving the winner and its fold scores are the ones
+    GridSearchCV + cross_val_score select; the fold scores are returned as the
+    CV scores instead of cross-validating the winner again.
+
+    With halving, every candidate is scored on the first MIN_HALVING_FOLDS
+    folds, then one more fold per rung. After each rung the best
+    1/HALVING_FACTOR by mean score so far move on, plus any candidate whose
+    fold-by-fold deficit to the leader is within one standard error, since a
+    single fold is too noisy to drop close contenders on.
+
+    progress is called as each (candidate, fold) score comes back.
+
+    Returns:
+        Tuple of (model name, unfitted best estimator, its fold scores)
+    """
+    folds = list(cv.split(X_train, y_train))
+    candidates = []
+    family_starts = {}
+    for model_name, model in models.items():
+        family_starts[model_name] = len(candidates)
+        param_grid = PARAM_GRIDS.get(model_name) if enable_tuning else None
+        for params in (ParameterGrid(param_grid) if param_grid else [{}]):
+            candidates.append((model_name, clone(model).set_params(**params)))
+    family_sizes = {
+        model_name: sum(name == model_name for name, _ in candidates) for model_name in models
+    }
+
+    rungs = list(range(min(MIN_HALVING_FOLDS, len(folds)), len(folds) + 1)) if halving else [len(folds)]
+    scores = np.full((len(candidates), len(folds)), np.nan)
+    alive = np.arange(len(candidates))
+    scored_folds = 0
+
+    with Parallel(n_jobs=n_jobs, return_as="generator") as parallel:
+        for rung_folds in rungs:
+            jobs = [(i, f) for i in alive for f in range(scored_folds, rung_folds)]
+            fold_scores = parallel(
+                delayed(_fit_and_score_fold)(candidates[i][1], X_train, y_train, *folds[f])
+                for i, f in jobs
+            )
+            # The generator goes first so it runs to completion before the next rung
+            for done, (score, (i, f)) in enumerate(zip(fold_scores, jobs), start=1):
+                scores[i, f] = score
+                model_name = candidates[i][0]
+                _report(
+                    progress,
+                    stage="search",
+                    model_family=model_name,
+                    candidate=int(i) - family_starts[model_name] + 1,
+                    candidates=family_sizes[model_name],
+                    fold=f + 1,
+                    folds=len(folds),
+                    completed=done,
+                    total=len(jobs)
+                )
+            scored_folds = rung_folds
+
+            if scored_folds < len(folds):
+                alive = _halve(alive, scores[alive, :scored_folds])
+                print(f"Halving: {len(alive)} of {len(candidates)} candidates after {scored_folds} folds")
+
+    # First maximum wins, as in GridSearchCV ranking and the family comparison
+    best = alive[np.argmax(_nan_as_worst(scores[alive].mean(axis=1)))]
+    best_name, best_model = candidates[best]
+
+    for model_name in models:
+        family = [i for i in alive if candidates[i][0] == model_name]
+        if family:
+            family_best = family[np.argmax(_nan_as_worst(scores[family].mean(axis=1)))]
+            print(f"Model: {model_name}, CV ROC-AUC: {np.mean(scores[family_best]):.4f} "
+                  f"(+/- {np.std(scores[family_best]):.4f})")
+
+    return best_name, clone(best_model), scores[best]
+
+
+def _report(progress: Optional[ProgressCallback], **update) -> None:
+    """
+    Pass a progress update to the callback, if any.
+    """
+    if progress is not None:
+        progress(update)
+
+
+def _halve(alive: np.ndarray, partial_scores: np.ndarray) -> np.ndarray:
+    """
+    Candidates that survive a halving rung, given their scores on the folds so far.
+    """
+    means = _nan_as_worst(partial_scores.mean(axis=1))
+    order = np.argsort(-means, kind="stable")
+    keep = np.zeros(len(alive), dtype=bool)
+    keep[order[:int(np.ceil(len(alive) / HALVING_FACTOR))]] = True
+
+    # Paired comparison with the leader on the same folds
+    deficit = partial_scores[order[0]] - partial_scores
+    standard_error = deficit.std(axis=1, ddof=1) / np.sqrt(partial_scores.shape[1])
+    keep |= deficit.mean(axis=1) <= standard_error
+
+    return alive[keep]
+
+
+def _nan_as_worst(means: np.ndarray) -> np.ndarray:
+    """
+    Failed candidates (NaN scores) rank below every scored one.
+    """
+    return np.where(np.isnan(means), -np.inf, means)
+
+
+def _fit_and_score_fold(
+    model: Any,
+    X: np.ndarray,
+    y: np.ndarray,
+    train_idx: np.ndarray,
+    test_idx: np.ndarray
+) -> float:
+    """
+    ROC-AUC of a fresh clone fitted on one fold (NaN if the fit fails, like GridSearchCV).
+    """
+    try:
+        estimator = clone(model).fit(X[train_idx], y[train_idx])
+        return get_scorer("roc_auc")(estimator, X[test_idx], y[test_idx])
+    except Exception:
+        return np.nan
+
+
 def _evaluate_model_v2(
     model: Any,
     X_test: np.ndarray,
@@ -406,9 +927,15 @@ def save_model_v2(
     model_dir = Path(base_path) / str(organization_id)
     model_dir.mkdir(parents=True, exist_ok=True)
 
-    # Save model pipeline
+    # Save model pipeline (full sklearn objects, used for warm-start retraining)
     model_path = model_dir / "churn_model_v2.pkl"
-    joblib.dump(pipeline, model_path)
+    tmp_path = model_dir / f".churn_model_v2.pkl.{os.getpid()}.tmp"
+    joblib.dump(pipeline, tmp_path)
+    # Rename into place so concurrent loads never see a half-written pickle
+    os.replace(tmp_path, model_path)
+
+    # Memory-mappable serving artifact and manifest, used for predictions
+    save_model_artifact(pipeline, model_dir)
 
     # Save metadata
     metadata_path = model_dir / "model_metadata_v2.json"
@@ -419,14 +946,43 @@ def save_model_v2(
     return str(model_path)
 
 
-def load_model_v2(
+def load_model_metadata_v2(
     organization_id: str,
     base_path: str = "models"
+) -> Optional[Dict[str, Any]]:
+    """
+    Load the metrics saved with the model pipeline (None if there are none).
+    """
+    metadata_path = Path(base_path) / str(organization_id) / "model_metadata_v2.json"
+
+    if not metadata_path.exists():
+        return None
+
+    import json
+    with open(metadata_path) as f:
+        return json.load(f)
+
+
+def load_model_v2(
+    organization_id: str,
+    base_path: str = "models",
+    mmap: bool = True
 ) -> Dict[str, Any]:
     """
     Load trained model pipeline from disk.
+
+    With mmap=True the memory-mapped serving artifact is loaded when present
+    (prediction only; tree ensembles are CompactTreeEnsemble). mmap=False
+    loads the full sklearn pipeline, as needed for warm-start retraining.
     """
-    model_path = Path(base_path) / str(organization_id) / "churn_model_v2.pkl"
+    model_dir = Path(base_path) / str(organization_id)
+
+    if mmap:
+        pipeline = load_model_artifact(model_dir)
+        if pipeline is not None:
+            return pipeline
+
+    model_path = model_dir / "churn_model_v2.pkl"
 
     if not model_path.exists():
         raise FileNotFoundError(f"Model V2 not found for organization {organization_id}")
@@ -436,13 +992,16 @@ def load_model_v2(
 
 def predict_v2(
     pipeline: Dict[str, Any],
-    features_df: pd.DataFrame
+    features_df: pd.DataFrame,
+    risk_thresholds: Optional[Tuple[float, float, float]] = None
 ) -> pd.DataFrame:
     """
     Generate predictions using model pipeline.
+
+    Missing values are filled with the training medians stored in the
+    pipeline, so a customer's score does not depend on the rest of the batch
+    (pipelines saved before medians were stored fall back to batch medians).
     """
-    model = pipeline['model']
-    scaler = pipeline.get('scaler')
     feature_columns = pipeline['feature_columns']
 
     # Validate features
@@ -450,37 +1009,50 @@ def predict_v2(
         if col not in features_df.columns:
             raise ValueError(f"features_df missing required column: {col}")
 
-    # Extract and prepare features
-    X = features_df[feature_columns].copy()
-    X = X.fillna(X.median())  # Handle any missing values
-
-    # Scale if scaler exists
-    if scaler is not None:
-        X_scaled = scaler.transform(X)
-    else:
-        X_scaled = X.values
-
-    # Predict probabilities
-    churn_probabilities = model.predict_proba(X_scaled)[:, 1]
-
-    # Calculate risk segments
-    def get_risk_segment(prob):
-        if prob < 0.3:
-            return "Low"
-        elif prob < 0.5:
-            return "Medium"
-        elif prob < 0.7:
-            return "High"
-        else:
-            return "Critical"
-
-    risk_segments = [get_risk_segment(prob) for prob in churn_probabilities]
+    X = features_df[feature_columns].to_numpy(dtype=np.float64)
+    churn_probabilities = predict_proba_v2(pipeline, X)
 
     # Build results DataFrame
     results = pd.DataFrame({
-        "customer_id": features_df["customer_id"],
-        "churn_probability": [round(prob, 4) for prob in churn_probabilities],
-        "risk_segment": risk_segments
-    })
+        "customer_id": features_df["customer_id"].to_numpy(),
+        "churn_probability": _round_like_builtin(churn_probabilities, 4),
+        "risk_segment": risk_segments(churn_probabilities, risk_thresholds)
+    }, index=features_df.index)
 
     return results
+
+
+def predict_proba_v2(pipeline: Dict[str, Any], X: np.ndarray) -> np.ndarray:
+    """
+    Churn probabilities for a feature matrix in pipeline['feature_columns'] order.
+    """
+    model = pipeline['model']
+    scaler = pipeline.get('scaler')
+
+    if pipeline.get('fill_missing', True):
+        missing = np.isnan(X)
+        if missing.any():
+            medians = pipeline.get('feature_medians')
+            if medians is None:
+                medians = np.nanmedian(X, axis=0)
+            X = np.where(missing, medians, X)
+
+    # Scale if scaler exists (fitted on a DataFrame, so keep the column names)
+    if scaler is not None:
+        X = scaler.transform(pd.DataFrame(X, columns=pipeline['feature_columns'], copy=False))
+
+    return model.predict_proba(X)[:, 1]
+
+
+def risk_segments(
+    churn_probabilities: np.ndarray,
+    risk_thresholds: Optional[Tuple[float, float, float]] = None
+) -> np.ndarray:
+    """
+    Risk segment of each probability: below the first threshold is Low, at or
+    above the last is Critical.
+    """
+    thresholds = RISK_THRESHOLDS if risk_thresholds is None else tuple(risk_thresholds)
+    if len(thresholds) != len(RISK_SEGMENTS) - 1 or list(thresholds) != sorted(thresholds):
+        raise ValueError(f"risk_thresholds must be {len(RISK_SEGMENTS) - 1} ascending values")
+    return RISK_SEGMENTS[np.digitize(churn_probabilities, thresholds)]
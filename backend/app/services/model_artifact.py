@@ -0,0 +1,320 @@
+"""
+Model Artifact
+Serving format for V2 model pipelines: one uncompressed joblib file loaded with
+mmap_mode='r', plus a JSON manifest describing it. numpy arrays in the file
+(coefficients, scaler parameters, histogram boosting predictors) are memory
+mapped, so every worker process serving an organization shares one page-cache
+copy instead of unpickling its own.
+
+sklearn DecisionTree objects copy their nodes into private buffers when
+unpickled, so random forest and gradient boosting models are stored as a
+CompactTreeEnsemble: all trees flattened into a few node arrays that stay
+memory mapped and are traversed by a numba loop when numba is installed,
+otherwise with NumPy.
+
+Artifacts are written to a temporary file and renamed into place; processes
+still mapping the previous file keep reading it until they reload. Loading
+checks the artifact against the size and sha256 recorded in the manifest.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import joblib
+import numpy as np
+import sklearn
+from scipy.special import expit
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+from app.core.config import settings
+
+
+ARTIFACT_FORMAT_VERSION = 2
+ARTIFACT_FILENAME = "churn_model_v2.joblib"
+MANIFEST_FILENAME = "churn_model_v2.manifest.json"
+
+# Rows traversed per step; bounds the (rows x trees) node index matrix
+PREDICT_CHUNK_ROWS = 10000
+
+# Set MODEL_ARTIFACT_NUMBA=false to force the NumPy tree traversal
+USE_NUMBA = numba is not None and settings.MODEL_ARTIFACT_NUMBA
+
+
+class CompactTreeEnsemble:
+    """
+    Binary tree ensemble over flat node arrays, matching predict_proba of the
+    RandomForestClassifier or GradientBoostingClassifier it was built from.
+    Leaf values are added one tree at a time in tree order, as sklearn does,
+    so probabilities are bit-identical (for forests, to single-job prediction).
+
+    Node arrays are indexed globally across trees; `roots[t]` is the first
+    node of tree t and leaves have `left == -1`. `value` (nodes x outputs)
+    holds each leaf's contribution: the class-0 and class-1 fractions for
+    forests (averaged over trees) and learning_rate * leaf value for boosting
+    (summed onto `init_raw` and passed through the logistic function).
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        roots: np.ndarray,
+        left: np.ndarray,
+        right: np.ndarray,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        missing_left: np.ndarray,
+        value: np.ndarray,
+        classes: np.ndarray,
+        feature_importances: np.ndarray,
+        init_raw: float = 0.0
+    ):
+        self.kind = kind
+        self.roots = roots
+        self.left = left
+        self.right = right
+        self.feature = feature
+        self.threshold = threshold
+        self.missing_left = missing_left
+        self.value = value
+        self.classes_ = classes
+        self.feature_importances_ = feature_importances
+        self.n_features_in_ = len(feature_importances)
+        self.init_raw = init_raw
+
+    @classmethod
+    def from_estimator(cls, model) -> "CompactTreeEnsemble":
+        if isinstance(model, RandomForestClassifier):
+            kind = "forest"
+            trees = [estimator.tree_ for estimator in model.estimators_]
+            scale = 1.0
+            init_raw = 0.0
+        elif isinstance(model, GradientBoostingClassifier):
+            kind = "boosting"
+            trees = [stage[0].tree_ for stage in model.estimators_]
+            scale = model.learning_rate
+            # Prior log-odds; constant for the default DummyClassifier init
+            init_raw = float(model._raw_predict_init(np.zeros((1, model.n_features_in_)))[0, 0])
+        else:
+            raise ValueError(f"Unsupported model type: {type(model).__name__}")
+
+        offsets = np.r_[0, np.cumsum([tree.node_count for tree in trees])]
+        left, right, feature, threshold, missing_left, value = [], [], [], [], [], []
+        for offset, tree in zip(offsets[:-1], trees):
+            is_leaf = tree.children_left == -1
+            left.append(np.where(is_leaf, -1, tree.children_left + offset))
+            right.append(np.where(is_leaf, -1, tree.children_right + offset))
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            missing_left.append(tree.missing_go_to_left.astype(bool))
+            if kind == "forest":
+                counts = tree.value[:, 0, :]
+                value.append(counts / counts.sum(axis=1)[:, None])
+            else:
+                value.append(scale * tree.value[:, 0, :1])
+
+        return cls(
+            kind=kind,
+            roots=offsets[:-1].astype(np.int32),
+            left=np.concatenate(left).astype(np.int32),
+            right=np.concatenate(right).astype(np.int32),
+            feature=np.concatenate(feature).astype(np.int32),
+            threshold=np.concatenate(threshold).astype(np.float64),
+            missing_left=np.concatenate(missing_left),
+            value=np.concatenate(value).astype(np.float64),
+            classes=np.asarray(model.classes_),
+            feature_importances=np.asarray(model.feature_importances_, dtype=np.float64),
+            init_raw=init_raw
+        )
+
+    def _raw_sums(self, X: np.ndarray, start: float) -> np.ndarray:
+        """
+        (rows, outputs) start + leaf contributions, added one tree at a time in
+        tree order like sklearn. X is compared as float32 like sklearn trees.
+        """
+        if USE_NUMBA:
+            return _raw_sums_numba(
+                X, self.roots, self.left, self.right, self.feature,
+                self.threshold, self.missing_left, self.value, start
+            )
+
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        while True:
+            internal = self.left[node] != -1
+            if not internal.any():
+                break
+            x = X[rows, self.feature[node]]
+            go_left = np.where(np.isnan(x), self.missing_left[node], x <= self.threshold[node])
+            child = np.where(go_left, self.left[node], self.right[node])
+            node = np.where(internal, child, node)
+
+        # Not .sum(axis=1): pairwise summation rounds differently
+        sums = np.full((len(X), self.value.shape[1]), start, dtype=np.float64)
+        for t in range(node.shape[1]):
+            sums += self.value[node[:, t]]
+        return sums
+
+    def predict_proba(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32)
+        proba = np.empty((len(X), 2), dtype=np.float64)
+        for start in range(0, len(X), PREDICT_CHUNK_ROWS):
+            chunk = X[start:start + PREDICT_CHUNK_ROWS]
+            if self.kind == "forest":
+                proba[start:start + PREDICT_CHUNK_ROWS] = self._raw_sums(chunk, 0.0) / len(self.roots)
+            else:
+                positive = expit(self._raw_sums(chunk, self.init_raw)[:, 0])
+                proba[start:start + PREDICT_CHUNK_ROWS, 0] = 1.0 - positive
+                proba[start:start + PREDICT_CHUNK_ROWS, 1] = positive
+        return proba
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[(self.predict_proba(X)[:, 1] > 0.5).astype(int)]
+
+
+def _raw_sums_python(X, roots, left, right, feature, threshold, missing_left, value, start):
+    """
+    Per-row, per-tree leaf walk accumulating start + leaf values in tree
+    order; compiled with numba as _raw_sums_numba.
+    """
+    out = np.full((X.shape[0], value.shape[1]), start, dtype=np.float64)
+    # Tree-major order keeps one tree's nodes in cache across rows
+    for t in range(roots.shape[0]):
+        for i in range(X.shape[0]):
+            node = roots[t]
+            while left[node] != -1:
+                x = X[i, feature[node]]
+                if np.isnan(x):
+                    go_left = missing_left[node]
+                else:
+                    go_left = x <= threshold[node]
+                node = left[node] if go_left else right[node]
+            for k in range(value.shape[1]):
+                out[i, k] += value[node, k]
+    return out
+
+
+if numba is not None:
+    _raw_sums_numba = numba.njit(cache=True, nogil=True)(_raw_sums_python)
+
+
+def to_serving_pipeline(pipeline: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Copy of the pipeline with tree ensembles replaced by CompactTreeEnsemble.
+    """
+    model = pipeline['model']
+    if isinstance(model, (RandomForestClassifier, GradientBoostingClassifier)):
+        return {**pipeline, 'model': CompactTreeEnsemble.from_estimator(model)}
+    return dict(pipeline)
+
+
+def _array_entries(obj: Any, prefix: str, entries: list, seen: set) -> None:
+    """
+    Collect numpy arrays reachable from obj (dicts, lists and object attributes).
+    """
+    if id(obj) in seen:
+        return
+    seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        if obj.dtype != object:
+            entries.append({
+                "name": prefix,
+                "dtype": str(obj.dtype),
+                "shape": list(obj.shape),
+                "nbytes": int(obj.nbytes)
+            })
+        return
+    if isinstance(obj, dict):
+        items = obj.items()
+    elif isinstance(obj, (list, tuple)):
+        items = enumerate(obj)
+    elif hasattr(obj, "__dict__"):
+        items = vars(obj).items()
+    else:
+        return
+    for key, child in items:
+        _array_entries(child, f"{prefix}.{key}" if prefix else str(key), entries, seen)
+
+
+def save_model_artifact(pipeline: Dict[str, Any], model_dir: Path) -> Dict[str, Any]:
+    """
+    Write the serving artifact and its manifest to model_dir; returns the manifest.
+    """
+    serving = to_serving_pipeline(pipeline)
+    artifact_path = model_dir / ARTIFACT_FILENAME
+    tmp_path = model_dir / f".{ARTIFACT_FILENAME}.{os.getpid()}.tmp"
+    # Uncompressed so arrays can be memory mapped on load
+    joblib.dump(serving, tmp_path, compress=0)
+
+    arrays: list = []
+    _array_entries(serving, "", arrays, set())
+    manifest = {
+        "format_version": ARTIFACT_FORMAT_VERSION,
+        "artifact": ARTIFACT_FILENAME,
+        "model_class": type(pipeline['model']).__name__,
+        "serving_class": type(serving['model']).__name__,
+        "feature_columns": list(pipeline['feature_columns']),
+        "size_bytes": tmp_path.stat().st_size,
+        "sha256": _file_sha256(tmp_path),
+        "arrays": arrays,
+        "versions": {
+            "numpy": np.__version__,
+            "scikit-learn": sklearn.__version__,
+            "joblib": joblib.__version__
+        },
+        "created_at": datetime.utcnow().isoformat()
+    }
+
+    # Rename instead of overwriting: live memory maps of the old file stay valid
+    os.replace(tmp_path, artifact_path)
+    manifest_tmp = model_dir / f".{MANIFEST_FILENAME}.{os.getpid()}.tmp"
+    with open(manifest_tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_tmp, model_dir / MANIFEST_FILENAME)
+
+    return manifest
+
+
+def load_model_artifact(model_dir: Path) -> Optional[Dict[str, Any]]:
+    """
+    Memory-mapped serving pipeline, or None without a readable artifact of
+    the current format that matches its manifest.
+    """
+    manifest_path = model_dir / MANIFEST_FILENAME
+    if not manifest_path.exists():
+        return None
+
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != ARTIFACT_FORMAT_VERSION:
+        return None
+
+    artifact_path = model_dir / manifest["artifact"]
+    if not artifact_path.exists():
+        return None
+
+    # A retrain swaps the artifact and the manifest with two renames; a pair
+    # from different saves (or a damaged file) falls back to the pickle
+    if (
+        artifact_path.stat().st_size != manifest.get("size_bytes")
+        or _file_sha256(artifact_path) != manifest.get("sha256")
+    ):
+        print(f"Warning: {artifact_path} does not match its manifest, ignoring it")
+        return None
+
+    return joblib.load(artifact_path, mmap_mode="r")
+
+
+def _file_sha256(path: Path) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
@@ -0,0 +1,204 @@
+"""
+Model Registry
+Per-process LRU cache of loaded churn models, so predictions stop paying for
+deserialization on every call. Entries are keyed by model kind, base path and
+organization, and bounded by count and by the on-disk size of their files.
+
+Every lookup stats the model's files; a different mtime, size or inode (a
+retrain renames new files into place) reloads the model, so no explicit
+invalidation is needed across processes.
+"""
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.ml_pipeline import load_model
+from app.services.ml_training import load_model_from_disk
+from app.services.ml_training_v2 import load_model_v2
+from app.services.model_artifact import ARTIFACT_FILENAME, MANIFEST_FILENAME, load_model_artifact
+
+
+FileVersion = Tuple[Tuple[str, int, int, int], ...]
+
+
+class ModelRegistry:
+    """
+    Thread-safe LRU of loaded models with hit, miss, eviction and reload counters.
+    """
+
+    def __init__(self, max_models: int = 32, max_bytes: int = 512 * 1024 * 1024):
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, ...], Tuple[FileVersion, int, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.reloads = 0
+
+    @classmethod
+    def from_settings(cls) -> "ModelRegistry":
+        return cls(
+            max_models=settings.MODEL_REGISTRY_MAX_MODELS,
+            max_bytes=settings.MODEL_REGISTRY_MAX_MB * 1024 * 1024
+        )
+
+    def get(
+        self,
+        key: Tuple[str, ...],
+        files: List[Path],
+        loader: Callable[[], Any],
+        loaded_files: Optional[Callable[[], List[str]]] = None
+    ) -> Any:
+        """
+        Cached model for key, loading it when absent or when files changed.
+
+        loader raises FileNotFoundError when there is no model; nothing is cached then.
+        Every file in files invalidates the entry, but only the ones named by
+        loaded_files (called after loading; all files by default) count
+        toward max_bytes.
+        """
+        version = _file_version(files)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+            if entry is not None:
+                self.reloads += 1
+                self._remove(key)
+
+        # Load outside the lock so other organizations are served meanwhile
+        model = loader()
+        counted = None if loaded_files is None else set(loaded_files())
+        size = sum(size for name, _, size, _ in version if counted is None or name in counted)
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size <= self.max_bytes:
+                self._entries[key] = (version, size, model)
+                self._bytes += size
+                self._evict()
+        return model
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "models": len(self._entries),
+                "bytes": self._bytes,
+                "max_models": self.max_models,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "reloads": self.reloads,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None
+            }
+
+    def _remove(self, key: Tuple[str, ...]) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _evict(self) -> None:
+        """
+        Drop least recently used models until both bounds hold.
+        """
+        while self._entries and (
+            len(self._entries) > self.max_models or self._bytes > self.max_bytes
+        ):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+
+def _file_version(files: List[Path]) -> FileVersion:
+    """
+    (name, mtime_ns, size, inode) of each existing file; missing files are skipped.
+    """
+    version = []
+    for path in files:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        version.append((path.name, stat.st_mtime_ns, stat.st_size, stat.st_ino))
+    return tuple(version)
+
+
+_registry: Optional[ModelRegistry] = None
+
+
+def get_model_registry() -> ModelRegistry:
+    """
+    Per-process registry sized by MODEL_REGISTRY_MAX_MODELS and MODEL_REGISTRY_MAX_MB.
+    """
+    global _registry
+    if _registry is None:
+        _registry = ModelRegistry.from_settings()
+    return _registry
+
+
+def get_model_v2(organization_id: str, base_path: str = "models") -> Dict[str, Any]:
+    """
+    Cached load_model_v2 (memory-mapped serving artifact when present).
+    """
+    model_dir = Path(base_path) / str(organization_id)
+    files = [
+        model_dir / MANIFEST_FILENAME,
+        model_dir / ARTIFACT_FILENAME,
+        model_dir / "churn_model_v2.pkl"
+    ]
+    loaded_files: List[str] = []
+
+    def loader() -> Dict[str, Any]:
+        # Same order as load_model_v2(mmap=True), remembering which file was read
+        pipeline = load_model_artifact(model_dir)
+        if pipeline is not None:
+            loaded_files[:] = [MANIFEST_FILENAME, ARTIFACT_FILENAME]
+            return pipeline
+        loaded_files[:] = ["churn_model_v2.pkl"]
+        return load_model_v2(organization_id, base_path, mmap=False)
+
+    return get_model_registry().get(
+        ("v2", base_path, str(organization_id)),
+        files,
+        loader,
+        loaded_files=lambda: loaded_files
+    )
+
+
+def get_model_from_disk(organization_id: str, base_path: str = "models") -> Any:
+    """
+    Cached ml_training.load_model_from_disk.
+    """
+    model_path = Path(base_path) / str(organization_id) / "churn_model.pkl"
+    return get_model_registry().get(
+        ("v1", base_path, str(organization_id)),
+        [model_path],
+        lambda: load_model_from_disk(organization_id, base_path)
+    )
+
+
+def get_model(organization_id, base_path: str = "models") -> Any:
+    """
+    Cached ml_pipeline.load_model.
+    """
+    model_path = Path(base_path) / str(organization_id) / "churn_model.pkl"
+    return get_model_registry().get(
+        ("v1", base_path, str(organization_id)),
+        [model_path],
+        lambda: load_model(organization_id, base_path)
+    )
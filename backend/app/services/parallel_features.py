@@ -0,0 +1,184 @@
+"""
+Parallel Feature Engineering
+Splits the event DataFrame into customer partitions and featurizes them in a
+process pool. Event columns are handed to workers as NumPy buffers in shared
+memory, so only partition offsets are pickled, never DataFrames.
+"""
+import os
+import pandas as pd
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple, Any
+from datetime import datetime
+
+from app.services.feature_engineering_v2 import engineer_features_from_csv_v2_vectorized
+from app.services.feature_engineering_csv import (
+    engineer_features_from_csv,
+    _normalize_monetary_scores as _normalize_monetary_scores_v1
+)
+from app.services.feature_streaming import merge_partition_features
+from app.services.event_loader import has_event_dates, event_datetimes, plain_customer_ids
+
+
+# Below this many rows the pool start-up costs more than it saves
+MIN_ROWS_FOR_POOL = 50_000
+
+
+def engineer_features_parallel(
+    df: pd.DataFrame,
+    feature_version: str = "v2",
+    lookback_days: int = 90,
+    current_date: Optional[datetime] = None,
+    has_churn_label: bool = False,
+    max_workers: Optional[int] = None,
+    num_partitions: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Engineer customer features across a pool of worker processes.
+
+    Produces the same DataFrame as engineer_features_from_csv_v2 ('v2') or
+    engineer_features_from_csv ('v1') on the whole input; monetary scores are
+    normalized over all customers after the partitions are merged.
+
+    Args:
+        df: DataFrame with customer transaction data
+        feature_version: 'v2' (15 features) or 'v1' (8 features)
+        lookback_days: Number of days to look back for frequency/monetary calculation
+        current_date: Reference date for calculations (defaults to today)
+        has_churn_label: Whether the CSV includes a churn_label column
+        max_workers: Worker processes (defaults to the CPU count)
+        num_partitions: Customer partitions (defaults to 4 per worker for load balancing)
+
+    Returns:
+        DataFrame with customer-level features
+    """
+    if feature_version not in ("v1", "v2"):
+        raise ValueError(f"Unknown feature_version: {feature_version}")
+    if "customer_id" not in df.columns:
+        raise ValueError("CSV must contain 'customer_id' column")
+    if not has_event_dates(df):
+        raise ValueError("CSV must contain 'event_date' column")
+
+    if current_date is None:
+        current_date = datetime.now().date()
+    max_workers = max_workers or os.cpu_count() or 1
+    num_partitions = num_partitions or max_workers * 4
+
+    params = {
+        "lookback_days": lookback_days,
+        "current_date": current_date,
+        "has_churn_label": has_churn_label
+    }
+
+    if max_workers == 1 or len(df) < MIN_ROWS_FOR_POOL:
+        if feature_version == "v2":
+            return engineer_features_from_csv_v2_vectorized(df, **params)
+        return engineer_features_from_csv(df, **params)
+
+    columns, customer_ids = _encode_columns(df, feature_version, has_churn_label)
+
+    # Stable sort by partition keeps each customer's rows in file order
+    partition = columns["customer_id"] % num_partitions
+    order = np.argsort(partition, kind="stable")
+    bounds = np.searchsorted(partition[order], np.arange(num_partitions + 1))
+
+    segments = []
+    try:
+        specs = {}
+        for name, values in columns.items():
+            segment = _to_shared_memory(values[order])
+            segments.append(segment)
+            specs[name] = (segment.name, values.dtype.str, len(values))
+
+        tasks = [
+            (specs, int(start), int(end), feature_version, params)
+            for start, end in zip(bounds[:-1], bounds[1:])
+            if end > start
+        ]
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            partition_features = [f for f in executor.map(_featurize_partition, tasks) if len(f) > 0]
+    finally:
+        for segment in segments:
+            segment.close()
+            segment.unlink()
+
+    if not partition_features:
+        return pd.DataFrame()
+
+    # Workers saw customer codes; codes follow sorted id order, so sorting by
+    # code reproduces groupby order before mapping back to the real ids
+    if feature_version == "v2":
+        features_df = merge_partition_features(partition_features)
+    else:
+        features_df = pd.concat(partition_features, ignore_index=True)
+        features_df = features_df.sort_values("customer_id", kind="stable").reset_index(drop=True)
+        features_df = _normalize_monetary_scores_v1(features_df)
+
+    features_df["customer_id"] = customer_ids.take(features_df["customer_id"].to_numpy())
+    return features_df
+
+
+def _encode_columns(
+    df: pd.DataFrame,
+    feature_version: str,
+    has_churn_label: bool
+) -> Tuple[Dict[str, np.ndarray], pd.Index]:
+    """
+    Turn the event columns into fixed-width NumPy arrays for shared memory.
+
+    customer_id becomes sorted factor codes, event_date nanoseconds (NaT kept
+    as the NaT sentinel) and amount its numeric values. Rows without a
+    customer id are dropped, as the groupby in both engines would do.
+    """
+    codes, customer_ids = pd.factorize(df["customer_id"], sort=True)
+    customer_ids = plain_customer_ids(customer_ids)
+    keep = codes >= 0
+
+    # V1 parses strictly (and raises on bad dates); V2 drops them
+    event_dates = event_datetimes(df, errors="coerce" if feature_version == "v2" else "raise")
+    if getattr(event_dates.dt, "tz", None) is not None:
+        event_dates = event_dates.dt.tz_localize(None)
+
+    columns = {
+        "customer_id": codes[keep].astype(np.int64),
+        "event_date": event_dates.to_numpy(dtype="datetime64[ns]").view(np.int64)[keep]
+    }
+    if "amount" in df.columns:
+        columns["amount"] = pd.to_numeric(df["amount"], errors="coerce").to_numpy()[keep]
+    if has_churn_label and "churn_label" in df.columns:
+        columns["churn_label"] = pd.to_numeric(df["churn_label"]).to_numpy()[keep]
+
+    return columns, customer_ids
+
+
+def _to_shared_memory(values: np.ndarray) -> shared_memory.SharedMemory:
+    segment = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+    np.ndarray(values.shape, dtype=values.dtype, buffer=segment.buf)[:] = values
+    return segment
+
+
+def _featurize_partition(task: Tuple[Dict[str, Tuple[str, str, int]], int, int, str, Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Worker: rebuild one partition from shared memory and featurize it.
+    """
+    specs, start, end, feature_version, params = task
+
+    data = {}
+    segments = []
+    try:
+        for name, (shm_name, dtype, length) in specs.items():
+            segment = shared_memory.SharedMemory(name=shm_name)
+            segments.append(segment)
+            values = np.ndarray((length,), dtype=np.dtype(dtype), buffer=segment.buf)
+            data[name] = values[start:end].copy()
+    finally:
+        for segment in segments:
+            segment.close()
+
+    data["event_date"] = data["event_date"].view("datetime64[ns]")
+    part_df = pd.DataFrame(data)
+
+    if feature_version == "v2":
+        return engineer_features_from_csv_v2_vectorized(part_df, **params)
+    return engineer_features_from_csv(part_df, normalize_monetary=False, **params)
@@ -0,0 +1,259 @@
+"""
+Prediction Micro-Batcher
+Collects concurrent single-customer V2 prediction requests per organization
+for a few milliseconds, featurizes and scores them as one matrix in a worker
+thread, and resolves each caller's future with its own result.
+
+A batch is flushed when it reaches max_batch_size or max_wait_ms after its
+first request. Results equal scoring each request alone: customers are keyed
+by request, not by their customer_id, and monetary scores are normalized per
+customer the way a one-customer DataFrame is. If a batch fails, its requests
+are rescored one by one so an invalid request only fails its own caller.
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+from app.services.feature_engineering_v2 import (
+    engineer_features_from_csv_v2_vectorized,
+    _round_like_builtin
+)
+from app.services.ml_training_v2 import predict_v2
+from app.services.model_registry import get_model_v2
+
+
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+QUEUE_WAIT_MS_BUCKETS = [0.5, 1, 2, 5, 10, 20, 50, 100, 250, 1000]
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram (Prometheus style: each bucket counts
+    observations <= its upper bound).
+    """
+
+    def __init__(self, buckets: List[float]):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = int(np.searchsorted(self.buckets, value, side="left"))
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative = np.cumsum(self.counts).tolist()
+        return {
+            "buckets": {
+                **{str(bound): total for bound, total in zip(self.buckets, cumulative)},
+                "+Inf": cumulative[-1]
+            },
+            "count": self.count,
+            "sum": round(self.sum, 4),
+            "mean": round(self.sum / self.count, 4) if self.count else None
+        }
+
+
+@dataclass
+class _PendingPrediction:
+    customer_id: Any
+    transactions: pd.DataFrame
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class PredictionBatcher:
+    """
+    Per-organization micro-batches of single-customer predictions. Must be
+    used from one event loop.
+    """
+
+    def __init__(self, max_batch_size: int = 64, max_wait_ms: float = 5.0):
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._pending: Dict[str, List[_PendingPrediction]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        # The event loop only keeps weak references to running batch tasks
+        self._tasks: Set[asyncio.Task] = set()
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_ms = Histogram(QUEUE_WAIT_MS_BUCKETS)
+        self.batches = 0
+        self.fallbacks = 0
+
+    @classmethod
+    def from_settings(cls) -> "PredictionBatcher":
+        return cls(
+            max_batch_size=settings.PREDICT_BATCH_MAX_SIZE,
+            max_wait_ms=settings.PREDICT_BATCH_MAX_WAIT_MS
+        )
+
+    async def predict(
+        self,
+        organization_id: str,
+        customer_id: Any,
+        transactions: pd.DataFrame
+    ) -> Dict[str, Any]:
+        """
+        Prediction record (customer_id, churn_probability, risk_segment) for
+        one customer's transactions. Raises FileNotFoundError without a model.
+        """
+        loop = asyncio.get_running_loop()
+        request = _PendingPrediction(customer_id, transactions, loop.create_future())
+
+        pending = self._pending.setdefault(organization_id, [])
+        pending.append(request)
+        if len(pending) >= self.max_batch_size:
+            self._flush(organization_id)
+        elif len(pending) == 1:
+            self._timers[organization_id] = loop.call_later(
+                self.max_wait_ms / 1000, self._flush, organization_id
+            )
+
+        return await request.future
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "batches": self.batches,
+            "fallbacks": self.fallbacks,
+            "pending": sum(len(requests) for requests in self._pending.values()),
+            "running_batches": len(self._tasks),
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms.snapshot()
+        }
+
+    def _flush(self, organization_id: str) -> None:
+        timer = self._timers.pop(organization_id, None)
+        if timer is not None:
+            timer.cancel()
+        requests = self._pending.pop(organization_id, [])
+        if not requests:
+            return
+
+        now = time.monotonic()
+        self.batches += 1
+        self.batch_sizes.observe(len(requests))
+        for request in requests:
+            self.queue_wait_ms.observe((now - request.enqueued_at) * 1000)
+
+        task = asyncio.ensure_future(self._run(organization_id, requests))
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+
+    async def shutdown(self) -> None:
+        """
+        Flush every pending batch and wait for all running batches to finish.
+        """
+        for organization_id in list(self._pending):
+            self._flush(organization_id)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _task_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Warning: Prediction batch failed: {task.exception()}")
+
+    async def _run(self, organization_id: str, requests: List[_PendingPrediction]) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(None, _score_requests, organization_id, requests)
+        except FileNotFoundError as e:
+            _fail(requests, e)
+            return
+        except Exception as e:
+            if len(requests) == 1:
+                _fail(requests, e)
+                return
+            # Find the failing request(s) by scoring each one alone
+            self.fallbacks += 1
+            for request in requests:
+                try:
+                    result = (await loop.run_in_executor(None, _score_requests, organization_id, [request]))[0]
+                except Exception as error:
+                    _fail([request], error)
+                else:
+                    _resolve(request, result)
+            return
+
+        for request, result in zip(requests, results):
+            _resolve(request, result)
+
+
+def _resolve(request: _PendingPrediction, result: Dict[str, Any]) -> None:
+    if not request.future.done():
+        request.future.set_result(result)
+
+
+def _fail(requests: List[_PendingPrediction], error: Exception) -> None:
+    for request in requests:
+        if not request.future.done():
+            request.future.set_exception(error)
+
+
+def _score_requests(organization_id: str, requests: List[_PendingPrediction]) -> List[Dict[str, Any]]:
+    """
+    Featurize and score a batch; result i belongs to requests[i].
+    """
+    pipeline = get_model_v2(organization_id)
+
+    # Key events by request position, so equal customer_ids stay separate
+    events = pd.concat(
+        [request.transactions.assign(customer_id=position) for position, request in enumerate(requests)],
+        ignore_index=True
+    )
+    features_df = engineer_features_from_csv_v2_vectorized(events, has_churn_label=False)
+    if len(features_df) < len(requests):
+        raise ValueError("No valid transactions to featurize")
+    features_df = _normalize_monetary_per_customer(features_df)
+
+    predictions = predict_v2(pipeline, features_df).set_index("customer_id")
+
+    records = []
+    for position, request in enumerate(requests):
+        row = predictions.loc[position]
+        records.append({
+            "customer_id": request.customer_id,
+            "churn_probability": float(row["churn_probability"]),
+            "risk_segment": row["risk_segment"]
+        })
+    return records
+
+
+def _normalize_monetary_per_customer(features_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Monetary scores as _normalize_monetary_scores computes them for a
+    one-customer DataFrame, whose 95th percentile is the customer's own spend.
+    """
+    monetary_value = features_df["monetary_value"].to_numpy(dtype=np.float64)
+    max_monetary = np.where(monetary_value == 0, 1.0, monetary_value)
+    scaled = 100 * (monetary_value / max_monetary)
+    features_df["monetary_score"] = _round_like_builtin(np.minimum(100, scaled), 2)
+    return features_df
+
+
+_batcher: Optional[PredictionBatcher] = None
+
+
+def get_prediction_batcher() -> PredictionBatcher:
+    """
+    Per-process batcher sized by PREDICT_BATCH_MAX_SIZE and PREDICT_BATCH_MAX_WAIT_MS.
+    """
+    global _batcher
+    if _batcher is None:
+        _batcher = PredictionBatcher.from_settings()
+    return _batcher
+
+
+async def shutdown_prediction_batcher() -> None:
+    if _batcher is not None:
+        await _batcher.shutdown()
@@ -0,0 +1,171 @@
+"""
+Prediction Store
+Bulk persistence of batch predictions into customer_predictions.
+
+Predictions and their features are joined once and packed with NumPy into
+Postgres binary COPY rows (fixed-width float8 columns plus the customer id),
+streamed in chunks into a temporary table. One INSERT ... SELECT then builds
+the ids, risk segment text and features JSONB inside Postgres, so no Python
+object, JSON string or CSV field is created per row.
+"""
+import io
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from app.db.models.prediction_batch import CustomerPrediction
+
+
+# Rows per COPY round trip
+PREDICTION_CHUNK_ROWS = 50000
+
+RISK_SEGMENT_NAMES = ["Low", "Medium", "High", "Critical"]
+
+_COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00" + np.array([0, 0], dtype=">i4").tobytes()
+_COPY_TRAILER = np.array([-1], dtype=">i2").tobytes()
+
+
+def risk_distribution(predictions_df: pd.DataFrame) -> Dict[str, int]:
+    """
+    Customers per risk segment, with every segment present.
+    """
+    counts = predictions_df["risk_segment"].value_counts()
+    return {segment: int(counts.get(segment, 0)) for segment in RISK_SEGMENT_NAMES}
+
+
+def store_batch_predictions(
+    db: Session,
+    batch_id: uuid.UUID,
+    org_id: uuid.UUID,
+    predictions_df: pd.DataFrame,
+    features_df: Optional[pd.DataFrame],
+    feature_cols: List[str]
+) -> Dict[str, int]:
+    """
+    Insert one customer_predictions row per prediction in the session's
+    transaction (the caller commits) and return the risk distribution.
+
+    features holds the customer's feature_cols (missing or non-finite values
+    as null), or is NULL when features_df has no row for the customer.
+    """
+    feature_cols = [col for col in feature_cols if features_df is not None and col in features_df.columns]
+    if feature_cols:
+        # One join instead of filtering features_df per prediction
+        features = features_df.drop_duplicates("customer_id")[["customer_id"] + feature_cols]
+        joined = predictions_df[["customer_id"]].merge(features, on="customer_id", how="left", indicator=True)
+        feature_values = joined[feature_cols].to_numpy(dtype=np.float64)
+        has_features = (joined["_merge"] == "both").to_numpy()
+    else:
+        feature_values = np.empty((len(predictions_df), 0))
+        has_features = np.zeros(len(predictions_df), dtype=bool)
+
+    risk_codes = pd.Categorical(predictions_df["risk_segment"], categories=RISK_SEGMENT_NAMES).codes
+    if (risk_codes < 0).any():
+        raise ValueError("risk_segment must be one of " + ", ".join(RISK_SEGMENT_NAMES))
+
+    columns = ["churn_probability", "risk_code", "has_features"] + [
+        f"feature_{i}" for i in range(len(feature_cols))
+    ] + ["external_customer_id"]
+    table = "_customer_predictions_load"
+
+    dbapi_connection = db.connection().connection.dbapi_connection
+    with dbapi_connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TEMP TABLE {table} (churn_probability float8, risk_code int2, has_features bool"
+            + "".join(f", feature_{i} float8" for i in range(len(feature_cols)))
+            + ", external_customer_id text) ON COMMIT DROP"
+        )
+        for start in range(0, len(predictions_df), PREDICTION_CHUNK_ROWS):
+            stop = start + PREDICTION_CHUNK_ROWS
+            buffer = io.BytesIO(_binary_copy_rows(
+                predictions_df["churn_probability"].to_numpy(dtype=np.float64)[start:stop],
+                risk_codes[start:stop],
+                has_features[start:stop],
+                feature_values[start:stop],
+                predictions_df["customer_id"].iloc[start:stop]
+            ))
+            cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT binary)", buffer)
+
+        features_json = ", ".join(
+            f"%(feature_key_{i})s::text, NULLIF(feature_{i}, 'NaN')" for i in range(len(feature_cols))
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO {CustomerPrediction.__tablename__} (
+                id, batch_id, organization_id, external_customer_id,
+                churn_probability, risk_segment, features, predicted_at
+            )
+            SELECT
+                gen_random_uuid(), %(batch_id)s, %(org_id)s, external_customer_id,
+                churn_probability::text,
+                (%(segments)s::text[])[risk_code + 1],
+                CASE WHEN has_features THEN jsonb_build_object({features_json}) END,
+                %(predicted_at)s
+            FROM {table}
+            """,
+            {
+                "batch_id": str(batch_id),
+                "org_id": str(org_id),
+                "segments": RISK_SEGMENT_NAMES,
+                "predicted_at": datetime.utcnow(),
+                **{f"feature_key_{i}": col for i, col in enumerate(feature_cols)}
+            }
+        )
+        cursor.execute(f"DROP TABLE {table}")
+
+    return risk_distribution(predictions_df)
+
+
+def _binary_copy_rows(
+    churn_probability: np.ndarray,
+    risk_codes: np.ndarray,
+    has_features: np.ndarray,
+    feature_values: np.ndarray,
+    customer_ids: pd.Series
+) -> bytes:
+    """
+    COPY binary payload: every row is a fixed-width block of float8/int2/bool
+    fields followed by the variable-length customer id text.
+    """
+    n_rows, n_features = feature_values.shape
+    fields = [("n_fields", ">i2"), ("probability_len", ">i4"), ("probability", ">f8"),
+              ("risk_len", ">i4"), ("risk", ">i2"), ("has_features_len", ">i4"), ("has_features", "u1")]
+    for i in range(n_features):
+        fields += [(f"feature_{i}_len", ">i4"), (f"feature_{i}", ">f8")]
+    fields.append(("customer_id_len", ">i4"))
+
+    fixed = np.zeros(n_rows, dtype=np.dtype(fields))
+    fixed["n_fields"] = n_features + 4
+    fixed["probability_len"] = 8
+    fixed["probability"] = churn_probability
+    fixed["risk_len"] = 2
+    fixed["risk"] = risk_codes
+    fixed["has_features_len"] = 1
+    fixed["has_features"] = has_features
+    # NULL fields have no data bytes, so non-finite features travel as NaN
+    # (fixed width) and become null in the INSERT
+    feature_values = np.where(np.isfinite(feature_values), feature_values, np.nan)
+    for i in range(n_features):
+        fixed[f"feature_{i}_len"] = 8
+        fixed[f"feature_{i}"] = feature_values[:, i]
+
+    # Variable-length tail: UTF-8 customer ids placed after each fixed block
+    encoded = [str(customer_id).encode("utf-8") for customer_id in customer_ids]
+    id_lengths = np.fromiter((len(value) for value in encoded), dtype=np.int64, count=n_rows)
+    fixed["customer_id_len"] = id_lengths
+
+    row_width = fixed.dtype.itemsize
+    row_starts = np.zeros(n_rows, dtype=np.int64)
+    np.cumsum(row_width + id_lengths[:-1], out=row_starts[1:])
+    body = np.empty(int(row_width * n_rows + id_lengths.sum()), dtype=np.uint8)
+
+    fixed_bytes = fixed.view(np.uint8).reshape(n_rows, row_width)
+    body[(row_starts[:, None] + np.arange(row_width)).ravel()] = fixed_bytes.ravel()
+    id_positions = np.repeat(row_starts + row_width - np.r_[0, np.cumsum(id_lengths)[:-1]], id_lengths)
+    body[id_positions + np.arange(len(id_positions))] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+    return _COPY_SIGNATURE + body.tobytes() + _COPY_TRAILER
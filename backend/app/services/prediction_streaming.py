@@ -0,0 +1,166 @@
+"""
+Streaming Bulk Predictions
+Scores a raw events CSV one customer partition at a time, so bulk inference
+memory is bounded by a partition instead of the whole upload.
+
+Two passes over the customer partitions (see feature_streaming):
+    1. featurize each partition and spill its features to disk, keeping only
+       the raw lookback spend of every customer
+    2. normalize monetary scores with the 95th percentile of all customers,
+       predict and yield each partition
+
+Scores therefore match featurizing the whole file at once.
+"""
+import io
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional, Tuple, Union, BinaryIO
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+from app.services.feature_engineering_v2 import (
+    engineer_features_from_csv_v2_vectorized,
+    _normalize_monetary_scores
+)
+from app.services.feature_streaming import (
+    DEFAULT_CHUNKSIZE,
+    DEFAULT_NUM_PARTITIONS,
+    iter_customer_partitions
+)
+from app.services.ml_training_v2 import predict_v2
+
+
+# Target customers per streamed chunk; larger uploads get more partitions
+CUSTOMERS_PER_CHUNK = 50000
+
+
+def partitions_for(total_customers: int) -> int:
+    """
+    Number of customer partitions giving about CUSTOMERS_PER_CHUNK customers each.
+    """
+    return max(DEFAULT_NUM_PARTITIONS, -(-total_customers // CUSTOMERS_PER_CHUNK))
+
+
+def count_csv_customers(
+    source: Union[bytes, BinaryIO],
+    chunksize: int = DEFAULT_CHUNKSIZE
+) -> int:
+    """
+    Distinct customer_id values of a raw events CSV, read in chunks.
+
+    Raises:
+        ValueError: If customer_id or event_date is missing
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+
+    customers = set()
+    reader = pd.read_csv(source, chunksize=chunksize, dtype={"customer_id": str})
+    for chunk in reader:
+        if "customer_id" not in chunk.columns or "event_date" not in chunk.columns:
+            raise ValueError("CSV must contain 'customer_id' and 'event_date' columns")
+        customers.update(chunk["customer_id"].dropna().unique())
+    return len(customers)
+
+
+def iter_prediction_chunks(
+    source: Union[str, BinaryIO],
+    pipeline: Dict[str, Any],
+    lookback_days: int = 90,
+    current_date: Optional[datetime] = None,
+    num_partitions: int = DEFAULT_NUM_PARTITIONS,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    spill_dir: Optional[str] = None
+) -> Iterator[Tuple[pd.DataFrame, pd.DataFrame]]:
+    """
+    Yield (features_df, predictions_df) for each customer partition of a raw CSV.
+
+    Args:
+        source: Path or binary file object of the raw CSV
+        pipeline: V2 model pipeline (see predict_v2)
+        lookback_days: Number of days to look back for frequency/monetary calculation
+        current_date: Reference date for calculations (defaults to today)
+        num_partitions: Number of customer hash partitions spilled to disk
+        chunksize: Rows read per chunk
+        spill_dir: Parent directory for spill files (system temp dir by default)
+    """
+    if current_date is None:
+        current_date = datetime.now().date()
+
+    work_dir = tempfile.mkdtemp(prefix="prediction_spill_", dir=spill_dir)
+    try:
+        feature_paths = []
+        monetary_values = []
+        for part_df in iter_customer_partitions(source, num_partitions, chunksize, spill_dir):
+            features_df = engineer_features_from_csv_v2_vectorized(
+                part_df,
+                lookback_days=lookback_days,
+                current_date=current_date,
+                has_churn_label=False
+            )
+            del part_df
+            if len(features_df) == 0:
+                continue
+            path = os.path.join(work_dir, f"features_{len(feature_paths):04d}.pkl")
+            features_df.to_pickle(path)
+            feature_paths.append(path)
+            monetary_values.append(features_df["monetary_value"].to_numpy(dtype=np.float64))
+            del features_df
+
+        if not feature_paths:
+            return
+
+        # Same quantile as normalizing the concatenated features
+        max_monetary = pd.Series(np.concatenate(monetary_values)).quantile(0.95)
+        del monetary_values
+
+        for path in feature_paths:
+            features_df = pd.read_pickle(path)
+            os.remove(path)
+            features_df["_monetary_value"] = features_df.pop("monetary_value")
+            features_df = _normalize_monetary_scores(features_df, max_monetary)
+            yield features_df, predict_v2(pipeline, features_df)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+class PredictionOutputWriter:
+    """
+    Appends prediction chunks to a local CSV and, when parquet is True, a
+    Parquet file with the schema of the first chunk.
+    """
+
+    def __init__(self, work_dir: str, name: str, parquet: bool = False):
+        self.csv_path = os.path.join(work_dir, f"{name}.csv")
+        self.parquet_path = os.path.join(work_dir, f"{name}.parquet") if parquet and pq is not None else None
+        self._parquet_writer = None
+        self._rows = 0
+
+    def write(self, predictions_df: pd.DataFrame) -> None:
+        predictions_df.to_csv(self.csv_path, mode="a", header=self._rows == 0, index=False)
+
+        if self.parquet_path is not None:
+            if self._parquet_writer is None:
+                table = pa.Table.from_pandas(predictions_df, preserve_index=False)
+                self._parquet_writer = pq.ParquetWriter(self.parquet_path, table.schema)
+            else:
+                table = pa.Table.from_pandas(
+                    predictions_df, schema=self._parquet_writer.schema, preserve_index=False
+                )
+            self._parquet_writer.write_table(table)
+
+        self._rows += len(predictions_df)
+
+    def close(self) -> None:
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
@@ -0,0 +1,282 @@
+"""
+Churn Score Index
+Per-organization index of each customer's latest churn score, so the widget
+and churn-reason endpoints resolve external_customer_id without querying
+customers, segments or predictions.
+
+The index is built from completed prediction batches (the latest prediction
+per external_customer_id, with its customer segment and the churn risk level
+segmentation stored for it) and written as one uncompressed joblib file of
+NumPy arrays, memory mapped on load:
+
+    hashes       uint64 blake2b hash of each customer id
+    id_offsets   int64 start of each UTF-8 customer id in id_bytes
+    id_bytes     uint8 concatenated customer ids
+    table        int32 open-addressing (linear probing) slots -> row, -1 empty
+    probability  float64 churn probability
+    risk_code    int8 index into risk_segments
+    segment_code int16 index into segments, -1 without a segment
+    segment_risk_code int8 index into segment_risk_levels, -1 without a segment
+    batch_code   int32 index into batch_ids
+
+A lookup hashes the id and probes the table, so it costs O(1) array reads.
+Processes pick up a rebuilt index through the model registry, which reloads
+when the file changes.
+"""
+import hashlib
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.services.model_registry import get_model_registry
+
+
+SCORE_INDEX_FILENAME = "score_index.joblib"
+SCORE_INDEX_FORMAT_VERSION = 2
+
+_LATEST_PREDICTIONS_SQL = text("""
+    SELECT DISTINCT ON (p.external_customer_id)
+        p.external_customer_id,
+        p.churn_probability::float8 AS churn_probability,
+        p.risk_segment,
+        p.batch_id::text AS batch_id
+    FROM customer_predictions p
+    JOIN prediction_batches b ON b.id = p.batch_id AND b.status = 'completed'
+    WHERE p.organization_id = :org_id
+    ORDER BY p.external_customer_id, p.predicted_at DESC, b.completed_at DESC
+""")
+
+_LATEST_SEGMENTS_SQL = text("""
+    SELECT DISTINCT ON (customer_id)
+        customer_id AS external_customer_id,
+        segment,
+        churn_risk_level AS segment_risk_level
+    FROM customer_segments
+    WHERE organization_id = :org_id
+    ORDER BY customer_id, assigned_at DESC
+""")
+
+
+@dataclass(frozen=True)
+class ScoreEntry:
+    churn_probability: float
+    risk_segment: str
+    segment: Optional[str]
+    segment_risk_level: Optional[str]
+    batch_id: str
+
+
+class ScoreIndex:
+    """
+    Read-only view over the arrays of a built index.
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        self.organization_id = data["organization_id"]
+        self.built_at = data["built_at"]
+        self.risk_segments = data["risk_segments"]
+        self.segments = data["segments"]
+        self.segment_risk_levels = data["segment_risk_levels"]
+        self.batch_ids = data["batch_ids"]
+        self._hashes = data["hashes"]
+        self._id_offsets = data["id_offsets"]
+        self._id_bytes = data["id_bytes"]
+        self._table = data["table"]
+        self._mask = len(self._table) - 1
+        self._probability = data["probability"]
+        self._risk_code = data["risk_code"]
+        self._segment_code = data["segment_code"]
+        self._segment_risk_code = data["segment_risk_code"]
+        self._batch_code = data["batch_code"]
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def lookup(self, external_customer_id: str) -> Optional[ScoreEntry]:
+        """
+        Latest score of a customer, or None when the customer is not indexed.
+        """
+        key = str(external_customer_id).encode("utf-8")
+        key_hash = _hash_key(key)
+        slot = key_hash & self._mask
+        while True:
+            row = int(self._table[slot])
+            if row < 0:
+                return None
+            if int(self._hashes[row]) == key_hash:
+                start, stop = self._id_offsets[row], self._id_offsets[row + 1]
+                if self._id_bytes[start:stop].tobytes() == key:
+                    return self._entry(row)
+            slot = (slot + 1) & self._mask
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "organization_id": self.organization_id,
+            "customers": len(self),
+            "batches": len(self.batch_ids),
+            "built_at": self.built_at
+        }
+
+    def _entry(self, row: int) -> ScoreEntry:
+        segment_code = int(self._segment_code[row])
+        segment_risk_code = int(self._segment_risk_code[row])
+        return ScoreEntry(
+            churn_probability=float(self._probability[row]),
+            risk_segment=self.risk_segments[int(self._risk_code[row])],
+            segment=self.segments[segment_code] if segment_code >= 0 else None,
+            segment_risk_level=(
+                self.segment_risk_levels[segment_risk_code] if segment_risk_code >= 0 else None
+            ),
+            batch_id=self.batch_ids[int(self._batch_code[row])]
+        )
+
+
+def _hash_key(key: bytes) -> int:
+    # Stable across processes, unlike hash()
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+
+def _build_table(hashes: np.ndarray) -> np.ndarray:
+    """
+    Linear probing table (load factor <= 0.5) filled in vectorized rounds:
+    each round places one row per free slot and moves the others one slot on.
+    """
+    size = 8
+    while size < 2 * len(hashes):
+        size *= 2
+    mask = size - 1
+
+    table = np.full(size, -1, dtype=np.int32)
+    slots = (hashes & np.uint64(mask)).astype(np.int64)
+    pending = np.arange(len(hashes), dtype=np.int64)
+    while len(pending):
+        pending_slots = slots[pending]
+        free = table[pending_slots] == -1
+        free_slots, first = np.unique(pending_slots[free], return_index=True)
+        table[free_slots] = pending[free][first]
+
+        placed = np.zeros(len(hashes), dtype=bool)
+        placed[pending[free][first]] = True
+        pending = pending[~placed[pending]]
+        slots[pending] = (slots[pending] + 1) & mask
+    return table
+
+
+def build_score_index(
+    db: Session,
+    organization_id,
+    base_path: str = "models"
+) -> Dict[str, Any]:
+    """
+    Rebuild an organization's index from its completed batches and
+    customer segments; returns the index stats.
+    """
+    params = {"org_id": str(organization_id)}
+    connection = db.connection()
+    scores = pd.read_sql_query(_LATEST_PREDICTIONS_SQL, connection, params=params)
+    segments = pd.read_sql_query(_LATEST_SEGMENTS_SQL, connection, params=params)
+    scores = scores.merge(segments, on="external_customer_id", how="left")
+
+    encoded = [str(customer_id).encode("utf-8") for customer_id in scores["external_customer_id"]]
+    hashes = np.fromiter((_hash_key(key) for key in encoded), dtype=np.uint64, count=len(encoded))
+    id_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(key) for key in encoded], out=id_offsets[1:])
+
+    risk_codes, risk_segments = pd.factorize(scores["risk_segment"])
+    segment_codes, segment_names = pd.factorize(scores["segment"])
+    segment_risk_codes, segment_risk_levels = pd.factorize(scores["segment_risk_level"])
+    batch_codes, batch_ids = pd.factorize(scores["batch_id"])
+
+    data = {
+        "format_version": SCORE_INDEX_FORMAT_VERSION,
+        "organization_id": str(organization_id),
+        "built_at": datetime.utcnow().isoformat(),
+        "risk_segments": [str(name) for name in risk_segments],
+        "segments": [str(name) for name in segment_names],
+        "segment_risk_levels": [str(level) for level in segment_risk_levels],
+        "batch_ids": [str(batch_id) for batch_id in batch_ids],
+        "hashes": hashes,
+        "id_offsets": id_offsets,
+        "id_bytes": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        "table": _build_table(hashes),
+        "probability": scores["churn_probability"].to_numpy(dtype=np.float64),
+        "risk_code": risk_codes.astype(np.int8),
+        "segment_code": segment_codes.astype(np.int16),
+        "segment_risk_code": segment_risk_codes.astype(np.int8),
+        "batch_code": batch_codes.astype(np.int32)
+    }
+
+    index_dir = Path(base_path) / str(organization_id)
+    index_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = index_dir / f".{SCORE_INDEX_FILENAME}.{os.getpid()}.tmp"
+    # Uncompressed so arrays can be memory mapped on load
+    joblib.dump(data, tmp_path, compress=0)
+    # Rename instead of overwriting: live memory maps of the old file stay valid
+    os.replace(tmp_path, index_dir / SCORE_INDEX_FILENAME)
+
+    return ScoreIndex(data).stats()
+
+
+def refresh_score_index(db: Session, organization_id, base_path: str = "models") -> None:
+    """
+    build_score_index for completion hooks; the index is derived data, so a
+    failed rebuild is logged and the previous index keeps serving.
+    """
+    try:
+        stats = build_score_index(db, organization_id, base_path)
+        print(f"Score index rebuilt: {stats['customers']} customers for organization {organization_id}")
+    except Exception as e:
+        print(f"Warning: Could not rebuild score index for organization {organization_id}: {str(e)}")
+
+
+def load_score_index(organization_id, base_path: str = "models") -> ScoreIndex:
+    """
+    Memory-mapped index of an organization.
+
+    Raises:
+        FileNotFoundError: If no index of the current format exists
+    """
+    index_path = Path(base_path) / str(organization_id) / SCORE_INDEX_FILENAME
+    if not index_path.exists():
+        raise FileNotFoundError(f"No score index found for organization {organization_id}")
+    data = joblib.load(index_path, mmap_mode="r")
+    if data.get("format_version") != SCORE_INDEX_FORMAT_VERSION:
+        raise FileNotFoundError(f"Score index for organization {organization_id} has an old format")
+    return ScoreIndex(data)
+
+
+def get_score_index(organization_id, base_path: str = "models") -> Optional[ScoreIndex]:
+    """
+    Cached load_score_index, or None when the organization has no index.
+    """
+    index_path = Path(base_path) / str(organization_id) / SCORE_INDEX_FILENAME
+    try:
+        return get_model_registry().get(
+            ("score_index", base_path, str(organization_id)),
+            [index_path],
+            lambda: load_score_index(organization_id, base_path)
+        )
+    except FileNotFoundError:
+        return None
+
+
+def lookup_customer_score(
+    organization_id,
+    external_customer_id: str,
+    base_path: str = "models"
+) -> Optional[ScoreEntry]:
+    """
+    Latest indexed score of a customer, or None when it is not indexed.
+    """
+    index = get_score_index(organization_id, base_path)
+    if index is None:
+        return None
+    return index.lookup(external_customer_id)
@@ -16,7 +16,7 @@ from app.db.models.customer_segment import CustomerSegment
 from app.db.models.churn_prediction import ChurnPrediction
 from app.db.models.prediction_batch import CustomerPrediction
 from app.db.models.dataset import Dataset
-from app.services.storage import download_from_supabase
+from app.services.storage import download_dataframe_from_supabase
 from .rules import assign_segment, get_segment_metadata
 from .utils import (
     categorize_rfm_score,
@@ -561,31 +561,33 @@ def batch_segment_customers_from_db(
 
         print(f"Downloading RFM features from: {features_dataset.file_url}")
 
-        # Download and parse RFM CSV from Supabase
+        # RFM columns needed for segmentation
+        required_rfm_cols = ['customer_id', 'recency_score', 'frequency_score', 'monetary_score', 'engagement_score']
+
+        # Download RFM features from Supabase, parsing only the columns used here
         try:
-            rfm_csv_bytes = download_from_supabase(
+            rfm_df = download_dataframe_from_supabase(
                 features_dataset.bucket_name,
-                features_dataset.file_path
+                features_dataset.file_path,
+                columns=required_rfm_cols
             )
-            rfm_df = pd.read_csv(io.BytesIO(rfm_csv_bytes))
-            print(f"Loaded {len(rfm_df)} RFM records from CSV")
+            print(f"Loaded {len(rfm_df)} RFM records from {features_dataset.filename}")
         except Exception as e:
             return {
                 'success': False,
                 'total_customers': total_customers,
                 'segmented': 0,
-                'errors': [f'Error downloading RFM features CSV: {str(e)}']
+                'errors': [f'Error downloading RFM features: {str(e)}']
             }
 
-        # Validate RFM CSV columns
-        required_rfm_cols = ['customer_id', 'recency_score', 'frequency_score', 'monetary_score', 'engagement_score']
+        # Validate RFM columns
         missing_cols = [col for col in required_rfm_cols if col not in rfm_df.columns]
         if missing_cols:
             return {
                 'success': False,
                 'total_customers': total_customers,
                 'segmented': 0,
-                'errors': [f'RFM CSV missing required columns: {missing_cols}']
+                'errors': [f'RFM features missing required columns: {missing_cols}']
             }
 
         # Create RFM lookup dictionary by customer_id
@@ -5,11 +5,25 @@ Handles file uploads and downloads to/from Supabase storage buckets.
 import os
 import io
 import uuid
-from typing import Dict, Any, BinaryIO, Optional
+import pandas as pd
+from typing import Dict, Any, BinaryIO, Optional, List
 from pathlib import Path
 from fastapi import UploadFile
+from app.core.config import settings
 from app.core.supabase import supabase
 
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet artifacts fall back to CSV
+    pq = None
+
+
+# Content types by artifact extension
+ARTIFACT_CONTENT_TYPES = {
+    ".csv": "text/csv",
+    ".parquet": "application/vnd.apache.parquet"
+}
+
 
 async def upload_to_supabase(
     file: UploadFile,
@@ -82,10 +96,12 @@ async def upload_dataframe_to_supabase(
     filename: Optional[str] = None
 ) -> Dict[str, str]:
     """
-    Upload a DataFrame (as CSV bytes) to Supabase storage bucket.
+    Upload a DataFrame (as CSV or Parquet bytes) to Supabase storage bucket.
+
+    The content type follows the filename extension (see dataframe_to_bytes).
 
     Args:
-        df_csv_bytes: CSV content as bytes
+        df_csv_bytes: Serialized DataFrame content as bytes
         bucket_name: Name of the Supabase bucket
         folder: Optional folder path within bucket
         filename: Optional custom filename (generates one if not provided)
@@ -112,7 +128,7 @@ async def upload_dataframe_to_supabase(
             file_path,
             df_csv_bytes,
             file_options={
-                "content-type": "text/csv",
+                "content-type": ARTIFACT_CONTENT_TYPES.get(Path(filename).suffix, "text/csv"),
                 "upsert": "false"
             }
         )
@@ -157,6 +173,89 @@ def download_from_supabase(
         raise Exception(f"Failed to download file from Supabase: {str(e)}")
 
 
+def download_dataframe_from_supabase(
+    bucket_name: str,
+    file_path: str,
+    columns: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """
+    Download a CSV or Parquet artifact and parse it into a DataFrame.
+
+    Args:
+        bucket_name: Name of the Supabase bucket
+        file_path: Path to file within bucket (extension selects the format)
+        columns: Optional subset of columns to read
+
+    Returns:
+        DataFrame with the requested columns
+
+    Raises:
+        Exception: If download fails
+    """
+    content = download_from_supabase(bucket_name, file_path)
+    return read_dataframe(content, file_path, columns=columns)
+
+
+def artifact_extension() -> str:
+    """
+    File extension for new features/predictions artifacts.
+
+    Parquet unless ARTIFACT_FORMAT is 'csv' or pyarrow is not installed.
+    """
+    if settings.ARTIFACT_FORMAT == "parquet" and pq is not None:
+        return ".parquet"
+    return ".csv"
+
+
+def dataframe_to_bytes(df: pd.DataFrame, filename: str) -> bytes:
+    """
+    Serialize a DataFrame in the format given by the filename extension.
+
+    Parquet keeps column dtypes, so readers get typed columns back without
+    re-inferring them from text.
+    """
+    if Path(filename).suffix == ".parquet":
+        buffer = io.BytesIO()
+        df.to_parquet(buffer, index=False)
+        return buffer.getvalue()
+    return df.to_csv(index=False).encode('utf-8')
+
+
+def read_dataframe(
+    content: bytes,
+    filename: str,
+    columns: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """
+    Parse CSV or Parquet bytes, chosen by the filename extension.
+
+    With columns, only those columns are read: Parquet skips the other
+    column chunks entirely, CSV skips converting them. Requested columns
+    missing from the file are left out rather than raising, so callers can
+    report them with their own validation.
+
+    Args:
+        content: File content as bytes
+        filename: Name or path of the file (extension selects the format)
+        columns: Optional subset of columns to read
+
+    Returns:
+        DataFrame with the requested columns
+    """
+    if Path(filename).suffix == ".parquet":
+        if pq is None:
+            raise Exception("pyarrow is required to read Parquet artifacts")
+        if columns is not None:
+            available = set(pq.read_schema(io.BytesIO(content)).names)
+            columns = [col for col in columns if col in available]
+        return pd.read_parquet(io.BytesIO(content), columns=columns)
+
+    if columns is not None:
+        wanted = set(columns)
+        return pd.read_csv(io.BytesIO(content), usecols=lambda col: col in wanted)
+    return pd.read_csv(io.BytesIO(content))
+
+
 async def save_local_copy(
     file_content: bytes,
     local_dir: str,
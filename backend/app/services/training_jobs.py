@@ -0,0 +1,342 @@
+"""
+Training Job Runner
+Runs churn model training in a pool of worker processes, so CPU-bound sklearn
+fits never run on the API's event loop. Each job opens its own database
+session, writes progress (stage, model family, candidate, fold) to its
+ModelMetadata row, and stops at its next progress update once the row is
+marked as cancelling.
+
+Job lifecycle (ModelMetadata.status):
+    queued -> training -> completed | failed
+    queued | training -> cancelling -> cancelled
+"""
+import multiprocessing
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.base import Base  # noqa - registers every model in freshly spawned workers
+from app.db.session import SessionLocal
+from app.db.models.dataset import Dataset
+from app.db.models.model_metadata import ModelMetadata
+from app.services.storage import download_from_supabase, download_dataframe_from_supabase
+from app.services.event_loader import load_events
+from app.services.feature_engineering_csv import create_training_dataset_from_csv
+from app.services.feature_engineering_v2 import create_training_dataset_from_csv_v2, get_feature_columns_v2
+from app.services.ml_training import train_churn_model_from_dataframe, save_model_to_disk
+from app.services.ml_training_v2 import (
+    train_churn_model_v2,
+    retrain_churn_model_v2,
+    save_model_v2,
+    load_model_v2,
+    load_model_metadata_v2
+)
+
+
+# Progress is written (and cancellation checked) at most this often per job;
+# stage and model family changes are always written
+PROGRESS_INTERVAL_SECONDS = 2.0
+
+
+class TrainingCancelled(Exception):
+    """Raised inside a training job once its ModelMetadata row is marked cancelling."""
+
+
+class TrainingJobRunner:
+    """
+    Process pool for training jobs. submit() only hands the job to the pool,
+    so API requests return immediately while models train.
+    """
+
+    def __init__(self, max_workers: int = 1):
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Spawned workers start with their own DB engine and no inherited threads
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def submit(
+        self,
+        model_id: uuid.UUID,
+        org_id: uuid.UUID,
+        model_type: str,
+        churn_threshold_days: int,
+        use_v2: bool = True,
+        incremental: bool = False
+    ) -> None:
+        """
+        Queue a training job for an existing ModelMetadata row in 'queued' status.
+        """
+        job_args = (str(model_id), str(org_id), model_type, churn_threshold_days, use_v2, incremental)
+        with self._lock:
+            try:
+                future = self._pool().submit(run_training_job, *job_args)
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for memory); start a fresh pool
+                self._executor = None
+                future = self._pool().submit(run_training_job, *job_args)
+            self._futures[str(model_id)] = future
+
+        future.add_done_callback(lambda f: self._job_done(str(model_id), f))
+
+    def cancel(self, model_id: uuid.UUID) -> bool:
+        """
+        Drop a job that has not started yet. Returns False when the job is
+        running or owned by another API process; it then stops on its own
+        after its row is marked as cancelling.
+        """
+        with self._lock:
+            future = self._futures.get(str(model_id))
+        return future is not None and future.cancel()
+
+    def _job_done(self, model_id: str, future: Future) -> None:
+        with self._lock:
+            self._futures.pop(model_id, None)
+        if future.cancelled():
+            return
+
+        error = future.exception()
+        if error is not None:
+            # The worker could not record the failure itself (e.g. it crashed)
+            db = SessionLocal()
+            try:
+                db.query(ModelMetadata).filter(
+                    ModelMetadata.id == uuid.UUID(model_id)
+                ).update({
+                    "status": "failed",
+                    "error_message": f"Training worker failed: {error}"
+                }, synchronize_session=False)
+                db.commit()
+            finally:
+                db.close()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+_runner: Optional[TrainingJobRunner] = None
+
+
+def get_training_runner() -> TrainingJobRunner:
+    """
+    Per-process runner sized by TRAINING_WORKERS.
+    """
+    global _runner
+    if _runner is None:
+        _runner = TrainingJobRunner(max_workers=settings.TRAINING_WORKERS)
+    return _runner
+
+
+def shutdown_training_runner() -> None:
+    if _runner is not None:
+        _runner.shutdown()
+
+
+class JobProgress:
+    """
+    Progress callback for train_churn_model_v2: stores the latest update in
+    ModelMetadata.progress and raises TrainingCancelled once the row is
+    marked as cancelling.
+    """
+
+    def __init__(self, db: Session, model_id: uuid.UUID):
+        self.db = db
+        self.model_id = model_id
+        self._last_write = 0.0
+        self._last_key = None
+
+    def __call__(self, update: Dict[str, Any]) -> None:
+        now = time.monotonic()
+        key = (update.get("stage"), update.get("model_family"))
+        if key == self._last_key and now - self._last_write < PROGRESS_INTERVAL_SECONDS:
+            return
+        self._last_write = now
+        self._last_key = key
+
+        self.db.query(ModelMetadata).filter(ModelMetadata.id == self.model_id).update(
+            {"progress": {**update, "updated_at": datetime.utcnow().isoformat()}},
+            synchronize_session=False
+        )
+        self.db.commit()
+        self.check_cancelled()
+
+    def check_cancelled(self) -> None:
+        status = self.db.query(ModelMetadata.status).filter(
+            ModelMetadata.id == self.model_id
+        ).scalar()
+        if status == "cancelling":
+            raise TrainingCancelled()
+
+
+def run_training_job(
+    model_id: str,
+    org_id: str,
+    model_type: str,
+    churn_threshold_days: int,
+    use_v2: bool = True,
+    incremental: bool = False
+) -> None:
+    """
+    Worker process entry point: load the training data, train, save the model
+    and record the outcome on the ModelMetadata row.
+
+    incremental=True warm-starts from the organization's current V2 model
+    (retrain_churn_model_v2) and stores its drift report; without a previous
+    model it trains from scratch.
+    """
+    model_id = uuid.UUID(model_id)
+    db = SessionLocal()
+    try:
+        # Only start jobs still queued; anything else was cancelled meanwhile
+        started = db.query(ModelMetadata).filter(
+            ModelMetadata.id == model_id,
+            ModelMetadata.status == "queued"
+        ).update({"status": "training"}, synchronize_session=False)
+        db.commit()
+        if not started:
+            db.query(ModelMetadata).filter(
+                ModelMetadata.id == model_id,
+                ModelMetadata.status == "cancelling"
+            ).update({"status": "cancelled"}, synchronize_session=False)
+            db.commit()
+            return
+
+        model_metadata = db.query(ModelMetadata).filter(ModelMetadata.id == model_id).first()
+        progress = JobProgress(db, model_id)
+
+        try:
+            progress({"stage": "loading_data"})
+            training_df = _load_training_data(db, uuid.UUID(org_id), churn_threshold_days, use_v2)
+
+            previous_pipeline = None
+            if use_v2 and incremental:
+                try:
+                    previous_pipeline = load_model_v2(org_id, mmap=False)
+                except FileNotFoundError:
+                    print(f"No previous model for organization {org_id}, training from scratch")
+
+            if previous_pipeline is not None:
+                pipeline, metrics = retrain_churn_model_v2(
+                    previous_pipeline,
+                    training_df,
+                    previous_metrics=load_model_metadata_v2(org_id),
+                    progress=progress
+                )
+                progress.check_cancelled()
+                model_path = save_model_v2(pipeline, org_id, metrics)
+            elif use_v2:
+                pipeline, metrics = train_churn_model_v2(
+                    training_df=training_df,
+                    feature_columns=get_feature_columns_v2(),
+                    model_type="auto",
+                    enable_tuning=True,
+                    enable_scaling=True,
+                    search_mode=settings.MODEL_SEARCH_MODE,
+                    progress=progress,
+                    subsample=settings.TRAINING_SUBSAMPLE
+                )
+                # A cancelled job must not replace the organization's current model
+                progress.check_cancelled()
+                model_path = save_model_v2(pipeline, org_id, metrics)
+            else:
+                progress({"stage": "search", "model_family": model_type})
+                model, metrics = train_churn_model_from_dataframe(
+                    training_df=training_df,
+                    model_type=model_type
+                )
+                progress.check_cancelled()
+                model_path = save_model_to_disk(model, org_id, metrics)
+
+            model_metadata.model_path = model_path
+            model_metadata.status = "completed"
+            model_metadata.progress = {"stage": "completed", "updated_at": datetime.utcnow().isoformat()}
+            model_metadata.accuracy = metrics.get("accuracy")
+            model_metadata.precision = metrics.get("precision")
+            model_metadata.recall = metrics.get("recall")
+            model_metadata.f1_score = metrics.get("f1_score")
+            model_metadata.roc_auc = metrics.get("roc_auc")
+            model_metadata.feature_importance = metrics.get("feature_importance")
+            model_metadata.training_samples = metrics.get("total_samples")
+            model_metadata.churn_rate = metrics.get("churn_rate")
+            model_metadata.drift_report = metrics.get("drift")
+            db.commit()
+
+        except TrainingCancelled:
+            db.rollback()
+            model_metadata.status = "cancelled"
+            db.commit()
+            print(f"Training job {model_id} cancelled")
+
+        except Exception as e:
+            db.rollback()
+            model_metadata.status = "failed"
+            model_metadata.error_message = str(e)
+            db.commit()
+            print(f"Error training model: {str(e)}")
+    finally:
+        db.close()
+
+
+def _load_training_data(
+    db: Session,
+    org_id: uuid.UUID,
+    churn_threshold_days: int,
+    use_v2: bool
+) -> pd.DataFrame:
+    """
+    Training DataFrame from the latest features dataset, or from the latest raw
+    dataset when the features carry no churn labels.
+    """
+    features_dataset = db.query(Dataset).filter(
+        Dataset.organization_id == org_id,
+        Dataset.dataset_type == "features",
+        Dataset.status == "ready"
+    ).order_by(Dataset.uploaded_at.desc()).first()
+
+    if not features_dataset:
+        raise ValueError("No features dataset found")
+
+    if features_dataset.has_churn_label == "True":
+        # Labels are already in the features artifact
+        return download_dataframe_from_supabase(
+            features_dataset.bucket_name,
+            features_dataset.file_path
+        )
+
+    # No churn label: build features and labels from the raw dataset
+    raw_dataset = db.query(Dataset).filter(
+        Dataset.organization_id == org_id,
+        Dataset.dataset_type == "raw",
+        Dataset.status.in_(["uploaded", "features_ready"])
+    ).order_by(Dataset.uploaded_at.desc()).first()
+
+    if not raw_dataset:
+        raise ValueError("No raw dataset found for labeling")
+
+    # Download raw CSV (the only download needed in this case)
+    raw_bytes = download_from_supabase(raw_dataset.bucket_name, raw_dataset.file_path)
+    raw_df = load_events(raw_bytes)
+
+    if use_v2:
+        # One grouped pass yields the V2 features and the labels
+        return create_training_dataset_from_csv_v2(raw_df, churn_threshold_days)
+    return create_training_dataset_from_csv(raw_df, churn_threshold_days)
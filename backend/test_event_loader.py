@@ -0,0 +1,63 @@
+"""
+Round-trip check for the compact event loader.
+
+Loads small CSVs with load_events and converts them back with
+to_default_dtypes, then compares every column against a plain read_csv of
+the same bytes. Includes customer ids that are distinct strings but the same
+number once read_csv infers them ("001" and "1", "1.0" and "1"). Prints the
+cases that differ and exits non-zero on mismatches.
+
+Usage:
+    python test_event_loader.py
+"""
+import io
+import sys
+
+import pandas as pd
+
+from app.services.event_loader import load_events, to_default_dtypes
+
+
+CASES = {
+    "string ids": (
+        b"customer_id,event_date,amount\n"
+        b"b,2024-01-01,5\na,2024-01-02,6\nb,2024-01-03,7\n"
+    ),
+    "zero-padded ids": (
+        b"customer_id,event_date,amount\n"
+        b"001,2024-01-01,5\n1,2024-01-02,6\n2,2024-01-03,7\n"
+    ),
+    "float ids with a gap": (
+        b"customer_id,event_date,amount\n"
+        b"1.0,2024-01-01,5.5\n1,2024-01-02,6\n,2024-01-03,7\n2,2024-01-03,7\n"
+    ),
+    "mixed ids": (
+        b"customer_id,event_date,amount\n"
+        b"x1,2024-01-01,5\n001,2024-01-02,6\n1,2024-01-03,7\n"
+    ),
+}
+
+
+def compare(name: str, raw: bytes) -> bool:
+    expected = pd.read_csv(io.BytesIO(raw))
+    try:
+        actual = to_default_dtypes(load_events(raw, report=False))
+    except Exception as e:
+        print(f"{name}: load_events failed: {e}")
+        return False
+
+    actual["event_date"] = actual["event_date"].dt.strftime("%Y-%m-%d")
+    try:
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+    except AssertionError as e:
+        print(f"{name}: {e}")
+        return False
+    return True
+
+
+if __name__ == "__main__":
+    failures = [name for name, raw in CASES.items() if not compare(name, raw)]
+    if failures:
+        print(f"{len(failures)} of {len(CASES)} cases differ")
+        sys.exit(1)
+    print(f"All {len(CASES)} cases match read_csv")
@@ -0,0 +1,120 @@
+"""
+Parity check for the SQL push-down feature mode.
+
+Computes customer features for one organization twice: in Postgres with
+calculate_features_sql, and with the per-customer pandas functions
+(calculate_rfm / calculate_engagement_metrics) that batch_calculate_features
+uses. Prints every feature that differs and exits non-zero on mismatches.
+
+Usage:
+    python test_feature_sql_parity.py <organization_id> [lookback_days]
+"""
+import sys
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from app.db.session import SessionLocal
+from app.db.models.customer import Customer
+from app.db.models.transaction import Transaction
+from app.services.feature_engineering import (
+    FEATURE_COLUMNS,
+    calculate_features_sql,
+    calculate_rfm,
+    calculate_engagement_metrics
+)
+
+
+# Features are stored with two decimals. Averages that land on a half cent can
+# round either way depending on summation order (and same-day transactions
+# have no defined order), so allow one unit in the last place.
+TOLERANCE = 0.01 + 1e-9
+
+
+def pandas_features(db, organization_id, lookback_days: int = 90) -> pd.DataFrame:
+    """
+    Features as batch_calculate_features computes them, without writing them.
+    """
+    transactions = db.query(Transaction).filter(
+        Transaction.organization_id == organization_id
+    ).order_by(Transaction.event_date).all()
+
+    by_customer = defaultdict(list)
+    for t in transactions:
+        by_customer[t.customer_id].append(t)
+
+    all_amounts = [float(t.amount) for t in transactions if t.amount]
+    max_monetary = np.percentile(all_amounts, 95) * 10 if all_amounts else 1.0
+    lookback_date = datetime.now().date() - timedelta(days=lookback_days)
+
+    rows = []
+    customers = db.query(Customer).filter(Customer.organization_id == organization_id).all()
+    for customer in customers:
+        customer_transactions = by_customer.get(str(customer.id), [])
+        if not customer_transactions:
+            rows.append({"customer_id": customer.id, **{col: 0.0 for col in FEATURE_COLUMNS}})
+            continue
+
+        rfm = calculate_rfm(customer.id, customer_transactions, lookback_days)
+        monetary_value = sum(
+            float(t.amount) for t in customer_transactions
+            if t.event_date >= lookback_date and t.amount
+        )
+        monetary_score = min(100, 100 * (monetary_value / max_monetary)) if max_monetary > 0 else 0.0
+        rfm["monetary_score"] = round(monetary_score, 2)
+
+        engagement = calculate_engagement_metrics(customer.id, customer_transactions)
+        rows.append({"customer_id": customer.id, **rfm, **engagement})
+
+    return pd.DataFrame(rows, columns=["customer_id"] + FEATURE_COLUMNS)
+
+
+def compare_features(sql_df: pd.DataFrame, pandas_df: pd.DataFrame) -> list:
+    """
+    Return (customer_id, feature, sql value, pandas value) for every mismatch.
+    """
+    merged = pandas_df.merge(sql_df, on="customer_id", how="outer", suffixes=("_pandas", "_sql"))
+    mismatches = []
+    for col in FEATURE_COLUMNS:
+        diff = (merged[f"{col}_sql"].astype(float) - merged[f"{col}_pandas"].astype(float)).abs()
+        for i in np.flatnonzero(~(diff <= TOLERANCE)):
+            row = merged.iloc[i]
+            mismatches.append((row["customer_id"], col, row[f"{col}_sql"], row[f"{col}_pandas"]))
+    return mismatches
+
+
+def check_parity(db, organization_id, lookback_days: int = 90) -> list:
+    sql_df = calculate_features_sql(db, organization_id, lookback_days)
+    pandas_df = pandas_features(db, organization_id, lookback_days)
+    print(f"SQL push-down: {len(sql_df)} customers, pandas: {len(pandas_df)} customers")
+    return compare_features(sql_df, pandas_df)
+
+
+def main() -> None:
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(2)
+
+    organization_id = uuid.UUID(sys.argv[1])
+    lookback_days = int(sys.argv[2]) if len(sys.argv) > 2 else 90
+
+    db = SessionLocal()
+    try:
+        mismatches = check_parity(db, organization_id, lookback_days)
+    finally:
+        db.close()
+
+    for customer_id, col, sql_value, pandas_value in mismatches[:50]:
+        print(f"  {customer_id} {col}: sql={sql_value} pandas={pandas_value}")
+
+    if mismatches:
+        print(f"FAILED: {len(mismatches)} mismatching values")
+        sys.exit(1)
+    print("OK: SQL push-down matches the pandas features")
+
+
+if __name__ == "__main__":
+    main()